@@ -1,5 +1,6 @@
 # [file name]: __init__.py
 # [CORRECCIÓN COMPLETA]
+import os
 from flask import Flask, render_template, request
 from flask_login import LoginManager, current_user
 from config import config
@@ -10,6 +11,15 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Detrás de un proxy (Railway) la IP real llega en X-Forwarded-For; la usa el límite de login.
+    # Sin ProxyFix todos los clientes comparten la IP del proxy y el límite por IP sería global.
+    # Railway define RAILWAY_ENVIRONMENT y pone delante un único proxy.
+    por_defecto = '1' if os.environ.get('RAILWAY_ENVIRONMENT') else '0'
+    proxies = int(os.environ.get('PROXIES_CONFIABLES', por_defecto))
+    if proxies:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
     # ⚠️ CORRECCIÓN: Configuración más robusta de Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -26,6 +36,7 @@ def create_app(config_name='default'):
     from app.controllers.reportes_controller import reportes_bp
     from app.controllers.config_controller import config_bp
     from app.controllers.notification_controller import notification_bp
+    from app.controllers.sistema_controller import sistema_bp
     
     app.register_blueprint(notification_bp)
     app.register_blueprint(auth_bp)
@@ -35,6 +46,21 @@ def create_app(config_name='default'):
     app.register_blueprint(chat_bp)
     app.register_blueprint(reportes_bp)
     app.register_blueprint(config_bp)
+    app.register_blueprint(sistema_bp)
+    
+    # Una conexión del pool por request, devuelta al terminar
+    from app.utils.database import Database
+    app.teardown_appcontext(Database.liberar_conexion_request)
+    
+    # Trabajos periódicos: el hilo arranca con el primer request de cada worker
+    from app.services import trabajos  # noqa: F401 (registra los trabajos)
+    from app.services.planificador import planificador, PLANIFICADOR
+    if PLANIFICADOR == 'web':
+        app.before_request(planificador.iniciar)
+    
+    # Comandos de mantenimiento (flask --app run ...)
+    from app.comandos import registrar_comandos
+    registrar_comandos(app)
     
     # User loader para Flask-Login - CORREGIDO
     from app.models.usuario_model import UsuarioModel
@@ -43,7 +69,7 @@ def create_app(config_name='default'):
     def load_user(user_id):
         try:
             usuario_model = UsuarioModel()
-            return usuario_model.obtener_por_id(int(user_id))
+            return usuario_model.obtener_por_id_cache(int(user_id))
         except:
             return None
     
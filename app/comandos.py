@@ -0,0 +1,197 @@
+# [file name]: comandos.py
+# Comandos de mantenimiento: flask --app run <grupo> <comando>
+import sys
+import click
+from flask.cli import AppGroup
+
+contadores_cli = AppGroup('contadores', help='Contadores materializados de los dashboards')
+esquema_cli = AppGroup('esquema', help='Migraciones e índices de la base de datos')
+historial_cli = AppGroup('historial', help='Particiones y retención de historial_actividades')
+trabajos_cli = AppGroup('trabajos', help='Trabajos periódicos del planificador')
+reportes_cli = AppGroup('reportes', help='Reportes PDF')
+contrasenas_cli = AppGroup('contrasenas', help='Hash de contraseñas')
+miembros_cli = AppGroup('miembros', help='Índice de miembros de proyecto (proyecto_miembros)')
+
+
+@contadores_cli.command('recalcular')
+def recalcular_contadores():
+    """Reconstruye estadisticas_contadores desde cero"""
+    from app.models.contadores_model import ContadoresModel
+    if not ContadoresModel().recomputar():
+        sys.exit(1)
+
+
+@contadores_cli.command('verificar')
+def verificar_contadores():
+    """Compara los contadores con las tablas y muestra las diferencias"""
+    from app.models.contadores_model import ContadoresModel
+    diferencias = ContadoresModel().verificar()
+    if diferencias is None:
+        click.echo("❌ Sin conexión a la base de datos")
+        sys.exit(1)
+    if not diferencias:
+        click.echo("✅ Contadores consistentes")
+        return
+    for d in diferencias:
+        click.echo(f"⚠️  {d['ambito']}:{d['id_ambito']} {d['metrica']} esperado={d['esperado']} actual={d['actual']}")
+    click.echo(f"❌ {len(diferencias)} contadores inconsistentes (ejecuta 'contadores recalcular')")
+    sys.exit(1)
+
+
+@contadores_cli.command('notificaciones')
+def recalcular_no_leidas():
+    """Reconstruye el contador de notificaciones no leídas por usuario"""
+    from app.models.notification_model import NotificationModel
+    usuarios = NotificationModel().recalcular_no_leidas()
+    if usuarios is None:
+        sys.exit(1)
+    click.echo(f"✅ No leídas recalculadas para {usuarios} usuarios")
+
+
+@esquema_cli.command('migrar')
+def migrar_esquema():
+    """Aplica las migraciones pendientes"""
+    from app.utils.database import Database
+    if not Database().crear_tablas_completas():
+        sys.exit(1)
+
+
+@esquema_cli.command('estado')
+def estado_esquema():
+    """Muestra la versión actual y las migraciones pendientes"""
+    from app.utils.database import Database
+    from app.utils.migraciones import version_actual, pendientes
+    conn = Database().conectar()
+    if not conn:
+        click.echo("❌ Sin conexión a la base de datos")
+        sys.exit(1)
+    cursor = conn.cursor()
+    try:
+        click.echo(f"📦 Versión del esquema: {version_actual(cursor)}")
+        for version, descripcion, _ in pendientes(cursor):
+            click.echo(f"⏳ Pendiente {version}: {descripcion}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@esquema_cli.command('verificar-indices')
+def verificar_indices():
+    """EXPLAIN de las consultas críticas; falla si alguna recorre la tabla sin índice"""
+    from app.utils.database import Database
+    from app.utils.migraciones import verificar_planes
+    conn = Database().conectar()
+    if not conn:
+        click.echo("❌ Sin conexión a la base de datos")
+        sys.exit(1)
+    try:
+        recorridos = verificar_planes(conn)
+    finally:
+        conn.close()
+    fallos = [r for r in recorridos if r['fallo']]
+    for r in recorridos:
+        icono = "❌" if r['fallo'] else "⚠️ "
+        click.echo(f"{icono} {r['consulta']}: recorrido completo de {r['tabla']} "
+                   f"(~{r['filas']} filas, índices posibles: {r['indices_posibles'] or 'ninguno'})")
+    if fallos:
+        click.echo(f"❌ {len(fallos)} consultas críticas sin índice (ejecuta 'esquema migrar')")
+        sys.exit(1)
+    click.echo("✅ Todas las consultas críticas usan índices")
+
+
+@historial_cli.command('particiones')
+@click.option('--meses', default=2, show_default=True, help='Meses futuros con partición propia')
+def crear_particiones(meses):
+    """Crea por adelantado las particiones mensuales"""
+    from app.models.historial_model import HistorialModel
+    if HistorialModel().asegurar_particiones(meses) is None:
+        sys.exit(1)
+
+
+@historial_cli.command('archivar')
+@click.option('--meses', type=int, default=None, help='Meses a conservar en MySQL (HISTORIAL_RETENCION_MESES)')
+@click.option('--directorio', default=None, help='Destino de los .jsonl.gz (HISTORIAL_ARCHIVO_DIR)')
+def archivar_historial(meses, directorio):
+    """Archiva en disco y elimina las particiones fuera de la retención"""
+    from app.models.historial_model import HistorialModel, HISTORIAL_RETENCION_MESES, HISTORIAL_ARCHIVO_DIR
+    archivadas = HistorialModel().archivar(
+        HISTORIAL_RETENCION_MESES if meses is None else meses,
+        directorio or HISTORIAL_ARCHIVO_DIR
+    )
+    if archivadas is None:
+        click.echo("❌ Sin conexión a la base de datos")
+        sys.exit(1)
+    total = sum(a['filas'] for a in archivadas)
+    click.echo(f"✅ {len(archivadas)} particiones archivadas ({total} filas)")
+
+
+@trabajos_cli.command('servir')
+def servir_trabajos():
+    """Ejecuta el planificador en primer plano (proceso aparte, PLANIFICADOR=externo en la web)"""
+    from app.services import trabajos  # noqa: F401 (registra los trabajos)
+    from app.services.planificador import planificador
+    click.echo(f"⏱️  Planificador activo: {', '.join(planificador.trabajos())}")
+    planificador.servir()
+
+
+@trabajos_cli.command('ejecutar')
+@click.argument('nombre')
+def ejecutar_trabajo(nombre):
+    """Ejecuta un trabajo ahora, respetando el bloqueo de líder"""
+    from app.services import trabajos  # noqa: F401
+    from app.services.planificador import planificador
+    if nombre not in planificador.trabajos():
+        click.echo(f"❌ Trabajo desconocido: {nombre} (disponibles: {', '.join(planificador.trabajos())})")
+        sys.exit(1)
+    ejecucion = planificador.ejecutar(nombre, forzar=True)
+    click.echo(f"{'✅' if ejecucion['estado'] == 'ok' else '⚠️ '} {nombre}: {ejecucion}")
+    if ejecucion['estado'] == 'error':
+        sys.exit(1)
+
+
+@reportes_cli.command('benchmark')
+@click.option('--filas', default=50, show_default=True, help='Registros sintéticos por reporte')
+@click.option('--repeticiones', default=20, show_default=True, help='Dibujos por medición')
+def benchmark_reportes(filas, repeticiones):
+    """Tiempo de dibujo por petición: plantillas compiladas frente a estilos por petición"""
+    from app.services.reportes_pdf import ESPECIFICACIONES, medir
+    for tipo in ESPECIFICACIONES:
+        r = medir(tipo, filas, repeticiones)
+        mejora = (1 - r['compilada_ms'] / r['por_peticion_ms']) * 100 if r['por_peticion_ms'] else 0
+        click.echo(f"📄 {tipo:<18} por petición {r['por_peticion_ms']:>8.2f} ms | "
+                   f"compilada {r['compilada_ms']:>8.2f} ms | {mejora:+.0f}%")
+
+
+@contrasenas_cli.command('benchmark')
+@click.option('--metodo', 'metodos', multiple=True,
+              help='Método scrypt:N:r:p a medir (repetible; por defecto N de 2^14 a 2^17)')
+@click.option('--segundos', default=1.0, show_default=True, help='Duración de cada medición')
+def benchmark_contrasenas(metodos, segundos):
+    """Logins por segundo y núcleo con cada coste de scrypt"""
+    from app.utils.contrasenas import PASSWORD_HASH_METODO, PASSWORD_HASH_PROCESOS, medir
+    metodos = metodos or [f'scrypt:{2 ** e}:8:1' for e in range(14, 18)]
+    for r in medir(metodos, segundos):
+        actual = ' ← actual' if r['metodo'] == PASSWORD_HASH_METODO else ''
+        click.echo(f"🔐 {r['metodo']:<18} {r['memoria_mib']:>5.0f} MiB | {r['ms_por_login']:>7.1f} ms/login | "
+                   f"{r['logins_por_segundo']:>6.1f} logins/s por núcleo{actual}")
+    click.echo(f"   Pool: {PASSWORD_HASH_PROCESOS} procesos por worker "
+               f"(PASSWORD_HASH_METODO={PASSWORD_HASH_METODO})")
+
+
+@miembros_cli.command('reconstruir')
+def reconstruir_miembros():
+    """Reconstruye proyecto_miembros desde las tareas activas y los líderes"""
+    from app.models.miembros_model import MiembrosModel
+    if MiembrosModel().reconstruir() is None:
+        sys.exit(1)
+
+
+def registrar_comandos(app):
+    """Registra los grupos de comandos en la CLI de Flask"""
+    app.cli.add_command(contadores_cli)
+    app.cli.add_command(esquema_cli)
+    app.cli.add_command(historial_cli)
+    app.cli.add_command(trabajos_cli)
+    app.cli.add_command(reportes_cli)
+    app.cli.add_command(contrasenas_cli)
+    app.cli.add_command(miembros_cli)
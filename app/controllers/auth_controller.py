@@ -3,6 +3,8 @@
 from flask import Blueprint, render_template, request, redirect, flash, url_for
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models.usuario_model import UsuarioModel
+from app.utils.contrasenas import HashSaturadoError
+from app.utils.limite_login import limitador_login
 from app.utils.helpers import registrar_actividad
 
 auth_bp = Blueprint('auth', __name__)
@@ -27,12 +29,25 @@ def login():
             flash('Por favor, completa todos los campos', 'danger')
             return render_template('login.html')
         
+        # Intentos por IP y por email: el exceso se descarta antes de llegar a MySQL
+        espera = limitador_login.comprobar(request.remote_addr, email.lower())
+        if espera:
+            flash(f'Demasiados intentos de inicio de sesión. Inténtalo de nuevo en {espera} segundos', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(espera)}
+        
         usuario_model = UsuarioModel()
-        usuario = usuario_model.verificar_login(email, password)
+        try:
+            usuario = usuario_model.verificar_login(email, password)
+        except HashSaturadoError:
+            # Ráfaga de logins: se rechaza en vez de bloquear el worker
+            flash('Hay muchos inicios de sesión en este momento, inténtalo de nuevo en unos segundos', 'warning')
+            return render_template('login.html'), 503
+        limitador_login.registrar(request.remote_addr, email.lower(), usuario is not None)
         
         if usuario:
             # ⚠️ CORRECCIÓN: Usar login_user correctamente
             login_user(usuario, remember=True)
+            usuario_model.registrar_acceso(usuario.id)
             registrar_actividad(usuario.id, 'Inicio de sesión exitoso')
             flash(f'¡Bienvenido {usuario.nombre}!', 'success')
             
@@ -1,12 +1,19 @@
 # [file name]: chat_controller.py
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models.chat_model import ChatModel
 from app.models.usuario_model import UsuarioModel
 from app.utils.helpers import registrar_actividad
+from app.services.chat_gateway import generar_token
+import os
 
 chat_bp = Blueprint('chat', __name__)
 
+MENSAJES_POR_PAGINA = 100
+
+# Gateway WebSocket (chat_gateway.py); sin él la página sincroniza con /api/chat/mensajes
+CHAT_WS_URL = os.environ.get('CHAT_WS_URL', '')
+
 @chat_bp.route('/chat')
 @login_required
 def chat_team():
@@ -15,17 +22,20 @@ def chat_team():
         chat_model = ChatModel()
         usuario_model = UsuarioModel()
         
-        # Obtener mensajes
-        mensajes = chat_model.obtener_mensajes(100)  # Más mensajes
+        # Obtener los mensajes más recientes; el resto se pide con before_id
+        mensajes = chat_model.obtener_mensajes(MENSAJES_POR_PAGINA)
         print(f"🔍 Debug: {len(mensajes)} mensajes cargados")  # Debug
         
         # Obtener usuarios activos
-        usuarios_activos = usuario_model.obtener_usuarios_activos()
+        usuarios_activos = usuario_model.listar_para_selector()
         
         return render_template('chat.html', 
                              mensajes=mensajes, 
+                             hay_anteriores=len(mensajes) == MENSAJES_POR_PAGINA,
                              usuarios_activos=usuarios_activos,
-                             current_user_id=current_user.id)
+                             current_user_id=current_user.id,
+                             chat_ws_url=CHAT_WS_URL,
+                             chat_ws_token=generar_token(current_app.config['SECRET_KEY'], current_user) if CHAT_WS_URL else '')
     except Exception as e:
         print(f"❌ Error en chat_team: {e}")
         flash('Error al cargar el chat', 'danger')
@@ -89,14 +99,23 @@ def eliminar_mensaje(id_mensaje):
 @chat_bp.route('/api/chat/mensajes')
 @login_required
 def api_obtener_mensajes():
-    """API para obtener mensajes (para AJAX)"""
+    """API de mensajes: after_id devuelve solo los nuevos, before_id el historial anterior"""
     try:
+        after_id = request.args.get('after_id', type=int)
+        before_id = request.args.get('before_id', type=int)
+        limite = max(1, min(request.args.get('limite', MENSAJES_POR_PAGINA, type=int), MENSAJES_POR_PAGINA))
+        
         chat_model = ChatModel()
-        mensajes = chat_model.obtener_mensajes(100)
-        return jsonify({
+        mensajes = chat_model.obtener_mensajes(limite, after_id=after_id, before_id=before_id)
+        respuesta = {
             'success': True,
-            'mensajes': mensajes
-        })
+            'mensajes': mensajes,
+            'ultimo_id': mensajes[-1]['id'] if mensajes else after_id,
+            'hay_mas': len(mensajes) == limite
+        }
+        if request.args.get('html'):
+            respuesta['html'] = render_template('components/mensajes_chat.html', mensajes=mensajes)
+        return jsonify(respuesta)
     except Exception as e:
         return jsonify({
             'success': False,
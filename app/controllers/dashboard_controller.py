@@ -2,7 +2,7 @@ from flask import Blueprint, render_template
 from flask_login import login_required, current_user
 from app.models.proyecto_model import ProyectoModel
 from app.models.tarea_model import TareaModel
-from app.models.usuario_model import UsuarioModel
+from app.services.stats_service import StatsService
 
 # DEFINIR EL BLUEPRINT - ESTO DEBE ESTAR PRESENTE
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -12,14 +12,10 @@ dashboard_bp = Blueprint('dashboard', __name__)
 def tablero():
     proyecto_model = ProyectoModel()
     tarea_model = TareaModel()
-    usuario_model = UsuarioModel()
+    stats_service = StatsService()
     
-    # ... resto del código del dashboard ...
-    
-    # Obtener estadísticas reales
-    stats_proyectos = proyecto_model.obtener_estadisticas()
-    stats_tareas = tarea_model.obtener_estadisticas()
-    usuarios = usuario_model.obtener_usuarios_activos()
+    # Todos los contadores en una sola consulta
+    stats = stats_service.obtener_dashboard()
     
     # Proyectos recientes
     proyectos_recientes = proyecto_model.obtener_recientes(3)
@@ -28,21 +24,21 @@ def tablero():
     if current_user.rol == 'Colaborador':
         mis_tareas = tarea_model.obtener_por_usuario(current_user.id, 5)
     else:
-        mis_tareas = tarea_model.obtener_todas()[:5]
+        mis_tareas, _ = tarea_model.obtener_pagina(5)
     
     # Métricas para estadísticas
     metricas = {
-        'tareas_pendientes': tarea_model.contar_tareas_por_estado('pendiente'),
-        'tareas_en_progreso': tarea_model.contar_tareas_por_estado('en_progreso'),
-        'tareas_completadas': tarea_model.contar_tareas_por_estado('completada'),
-        'tareas_totales': stats_tareas['total_tareas']
+        'tareas_pendientes': stats.tareas_pendientes,
+        'tareas_en_progreso': stats.tareas_en_progreso,
+        'tareas_completadas': stats.tareas_completadas,
+        'tareas_totales': stats.total_tareas
     }
     
     return render_template('tablero.html',
-                         total_proyectos=stats_proyectos['total_proyectos'],
-                         total_tareas=stats_tareas['total_tareas'],
-                         tareas_completadas=stats_tareas['tareas_completadas'],
-                         total_usuarios=len(usuarios),
+                         total_proyectos=stats.total_proyectos,
+                         total_tareas=stats.total_tareas,
+                         tareas_completadas=stats.tareas_completadas,
+                         total_usuarios=stats.total_usuarios,
                          proyectos_recientes=proyectos_recientes,
                          mis_tareas=mis_tareas,
                          metricas=metricas)
\ No newline at end of file
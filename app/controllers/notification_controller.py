@@ -1,10 +1,27 @@
 # [file name]: notification_controller.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_login import login_required, current_user
 from app.models.notification_model import NotificationModel
+from app.utils import eventos
+import json
+import os
+import threading
+import time
 
 notification_bp = Blueprint('notificaciones', __name__)
 
+# Cada stream ocupa un hilo del worker: se cierra periódicamente y el navegador
+# se reconecta solo (enviando Last-Event-ID)
+SSE_DURACION_MAXIMA = float(os.environ.get('SSE_DURACION_MAXIMA', '300'))
+# Streams abiertos a la vez en este proceso: deja libre al menos la mitad de los 32
+# hilos de gunicorn para las páginas; por encima el navegador vuelve al polling
+SSE_STREAMS_MAXIMOS = int(os.environ.get('SSE_STREAMS_MAXIMOS', '16'))
+SSE_LATIDO = 15
+SSE_REINTENTO_MS = 3000
+NOTIFICACIONES_POR_PAGINA = 20
+
+_streams = threading.BoundedSemaphore(SSE_STREAMS_MAXIMOS)
+
 @notification_bp.route('/api/notificaciones')
 @login_required
 def obtener_notificaciones():
@@ -19,6 +36,102 @@ def contar_notificaciones():
     count = notification_model.contar_no_leidas(current_user.id)
     return jsonify({'count': count})
 
+@notification_bp.route('/api/notificaciones/feed')
+@login_required
+def feed_notificaciones():
+    """Historial paginado de notificaciones (cursor keyset, de la más nueva a la más antigua)"""
+    limite = max(1, min(request.args.get('limite', NOTIFICACIONES_POR_PAGINA, type=int), 100))
+    try:
+        notificaciones, siguiente_cursor = NotificationModel().obtener_feed(
+            current_user.id, limite, request.args.get('cursor'),
+            solo_no_leidas=request.args.get('no_leidas') == '1'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'notificaciones': notificaciones,
+        'siguiente_cursor': siguiente_cursor
+    })
+
+def _evento_sse(tipo, datos, id_evento=None):
+    """Formatea un evento según el protocolo text/event-stream"""
+    lineas = []
+    if id_evento is not None:
+        lineas.append(f"id: {id_evento}")
+    lineas.append(f"event: {tipo}")
+    lineas.append(f"data: {json.dumps(datos, default=str)}")
+    return "\n".join(lineas) + "\n\n"
+
+@notification_bp.route('/api/notificaciones/stream')
+@login_required
+def stream_notificaciones():
+    """Server-Sent Events con las notificaciones del usuario (sustituye al polling)"""
+    # Sin hueco libre: 503 cierra el EventSource y el cliente pasa a /contar
+    if not _streams.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'Demasiados streams abiertos'}), 503, {'Retry-After': '300'}
+    try:
+        ultimo_id = request.headers.get('Last-Event-ID', type=int)
+        suscripcion, pendientes = eventos.suscribir(eventos.canal_usuario(current_user.id), ultimo_id)
+    except Exception:
+        _streams.release()
+        raise
+    liberado = threading.Lock()
+    
+    def liberar():
+        # Una sola vez aunque lo llamen el cierre y el error a la vez; cancelar es idempotente
+        # y cubre el caso en que el generador nunca empezó (su finally no llega a ejecutarse)
+        if liberado.acquire(blocking=False):
+            eventos.cancelar(suscripcion)
+            _streams.release()
+    
+    try:
+        return _abrir_stream(suscripcion, pendientes, liberar)
+    except Exception:
+        liberar()
+        raise
+
+def _abrir_stream(suscripcion, pendientes, liberar):
+    # Sin historial desde el que reanudar se envía el estado completo.
+    # La consulta se hace aquí: la conexión del request vuelve al pool antes del stream
+    estado = None
+    if not pendientes:
+        estado = {
+            'no_leidas': NotificationModel().contar_no_leidas(current_user.id),
+            'recargar': pendientes is None
+        }
+    
+    def generar():
+        try:
+            yield f"retry: {SSE_REINTENTO_MS}\n\n"
+            if estado is not None:
+                yield _evento_sse('estado', estado)
+            for id_evento, tipo, datos in pendientes or []:
+                yield _evento_sse(tipo, datos, id_evento)
+            
+            fin = time.monotonic() + SSE_DURACION_MAXIMA
+            while time.monotonic() < fin:
+                evento = suscripcion.siguiente(SSE_LATIDO)
+                if suscripcion.desbordada:
+                    yield _evento_sse('estado', {'recargar': True})
+                    break
+                if evento is None:
+                    # Comentario SSE: mantiene viva la conexión y detecta clientes cerrados
+                    yield ": ping\n\n"
+                    continue
+                id_evento, tipo, datos = evento
+                yield _evento_sse(tipo, datos, id_evento)
+        finally:
+            eventos.cancelar(suscripcion)
+    
+    respuesta = Response(generar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # close() del servidor WSGI llega aunque el generador no llegue a empezar
+    respuesta.call_on_close(liberar)
+    return respuesta
+
 @notification_bp.route('/api/notificaciones/leer/<int:id_notificacion>', methods=['POST'])
 @login_required
 def marcar_como_leida(id_notificacion):
@@ -1,19 +1,24 @@
 # [file name]: reportes_controller.py
-from flask import Blueprint, render_template, request, flash, redirect, url_for, make_response
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, send_file, abort, Response
 from flask_login import login_required, current_user
 from app.models.proyecto_model import ProyectoModel
 from app.models.tarea_model import TareaModel
-from app.models.usuario_model import UsuarioModel
-from app.models.config_model import ConfigModel
+from app.models.productividad_model import ProductividadModel
+from app.services.stats_service import StatsService
+from app.services.reportes import cola_reportes, TIPOS
 from app.utils.helpers import roles_required, registrar_actividad
-from datetime import datetime, timedelta
+from datetime import datetime
+import csv
 import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
+import json
+import os
+
+# Segundos que una descarga directa espera al PDF antes de volver a /reportes. La espera
+# ocupa uno de los hilos del worker, así que se acota a unos segundos: si no termina,
+# el PDF sigue en la cola y el siguiente clic lo descarga desde la caché
+REPORTES_ESPERA_MAXIMA = 5
+REPORTES_ESPERA_SINCRONA = min(float(os.environ.get('REPORTES_ESPERA_SINCRONA', '3')), REPORTES_ESPERA_MAXIMA)
+TAREAS_POR_LOTE_EXPORTACION = 1000
 
 reportes_bp = Blueprint('reportes', __name__)
 
@@ -23,24 +28,21 @@ def dashboard_reportes():
     """Dashboard principal de reportes y métricas"""
     proyecto_model = ProyectoModel()
     tarea_model = TareaModel()
-    usuario_model = UsuarioModel()
-    config_model = ConfigModel()
+    stats_service = StatsService()
     
-    # Obtener estadísticas generales
-    stats_proyectos = proyecto_model.obtener_estadisticas()
-    stats_tareas = tarea_model.obtener_estadisticas()
-    usuarios = usuario_model.obtener_usuarios_activos()
+    # Obtener estadísticas generales (una sola consulta)
+    stats = stats_service.obtener_dashboard()
     
     # Métricas detalladas
-    tareas_pendientes = tarea_model.contar_tareas_por_estado('pendiente')
-    tareas_en_progreso = tarea_model.contar_tareas_por_estado('en_progreso')
-    tareas_completadas = stats_tareas['tareas_completadas']
-    total_tareas = stats_tareas['total_tareas']
+    tareas_pendientes = stats.tareas_pendientes
+    tareas_en_progreso = stats.tareas_en_progreso
+    tareas_completadas = stats.tareas_completadas
+    total_tareas = stats.total_tareas
     
     # Calcular porcentajes
-    porcentaje_completadas = (tareas_completadas / total_tareas * 100) if total_tareas > 0 else 0
-    porcentaje_en_progreso = (tareas_en_progreso / total_tareas * 100) if total_tareas > 0 else 0
-    porcentaje_pendientes = (tareas_pendientes / total_tareas * 100) if total_tareas > 0 else 0
+    porcentaje_completadas = stats.porcentaje(tareas_completadas)
+    porcentaje_en_progreso = stats.porcentaje(tareas_en_progreso)
+    porcentaje_pendientes = stats.porcentaje(tareas_pendientes)
     
     # Proyectos recientes
     proyectos_recientes = proyecto_model.obtener_recientes(5)
@@ -49,7 +51,7 @@ def dashboard_reportes():
     if current_user.rol == 'Colaborador':
         tareas_recientes = tarea_model.obtener_por_usuario(current_user.id, 10)
     else:
-        tareas_recientes = tarea_model.obtener_todas()[:10]
+        tareas_recientes, _ = tarea_model.obtener_pagina(10)
     
     # Reportes predefinidos
     reportes_disponibles = [
@@ -92,13 +94,13 @@ def dashboard_reportes():
     ]
     
     return render_template('reportes.html',
-                         total_proyectos=stats_proyectos['total_proyectos'],
-                         proyectos_activos=stats_proyectos['total_proyectos'],  # Todos están activos
+                         total_proyectos=stats.total_proyectos,
+                         proyectos_activos=stats.total_proyectos,  # Todos están activos
                          total_tareas=total_tareas,
                          tareas_completadas=tareas_completadas,
                          tareas_pendientes=tareas_pendientes,
                          tareas_en_progreso=tareas_en_progreso,
-                         team_members=len(usuarios),
+                         team_members=stats.total_usuarios,
                          porcentaje_completadas=porcentaje_completadas,
                          porcentaje_en_progreso=porcentaje_en_progreso,
                          porcentaje_pendientes=porcentaje_pendientes,
@@ -106,304 +108,192 @@ def dashboard_reportes():
                          tareas_recientes=tareas_recientes,
                          reportes_disponibles=reportes_disponibles)
 
+def _usuario_reporte():
+    """Datos del usuario que necesita el proceso que dibuja el PDF"""
+    return {'id': current_user.id, 'nombre': current_user.nombre, 'rol': current_user.rol}
+
+def _trabajo_publico(trabajo):
+    """Estado del trabajo sin rutas internas del servidor"""
+    datos = {clave: trabajo.get(clave) for clave in ('id', 'tipo', 'estado', 'cache', 'error')}
+    datos['url_estado'] = url_for('reportes.estado_reporte', id_trabajo=trabajo['id'])
+    if trabajo['estado'] == 'listo':
+        datos['url_descarga'] = url_for('reportes.descargar_reporte', id_trabajo=trabajo['id'])
+    return datos
+
+def _enviar_reporte(tipo):
+    trabajo = cola_reportes.enviar(tipo, _usuario_reporte())
+    registrar_actividad(current_user.id, TIPOS[tipo].actividad, 'reportes')
+    return trabajo
+
+def responder_reporte(tipo):
+    """Descarga directa (enlaces sin JavaScript): encola y espera un tiempo acotado"""
+    try:
+        trabajo = _enviar_reporte(tipo)
+    except RuntimeError:
+        flash('No se pudo generar el reporte: base de datos no disponible', 'danger')
+        return redirect(url_for('reportes.dashboard_reportes'))
+    trabajo = cola_reportes.esperar(trabajo['id'], REPORTES_ESPERA_SINCRONA)
+    if trabajo['estado'] == 'listo':
+        return send_file(trabajo['archivo'], mimetype='application/pdf',
+                         as_attachment=True, download_name=trabajo['nombre'])
+    if trabajo['estado'] == 'error':
+        flash(f"Error al generar el reporte: {trabajo['error']}", 'danger')
+    else:
+        flash('El reporte sigue generándose; vuelve a descargarlo en unos segundos', 'warning')
+    return redirect(url_for('reportes.dashboard_reportes'))
+
 @reportes_bp.route('/reportes/proyectos/pdf')
 @login_required
 def generar_reporte_proyectos_pdf():
     """Genera reporte PDF de proyectos"""
-    proyecto_model = ProyectoModel()
-    proyectos = proyecto_model.obtener_todos()
-    
-    # Crear PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch, bottomMargin=1*inch)
-    elements = []
-    
-    # Estilos
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        textColor=colors.HexColor('#7c3aed')
-    )
-    
-    # Título
-    title = Paragraph("REPORTE DE PROYECTOS - STARTASK", title_style)
-    elements.append(title)
-    
-    # Información del reporte
-    info_text = f"""
-    <b>Generado por:</b> {current_user.nombre}<br/>
-    <b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
-    <b>Total de proyectos:</b> {len(proyectos)}<br/>
-    """
-    info = Paragraph(info_text, styles['Normal'])
-    elements.append(info)
-    elements.append(Spacer(1, 20))
-    
-    # Tabla de proyectos
-    if proyectos:
-        data = [['Nombre', 'Líder', 'Descripción', 'Fecha Creación']]
-        
-        for proyecto in proyectos:
-            descripcion = proyecto['descripcion'][:100] + '...' if len(proyecto['descripcion']) > 100 else proyecto['descripcion']
-            fecha = proyecto['fecha_creacion'].strftime('%d/%m/%Y') if proyecto['fecha_creacion'] else 'N/A'
-            data.append([
-                proyecto['nombre'],
-                proyecto.get('lider_nombre', 'N/A'),
-                descripcion,
-                fecha
-            ])
-        
-        table = Table(data, colWidths=[120, 80, 180, 80])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(table)
-    else:
-        elements.append(Paragraph("No hay proyectos activos", styles['Normal']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    # Registrar actividad
-    registrar_actividad(current_user.id, "Generó reporte PDF de proyectos", 'reportes')
-    
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=reporte_proyectos_{datetime.now().strftime("%Y%m%d")}.pdf'
-    return response
+    return responder_reporte('proyectos')
 
 @reportes_bp.route('/reportes/tareas/pdf')
 @login_required
 def generar_reporte_tareas_pdf():
     """Genera reporte PDF de tareas"""
-    tarea_model = TareaModel()
-    proyecto_model = ProyectoModel()
-    
-    if current_user.rol == 'Colaborador':
-        tareas = tarea_model.obtener_por_usuario(current_user.id)
-    else:
-        tareas = tarea_model.obtener_todas()
-    
-    # Crear PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        textColor=colors.HexColor('#7c3aed')
-    )
-    
-    # Título
-    title = Paragraph("REPORTE DE TAREAS - STARTASK", title_style)
-    elements.append(title)
-    
-    # Estadísticas
-    stats = tarea_model.obtener_estadisticas()
-    stats_text = f"""
-    <b>Generado por:</b> {current_user.nombre}<br/>
-    <b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
-    <b>Total de tareas:</b> {stats['total_tareas']}<br/>
-    <b>Tareas completadas:</b> {stats['tareas_completadas']}<br/>
-    <b>Tasa de finalización:</b> {(stats['tareas_completadas']/stats['total_tareas']*100) if stats['total_tareas'] > 0 else 0:.1f}%<br/>
-    """
-    elements.append(Paragraph(stats_text, styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Tabla de tareas
-    if tareas:
-        data = [['Título', 'Proyecto', 'Asignado', 'Estado', 'Prioridad', 'Vencimiento']]
-        
-        for tarea in tareas:
-            fecha_vencimiento = tarea['fecha_vencimiento'].strftime('%d/%m/%Y') if tarea['fecha_vencimiento'] else 'No definida'
-            data.append([
-                tarea['titulo'][:30],
-                tarea.get('proyecto_nombre', 'N/A')[:20],
-                tarea.get('asignado_nombre', 'N/A')[:20],
-                tarea['estado'].replace('_', ' ').title(),
-                tarea['prioridad'].title(),
-                fecha_vencimiento
-            ])
-        
-        table = Table(data, colWidths=[100, 80, 80, 60, 50, 70])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 7),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(table)
-    else:
-        elements.append(Paragraph("No hay tareas para mostrar", styles['Normal']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    registrar_actividad(current_user.id, "Generó reporte PDF de tareas", 'reportes')
-    
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=reporte_tareas_{datetime.now().strftime("%Y%m%d")}.pdf'
-    return response
+    return responder_reporte('tareas')
 
 @reportes_bp.route('/reportes/equipo/pdf')
 @login_required
 @roles_required('Administrador', 'Líder de Proyecto')
 def generar_reporte_equipo_pdf():
     """Genera reporte PDF del equipo"""
-    usuario_model = UsuarioModel()
-    tarea_model = TareaModel()
-    config_model = ConfigModel()
-    
-    usuarios = usuario_model.obtener_usuarios_activos()
-    
-    # Crear PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        textColor=colors.HexColor('#7c3aed')
-    )
-    
-    # Título
-    title = Paragraph("REPORTE DE EQUIPO - STARTASK", title_style)
-    elements.append(title)
-    
-    # Información del equipo
-    info_text = f"""
-    <b>Generado por:</b> {current_user.nombre}<br/>
-    <b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
-    <b>Total de miembros:</b> {len(usuarios)}<br/>
-    """
-    elements.append(Paragraph(info_text, styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Tabla de miembros
-    if usuarios:
-        data = [['Nombre', 'Email', 'Rol', 'Tareas Asignadas', 'Tareas Completadas']]
-        
-        for usuario in usuarios:
-            tareas_usuario = tarea_model.obtener_por_usuario(usuario.id)
-            tareas_completadas = len([t for t in tareas_usuario if t['estado'] == 'completada'])
-            
-            data.append([
-                usuario.nombre,
-                usuario.email,
-                usuario.rol,
-                str(len(tareas_usuario)),
-                str(tareas_completadas)
-            ])
-        
-        table = Table(data, colWidths=[100, 120, 80, 60, 60])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(table)
-    else:
-        elements.append(Paragraph("No hay miembros en el equipo", styles['Normal']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    registrar_actividad(current_user.id, "Generó reporte PDF del equipo", 'reportes')
-    
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=reporte_equipo_{datetime.now().strftime("%Y%m%d")}.pdf'
-    return response
+    return responder_reporte('equipo')
+
+# Columnas de la exportación de tareas (mismo orden en CSV y NDJSON)
+COLUMNAS_EXPORTACION = ['id', 'titulo', 'descripcion', 'proyecto_nombre', 'asignado_nombre',
+                        'estado', 'prioridad', 'fecha_vencimiento', 'fecha_creacion']
+
+def _exportar_tareas(formato, filtros):
+    """Genera la exportación fila a fila; en memoria solo hay una página de tareas"""
+    if formato == 'csv':
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(COLUMNAS_EXPORTACION)
+        yield '\ufeff' + buffer.getvalue()  # BOM para que Excel detecte UTF-8
+    for tarea in TareaModel().iterar(tamano_pagina=TAREAS_POR_LOTE_EXPORTACION, **filtros):
+        valores = [tarea.get(columna) for columna in COLUMNAS_EXPORTACION]
+        if formato == 'csv':
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerow(['' if valor is None else valor for valor in valores])
+            yield buffer.getvalue()
+        else:
+            yield json.dumps(dict(zip(COLUMNAS_EXPORTACION, valores)), default=str, ensure_ascii=False) + '\n'
+
+@reportes_bp.route('/reportes/tareas.csv', defaults={'formato': 'csv'})
+@reportes_bp.route('/reportes/tareas.ndjson', defaults={'formato': 'ndjson'})
+@login_required
+def exportar_tareas(formato):
+    """Exportación completa de tareas en streaming (CSV o NDJSON)"""
+    filtros = {
+        'id_proyecto': request.args.get('id_proyecto', type=int),
+        'estado': request.args.get('estado')
+    }
+    if current_user.rol == 'Colaborador':
+        filtros['id_asignado'] = current_user.id
+    registrar_actividad(current_user.id, f"Exportó tareas en {formato.upper()}", 'reportes')
+    
+    # El generador corre fuera del contexto del request: cada página usa su propia conexión
+    nombre = f"tareas_{datetime.now().strftime('%Y%m%d')}.{formato}"
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    return Response(_exportar_tareas(formato, filtros), mimetype=f'{mimetype}; charset=utf-8', headers={
+        'Content-Disposition': f'attachment; filename={nombre}',
+        'X-Accel-Buffering': 'no'
+    })
+
+@reportes_bp.route('/api/reportes/<tipo>', methods=['POST'])
+@login_required
+def enviar_reporte(tipo):
+    """Encola un reporte PDF; responde con el id del trabajo para consultar su estado"""
+    if tipo not in TIPOS:
+        return jsonify({'success': False, 'error': 'Reporte desconocido'}), 404
+    if TIPOS[tipo].roles and current_user.rol not in TIPOS[tipo].roles:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+    try:
+        trabajo = _enviar_reporte(tipo)
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify(dict(_trabajo_publico(trabajo), success=True)), 202
+
+@reportes_bp.route('/api/reportes/trabajos/<id_trabajo>')
+@login_required
+def estado_reporte(id_trabajo):
+    trabajo = cola_reportes.estado(id_trabajo)
+    if not trabajo or trabajo['id_usuario'] != current_user.id:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    return jsonify(dict(_trabajo_publico(trabajo), success=True))
+
+@reportes_bp.route('/reportes/trabajos/<id_trabajo>/descargar')
+@login_required
+def descargar_reporte(id_trabajo):
+    trabajo = cola_reportes.estado(id_trabajo)
+    if not trabajo or trabajo['id_usuario'] != current_user.id or trabajo['estado'] != 'listo':
+        abort(404)
+    return send_file(trabajo['archivo'], mimetype='application/pdf',
+                     as_attachment=True, download_name=trabajo['nombre'])
 
 @reportes_bp.route('/reportes/productividad')
 @login_required
 def reporte_productividad():
     """Vista de métricas de productividad"""
-    proyecto_model = ProyectoModel()
     tarea_model = TareaModel()
-    usuario_model = UsuarioModel()
-    
-    # Obtener datos para métricas
-    proyectos = proyecto_model.obtener_todos()
-    tareas = tarea_model.obtener_todas()
-    usuarios = usuario_model.obtener_usuarios_activos()
-    
-    # Calcular métricas avanzadas
-    total_tareas = len(tareas)
-    tareas_completadas = len([t for t in tareas if t['estado'] == 'completada'])
-    tareas_vencidas = len([t for t in tareas if t['fecha_vencimiento'] and t['fecha_vencimiento'] < datetime.now().date() and t['estado'] != 'completada'])
+    productividad_model = ProductividadModel()
+    
+    # Métricas globales (una consulta) y agregados por usuario/proyecto
+    stats = StatsService().obtener_dashboard()
+    total_tareas = stats.total_tareas
+    tareas_completadas = stats.tareas_completadas
+    tareas_vencidas = stats.tareas_vencidas
+    
+    # Snapshot de ayer + delta de hoy; sin contadores se calcula desde las tareas
+    usuarios = productividad_model.obtener_usuarios()
+    if usuarios is None:
+        usuarios = tarea_model.obtener_productividad_usuarios()
+    proyectos = productividad_model.obtener_proyectos()
+    if proyectos is None:
+        proyectos = tarea_model.obtener_productividad_proyectos()
     
     # Eficiencia por usuario
-    eficiencia_usuarios = []
-    for usuario in usuarios:
-        tareas_usuario = tarea_model.obtener_por_usuario(usuario.id)
-        completadas = len([t for t in tareas_usuario if t['estado'] == 'completada'])
-        total = len(tareas_usuario)
-        eficiencia = (completadas / total * 100) if total > 0 else 0
-        
-        eficiencia_usuarios.append({
-            'usuario': usuario.nombre,
-            'rol': usuario.rol,
-            'tareas_asignadas': total,
-            'tareas_completadas': completadas,
-            'eficiencia': eficiencia
-        })
+    eficiencia_usuarios = [{
+        'usuario': fila['nombre'],
+        'rol': fila['rol'],
+        'tareas_asignadas': fila['tareas_asignadas'],
+        'tareas_completadas': fila['tareas_completadas'],
+        'completadas_hoy': fila.get('completadas_hoy'),
+        'eficiencia': fila['eficiencia']
+    } for fila in usuarios]
     
     # Proyectos con más tareas
-    proyectos_tareas = []
-    for proyecto in proyectos:
-        tareas_proyecto = [t for t in tareas if t['id_proyecto'] == proyecto['id']]
-        completadas_proyecto = len([t for t in tareas_proyecto if t['estado'] == 'completada'])
-        
-        proyectos_tareas.append({
-            'proyecto': proyecto['nombre'],
-            'total_tareas': len(tareas_proyecto),
-            'completadas': completadas_proyecto,
-            'porcentaje': (completadas_proyecto / len(tareas_proyecto) * 100) if len(tareas_proyecto) > 0 else 0
-        })
+    proyectos_tareas = [{
+        'proyecto': fila['nombre'],
+        'total_tareas': fila['total_tareas'],
+        'completadas': fila['completadas'],
+        'completadas_hoy': fila.get('completadas_hoy'),
+        'porcentaje': fila['porcentaje']
+    } for fila in proyectos]
     
     # Ordenar por eficiencia
     eficiencia_usuarios.sort(key=lambda x: x['eficiencia'], reverse=True)
     proyectos_tareas.sort(key=lambda x: x['porcentaje'], reverse=True)
     
+    # Tendencia de 90 días desde los snapshots, con hoy en vivo como último punto
+    tendencia = productividad_model.obtener_tendencia(90)
+    if tendencia:
+        tendencia.append({
+            'fecha': datetime.now().date(),
+            'total_tareas': total_tareas,
+            'completadas': tareas_completadas,
+            'vencidas': tareas_vencidas,
+            'tasa': stats.porcentaje(tareas_completadas)
+        })
+    
     return render_template('reporte_productividad.html',
                          total_tareas=total_tareas,
                          tareas_completadas=tareas_completadas,
                          tareas_vencidas=tareas_vencidas,
                          tasa_completadas=(tareas_completadas / total_tareas * 100) if total_tareas > 0 else 0,
                          eficiencia_usuarios=eficiencia_usuarios[:5],  # Top 5
-                         proyectos_tareas=proyectos_tareas[:5])  # Top 5
\ No newline at end of file
+                         proyectos_tareas=proyectos_tareas[:5],  # Top 5
+                         tendencia=tendencia)
\ No newline at end of file
@@ -0,0 +1,14 @@
+# [file name]: sistema_controller.py
+from flask import Blueprint, jsonify
+from flask_login import login_required
+from app.utils.helpers import roles_required
+from app.utils.metricas import obtener_metricas
+
+sistema_bp = Blueprint('sistema', __name__)
+
+@sistema_bp.route('/api/sistema/metricas')
+@login_required
+@roles_required('Administrador')
+def metricas():
+    """Métricas internas del worker (pool de conexiones, cachés, colas)"""
+    return jsonify(obtener_metricas())
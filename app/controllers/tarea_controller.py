@@ -4,9 +4,13 @@ from app.utils.helpers import roles_required, registrar_actividad
 from app.models.tarea_model import TareaModel
 from app.models.proyecto_model import ProyectoModel
 from app.models.usuario_model import UsuarioModel
+from datetime import datetime
 
 tarea_bp = Blueprint('tarea', __name__)
 
+TAREAS_POR_PAGINA = 50
+LIMITE_MAXIMO_API = 200
+
 @tarea_bp.route('/tareas')
 @login_required
 def listar_tareas():
@@ -14,15 +18,70 @@ def listar_tareas():
     proyecto_model = ProyectoModel()
     usuario_model = UsuarioModel()
     
+    filtros = {'id_asignado': current_user.id} if current_user.rol == 'Colaborador' else {}
+    
+    # Solo la primera página; el resto se carga bajo demanda desde /api/tareas
+    tareas, siguiente_cursor = tarea_model.obtener_pagina(TAREAS_POR_PAGINA, **filtros)
+    conteo_estados = tarea_model.contar_por_estado(**filtros)
+    
+    # Desplegables desde los datos de referencia en caché: solo se consultan las tareas
+    proyectos = proyecto_model.listar_para_selector()
+    usuarios = usuario_model.listar_para_selector()
+    
+    return render_template('tareas.html', 
+                         tareas=tareas, 
+                         siguiente_cursor=siguiente_cursor,
+                         conteo_estados=conteo_estados,
+                         total_tareas=sum(conteo_estados.values()),
+                         proyectos=proyectos, 
+                         usuarios=usuarios)
+
+def _fecha_param(nombre):
+    """Lee un parámetro YYYY-MM-DD de la URL; None si falta o no es válido"""
+    valor = request.args.get(nombre)
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+    except ValueError:
+        return None
+
+def _serializar_tarea(tarea):
+    """Convierte una fila de tarea en un dict apto para JSON"""
+    datos = {clave: valor for clave, valor in tarea.items() if clave != 'prioridad_orden'}
+    for clave in ('fecha_vencimiento', 'fecha_creacion'):
+        if datos.get(clave):
+            datos[clave] = datos[clave].isoformat()
+    return datos
+
+@tarea_bp.route('/api/tareas')
+@login_required
+def api_listar_tareas():
+    """API paginada de tareas (cursor keyset) con filtros"""
+    limite = max(1, min(request.args.get('limite', TAREAS_POR_PAGINA, type=int), LIMITE_MAXIMO_API))
+    filtros = {
+        'id_proyecto': request.args.get('id_proyecto', type=int),
+        'id_asignado': request.args.get('id_asignado', type=int),
+        'estado': request.args.get('estado'),
+        'vence_desde': _fecha_param('vence_desde'),
+        'vence_hasta': _fecha_param('vence_hasta')
+    }
     if current_user.rol == 'Colaborador':
-        tareas = tarea_model.obtener_por_usuario(current_user.id)
-    else:
-        tareas = tarea_model.obtener_todas()
+        filtros['id_asignado'] = current_user.id
     
-    proyectos = proyecto_model.obtener_todos()
-    usuarios = usuario_model.obtener_usuarios_activos()
+    tarea_model = TareaModel()
+    try:
+        tareas, siguiente_cursor = tarea_model.obtener_pagina(limite, request.args.get('cursor'), **filtros)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    return render_template('tareas.html', tareas=tareas, proyectos=proyectos, usuarios=usuarios)
+    respuesta = {
+        'success': True,
+        'tareas': [_serializar_tarea(tarea) for tarea in tareas],
+        'siguiente_cursor': siguiente_cursor
+    }
+    if request.args.get('html'):
+        # Filas ya renderizadas para la carga diferida de /tareas
+        respuesta['html'] = render_template('components/filas_tareas.html', tareas=tareas)
+    return jsonify(respuesta)
 
 @tarea_bp.route('/tareas/crear', methods=['POST'])
 @login_required
@@ -26,13 +26,61 @@ class ChatModel:
             print(f"❌ Error enviando mensaje: {e}")
             return False
     
-    def obtener_mensajes(self, limite=50):
-        """Obtiene los últimos mensajes del chat - CORREGIDO"""
+    def guardar_lote(self, mensajes):
+        """Guarda varios mensajes (y su actividad) en una sola transacción.
+        
+        `mensajes`: lista de dicts con id_usuario, mensaje y fecha. Devuelve los
+        ids asignados en el mismo orden, o None si falló.
+        """
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            # executemany envía un único INSERT multi-fila: InnoDB asigna ids consecutivos
+            # a un insert con número de filas conocido y lastrowid es el del primero
+            cursor.executemany("""
+                INSERT INTO mensajes_chat (id_usuario, mensaje, fecha_creacion)
+                VALUES (%s, %s, %s)
+            """, [(m['id_usuario'], m['mensaje'], m['fecha']) for m in mensajes])
+            ids = list(range(cursor.lastrowid, cursor.lastrowid + len(mensajes)))
+            cursor.executemany("""
+                INSERT INTO historial_actividades (id_usuario, accion, tabla_afectada, fecha)
+                VALUES (%s, %s, 'chat', %s)
+            """, [(m['id_usuario'], f"Envió un mensaje en el chat: {m['mensaje'][:50]}...", m['fecha'])
+                  for m in mensajes])
+            conn.commit()
+            return ids
+        except Exception as e:
+            print(f"❌ Error guardando lote de {len(mensajes)} mensajes: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+            conn.close()
+    
+    def obtener_mensajes(self, limite=50, after_id=None, before_id=None):
+        """Obtiene mensajes activos en orden cronológico.
+        
+        Sin cursores: los `limite` más recientes. after_id: solo los posteriores
+        (deltas del polling). before_id: la página anterior del historial.
+        """
         try:
             conn = self.db.conectar()
             if conn:
                 cursor = conn.cursor(dictionary=True)
-                cursor.execute("""
+                condiciones = ["mc.estado = 'activo'"]
+                params = []
+                if after_id is not None:
+                    condiciones.append("mc.id > %s")
+                    params.append(after_id)
+                if before_id is not None:
+                    condiciones.append("mc.id < %s")
+                    params.append(before_id)
+                # Los deltas avanzan desde after_id; el resto retrocede desde el más nuevo
+                orden = "ASC" if after_id is not None else "DESC"
+                cursor.execute(f"""
                     SELECT 
                         mc.*, 
                         u.nombre as usuario_nombre, 
@@ -40,14 +88,15 @@ class ChatModel:
                         DATE_FORMAT(mc.fecha_creacion, '%%H:%%i') as hora
                     FROM mensajes_chat mc
                     LEFT JOIN usuarios u ON mc.id_usuario = u.id
-                    WHERE mc.estado = 'activo'
-                    ORDER BY mc.fecha_creacion ASC
+                    WHERE {' AND '.join(condiciones)}
+                    ORDER BY mc.id {orden}
                     LIMIT %s
-                """, (limite,))
+                """, params + [limite])
                 mensajes = cursor.fetchall()
                 cursor.close()
                 conn.close()
-                print(f"✅ Mensajes obtenidos: {len(mensajes)}")  # Debug
+                if orden == "DESC":
+                    mensajes.reverse()
                 return mensajes
             return []
         except Exception as e:
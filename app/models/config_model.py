@@ -1,8 +1,21 @@
 # [file name]: config_model.py
 # [corrección completa]
 from app.utils.database import Database
+from app.models.usuario_model import cache_usuarios, cache_emails_desconocidos
+from app.utils.referencias import referencias
+from app.utils.cache import TTLCache
 from datetime import datetime, timedelta
 
+CONFIG_USUARIO_DEFECTO = {
+    'tema': 'light',
+    'notificaciones_email': 1,
+    'notificaciones_tareas': 1
+}
+
+# La configuración del sistema casi nunca cambia: se invalida al actualizarla
+cache_config_sistema = TTLCache('config_sistema', max_items=1, ttl=86400)
+cache_config_usuario = TTLCache('config_usuario', max_items=4096, ttl=3600)
+
 class ConfigModel:
     def __init__(self):
         self.db = Database()
@@ -39,25 +52,27 @@ class ConfigModel:
             conn.close()
     
     def obtener_config_usuario(self, id_usuario):
-        """Obtiene la configuración del usuario"""
+        """Obtiene la configuración del usuario (cacheada por id)"""
+        return cache_config_usuario.obtener_o_cargar(id_usuario, lambda: self._leer_config_usuario(id_usuario))
+    
+    def _leer_config_usuario(self, id_usuario):
+        """Lee la configuración del usuario; la fila se crea al registrar el usuario"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
             cursor.execute("SELECT * FROM config_usuario WHERE id_usuario = %s", (id_usuario,))
             config = cursor.fetchone()
-            if not config:
-                # Crear configuración por defecto
-                cursor.execute("INSERT INTO config_usuario (id_usuario) VALUES (%s)", (id_usuario,))
-                conn.commit()
-                cursor.execute("SELECT * FROM config_usuario WHERE id_usuario = %s", (id_usuario,))
-                config = cursor.fetchone()
             cursor.close()
             conn.close()
-            return config
+            return config or dict(CONFIG_USUARIO_DEFECTO, id_usuario=id_usuario)
         return None
     
     def obtener_config_sistema(self):
-        """Obtiene la configuración del sistema"""
+        """Obtiene la configuración del sistema (en memoria hasta que cambie)"""
+        return cache_config_sistema.obtener_o_cargar('sistema', self._leer_config_sistema)
+    
+    def _leer_config_sistema(self):
+        """Lee la configuración del sistema desde la base de datos"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
@@ -79,10 +94,14 @@ class ConfigModel:
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE config_usuario SET tema = %s WHERE id_usuario = %s", (tema, id_usuario))
+            cursor.execute("""
+                INSERT INTO config_usuario (id_usuario, tema) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE tema = VALUES(tema)
+            """, (id_usuario, tema))
             conn.commit()
             cursor.close()
             conn.close()
+            cache_config_usuario.invalidar(id_usuario)
             return True
         return False
     
@@ -92,13 +111,16 @@ class ConfigModel:
         if conn:
             cursor = conn.cursor()
             cursor.execute("""
-                UPDATE config_usuario 
-                SET notificaciones_email = %s, notificaciones_tareas = %s 
-                WHERE id_usuario = %s
-            """, (notificaciones_email, notificaciones_tareas, id_usuario))
+                INSERT INTO config_usuario (id_usuario, notificaciones_email, notificaciones_tareas)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE 
+                    notificaciones_email = VALUES(notificaciones_email), 
+                    notificaciones_tareas = VALUES(notificaciones_tareas)
+            """, (id_usuario, notificaciones_email, notificaciones_tareas))
             conn.commit()
             cursor.close()
             conn.close()
+            cache_config_usuario.invalidar(id_usuario)
             return True
         return False
     
@@ -120,6 +142,9 @@ class ConfigModel:
             conn.commit()
             cursor.close()
             conn.close()
+            cache_usuarios.invalidar(id_usuario)
+            cache_emails_desconocidos.invalidar(email.lower())
+            referencias.invalidar('usuarios')
             return True, "Cuenta actualizada correctamente"
         return False, "Error de conexión a la base de datos"
     
@@ -136,6 +161,7 @@ class ConfigModel:
             conn.commit()
             cursor.close()
             conn.close()
+            cache_config_sistema.invalidar('sistema')
             return True
         return False
     
@@ -151,7 +177,7 @@ class ConfigModel:
             cursor.execute("SELECT COUNT(*) as tareas_completadas FROM tareas WHERE id_asignado = %s AND estado = 'completada' AND estado_registro = 'activo'", (id_usuario,))
             tareas_completadas = cursor.fetchone()
             
-            cursor.execute("SELECT COUNT(DISTINCT id_proyecto) as proyectos_participando FROM tareas WHERE id_asignado = %s AND estado_registro = 'activo'", (id_usuario,))
+            cursor.execute("SELECT COUNT(*) as proyectos_participando FROM proyecto_miembros WHERE id_usuario = %s AND tareas > 0", (id_usuario,))
             proyectos_participando = cursor.fetchone()
             
             cursor.close()
@@ -240,20 +266,14 @@ class ConfigModel:
             return fecha.strftime('%d/%m/%Y')
     
     def obtener_ultimo_acceso(self, id_usuario):
-        """Obtiene el último acceso del usuario desde el historial"""
+        """Obtiene el último acceso del usuario (columna usuarios.ultimo_acceso)"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT fecha 
-                FROM historial_actividades 
-                WHERE id_usuario = %s AND accion LIKE '%Inicio de sesión%'
-                ORDER BY fecha DESC 
-                LIMIT 1
-            """, (id_usuario,))
+            cursor.execute("SELECT ultimo_acceso FROM usuarios WHERE id = %s", (id_usuario,))
             resultado = cursor.fetchone()
             cursor.close()
             conn.close()
-            if resultado:
-                return resultado['fecha']
+            if resultado and resultado['ultimo_acceso']:
+                return resultado['ultimo_acceso']
         return datetime.now()
\ No newline at end of file
@@ -0,0 +1,190 @@
+# [file name]: contadores_model.py
+# Contadores materializados de tareas/proyectos mantenidos en cada escritura
+from collections import Counter
+from app.utils.database import Database
+
+ESTADOS_TAREA = ('pendiente', 'en_progreso', 'completada')
+
+# Métricas globales que siempre existen tras un recálculo
+METRICAS_GLOBALES = ['tareas_total'] + [f'tareas_{estado}' for estado in ESTADOS_TAREA] + ['proyectos_activos']
+
+# Marca escrita solo por un recálculo completo: sin ella la tabla no es confiable
+METRICA_RECALCULADO = 'recalculado'
+
+
+def _entero(valor):
+    try:
+        return int(valor) if valor not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def contribucion_tarea(tarea, cantidad=1):
+    """Claves (ambito, id_ambito, metrica) a las que suma una tarea activa"""
+    resultado = Counter()
+    if not tarea or tarea.get('estado_registro', 'activo') != 'activo':
+        return resultado
+    metrica = f"tareas_{tarea.get('estado') or 'pendiente'}"
+    ambitos = [('global', 0)]
+    id_proyecto = _entero(tarea.get('id_proyecto'))
+    id_asignado = _entero(tarea.get('id_asignado'))
+    if id_proyecto:
+        ambitos.append(('proyecto', id_proyecto))
+    if id_asignado:
+        ambitos.append(('usuario', id_asignado))
+    for ambito, id_ambito in ambitos:
+        resultado[(ambito, id_ambito, metrica)] += cantidad
+        resultado[(ambito, id_ambito, 'tareas_total')] += cantidad
+    return resultado
+
+
+class ContadoresModel:
+    def __init__(self):
+        self.db = Database()
+
+    # --- Mantenimiento dentro de la transacción del que escribe ---
+
+    @staticmethod
+    def leer_tarea(cursor, id_tarea):
+        """Bloquea y devuelve los campos de la tarea que afectan a los contadores"""
+        cursor.execute("""
+            SELECT id_proyecto, id_asignado, estado, estado_registro
+            FROM tareas WHERE id = %s FOR UPDATE
+        """, (id_tarea,))
+        fila = cursor.fetchone()
+        if fila is None:
+            return None
+        if isinstance(fila, dict):
+            return fila
+        return dict(zip(('id_proyecto', 'id_asignado', 'estado', 'estado_registro'), fila))
+
+    @staticmethod
+    def aplicar_cambio_tarea(cursor, anterior, nueva):
+        """Aplica la diferencia entre el estado anterior y el nuevo de una tarea"""
+        deltas = contribucion_tarea(nueva)
+        deltas.subtract(contribucion_tarea(anterior))
+        ContadoresModel.aplicar_deltas(cursor, deltas)
+
+    @staticmethod
+    def aplicar_deltas(cursor, deltas):
+        filas = [(ambito, id_ambito, metrica, valor)
+                 for (ambito, id_ambito, metrica), valor in sorted(deltas.items()) if valor]
+        if filas:
+            # Orden fijo de claves para que dos transacciones no se bloqueen mutuamente
+            cursor.executemany("""
+                INSERT INTO estadisticas_contadores (ambito, id_ambito, metrica, valor)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)
+            """, filas)
+
+    # --- Lecturas ---
+
+    def obtener_globales(self):
+        """Contadores globales, o None si la tabla nunca se recalculó"""
+        contadores = self.obtener_ambito('global', 0)
+        if not contadores.get(METRICA_RECALCULADO):
+            return None
+        return contadores
+
+    def obtener_ambito(self, ambito='global', id_ambito=0):
+        """Devuelve {metrica: valor} de un ámbito (búsqueda por clave primaria)"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT metrica, valor FROM estadisticas_contadores
+                WHERE ambito = %s AND id_ambito = %s
+            """, (ambito, id_ambito))
+            filas = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            return {fila['metrica']: fila['valor'] for fila in filas}
+        return {}
+
+    # --- Recalculo y verificación ---
+
+    @staticmethod
+    def calcular_esperados(cursor, bloquear=False):
+        """Calcula desde cero lo que deberían valer los contadores"""
+        # Al recalcular se bloquean las filas leídas para no perder escrituras concurrentes
+        bloqueo = " LOCK IN SHARE MODE" if bloquear else ""
+        esperados = Counter({('global', 0, metrica): 0 for metrica in METRICAS_GLOBALES})
+        cursor.execute("""
+            SELECT id_proyecto, id_asignado, estado, COUNT(*) AS total
+            FROM tareas
+            WHERE estado_registro = 'activo'
+            GROUP BY id_proyecto, id_asignado, estado
+        """ + bloqueo)
+        for id_proyecto, id_asignado, estado, total in cursor.fetchall():
+            esperados.update(contribucion_tarea({
+                'id_proyecto': id_proyecto,
+                'id_asignado': id_asignado,
+                'estado': estado
+            }, total))
+        cursor.execute("SELECT COUNT(*) FROM proyectos WHERE estado = 'activo'" + bloqueo)
+        esperados[('global', 0, 'proyectos_activos')] += cursor.fetchone()[0]
+        esperados[('global', 0, METRICA_RECALCULADO)] = 1
+        return esperados
+
+    @staticmethod
+    def escribir_recalculo(cursor):
+        """Sustituye estadisticas_contadores por un recálculo (en la transacción del que llama)"""
+        esperados = ContadoresModel.calcular_esperados(cursor, bloquear=True)
+        cursor.execute("DELETE FROM estadisticas_contadores")
+        filas = [(ambito, id_ambito, metrica, valor)
+                 for (ambito, id_ambito, metrica), valor in sorted(esperados.items())
+                 if valor or ambito == 'global']
+        cursor.executemany("""
+            INSERT INTO estadisticas_contadores (ambito, id_ambito, metrica, valor)
+            VALUES (%s, %s, %s, %s)
+        """, filas)
+        return len(filas)
+
+    def recomputar(self):
+        """Reconstruye la tabla estadisticas_contadores desde tareas y proyectos"""
+        conn = self.db.conectar()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            filas = self.escribir_recalculo(cursor)
+            conn.commit()
+            print(f"✅ Contadores recalculados: {filas} filas")
+            return True
+        except Exception as e:
+            print(f"❌ Error recalculando contadores: {e}")
+            conn.rollback()
+            return False
+        finally:
+            cursor.close()
+            conn.close()
+
+    def verificar(self):
+        """Compara la tabla con un recálculo; devuelve la lista de diferencias"""
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            esperados = self.calcular_esperados(cursor)
+            cursor.execute("SELECT ambito, id_ambito, metrica, valor FROM estadisticas_contadores")
+            actuales = {(ambito, id_ambito, metrica): valor for ambito, id_ambito, metrica, valor in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+        diferencias = []
+        for clave in sorted(set(esperados) | set(actuales)):
+            esperado = esperados.get(clave, 0)
+            actual = actuales.get(clave, 0)
+            if esperado != actual:
+                ambito, id_ambito, metrica = clave
+                diferencias.append({
+                    'ambito': ambito,
+                    'id_ambito': id_ambito,
+                    'metrica': metrica,
+                    'esperado': esperado,
+                    'actual': actual
+                })
+        return diferencias
@@ -0,0 +1,108 @@
+# [file name]: historial_model.py
+# Mantenimiento de historial_actividades: particiones mensuales, retención y archivo
+import gzip
+import json
+import os
+from datetime import date
+from app.utils.database import Database
+from app.utils.particiones import (PARTICION_FUTURO, definicion_particion, inicio_mes,
+                                   mes_de_particion, particiones_existentes, sumar_meses)
+
+HISTORIAL_RETENCION_MESES = int(os.environ.get('HISTORIAL_RETENCION_MESES', '12'))
+HISTORIAL_ARCHIVO_DIR = os.environ.get('HISTORIAL_ARCHIVO_DIR', 'archivo_historial')
+TAMANO_BLOQUE_EXPORTACION = 5000
+
+
+class HistorialModel:
+    def __init__(self):
+        self.db = Database()
+
+    def asegurar_particiones(self, meses_adelante=2):
+        """Crea las particiones de los próximos meses partiendo la de desborde"""
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            existentes = particiones_existentes(cursor, 'historial_actividades')
+            meses = [m for m in map(mes_de_particion, existentes) if m]
+            if not meses:
+                print("⚠️  historial_actividades no está particionada (ejecuta 'esquema migrar')")
+                return None
+            nuevas = []
+            mes = sumar_meses(max(meses), 1)
+            while mes <= sumar_meses(inicio_mes(date.today()), meses_adelante):
+                nuevas.append(mes)
+                mes = sumar_meses(mes, 1)
+            if nuevas:
+                definiciones = [definicion_particion(m) for m in nuevas]
+                definiciones.append(f"PARTITION {PARTICION_FUTURO} VALUES LESS THAN MAXVALUE")
+                cursor.execute(f"""
+                    ALTER TABLE historial_actividades
+                    REORGANIZE PARTITION {PARTICION_FUTURO} INTO ({', '.join(definiciones)})
+                """)
+                print(f"✅ Particiones creadas: {', '.join(d.split()[1] for d in definiciones[:-1])}")
+            return len(nuevas)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def archivar(self, meses_retencion=HISTORIAL_RETENCION_MESES, directorio=HISTORIAL_ARCHIVO_DIR):
+        """Exporta a JSONL comprimido las particiones vencidas y luego las elimina.
+
+        Devuelve una lista con {particion, filas, archivo} por partición archivada.
+        """
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        archivadas = []
+        try:
+            limite = sumar_meses(inicio_mes(date.today()), -meses_retencion)
+            vencidas = [p for p in particiones_existentes(cursor, 'historial_actividades')
+                        if mes_de_particion(p) and mes_de_particion(p) < limite]
+            if vencidas:
+                os.makedirs(directorio, exist_ok=True)
+            for particion in vencidas:
+                archivo = os.path.join(directorio, f"historial_actividades_{particion[1:]}.jsonl.gz")
+                filas = self._exportar_particion(cursor, particion, archivo)
+                # Solo se borra cuando el archivo ya está completo en disco
+                cursor.execute(f"ALTER TABLE historial_actividades DROP PARTITION {particion}")
+                print(f"📦 {particion}: {filas} filas archivadas en {archivo}")
+                archivadas.append({'particion': particion, 'filas': filas, 'archivo': archivo})
+            return archivadas
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def _exportar_particion(cursor, particion, archivo):
+        """Escribe la partición por bloques (keyset sobre id) en un .jsonl.gz"""
+        temporal = archivo + '.tmp'
+        filas = 0
+        ultimo_id = 0
+        with gzip.open(temporal, 'wt', encoding='utf-8') as salida:
+            while True:
+                cursor.execute(f"""
+                    SELECT id, id_usuario, accion, tabla_afectada, id_registro_afectado, fecha
+                    FROM historial_actividades PARTITION ({particion})
+                    WHERE id > %s ORDER BY id LIMIT %s
+                """, (ultimo_id, TAMANO_BLOQUE_EXPORTACION))
+                bloque = cursor.fetchall()
+                if not bloque:
+                    break
+                for id_fila, id_usuario, accion, tabla, id_registro, fecha in bloque:
+                    salida.write(json.dumps({
+                        'id': id_fila,
+                        'id_usuario': id_usuario,
+                        'accion': accion,
+                        'tabla_afectada': tabla,
+                        'id_registro_afectado': id_registro,
+                        'fecha': fecha.isoformat() if fecha else None
+                    }, ensure_ascii=False) + '\n')
+                filas += len(bloque)
+                ultimo_id = bloque[-1][0]
+            salida.flush()
+            os.fsync(salida.fileno())
+        os.replace(temporal, archivo)
+        return filas
@@ -0,0 +1,144 @@
+# [file name]: miembros_model.py
+# Índice de pertenencia proyecto_miembros: líder y usuarios con tareas activas en cada proyecto
+from collections import Counter
+from app.utils.database import Database
+from app.utils.migraciones import reconstruir_miembros
+from app.models.contadores_model import _entero
+
+
+def pertenencia_tarea(tarea):
+    """(id_proyecto, id_usuario) al que da pertenencia una tarea activa asignada, o None"""
+    if not tarea or tarea.get('estado_registro', 'activo') != 'activo':
+        return None
+    id_proyecto = _entero(tarea.get('id_proyecto'))
+    id_asignado = _entero(tarea.get('id_asignado'))
+    if not id_proyecto or not id_asignado:
+        return None
+    return (id_proyecto, id_asignado)
+
+
+class MiembrosModel:
+    def __init__(self):
+        self.db = Database()
+
+    # --- Mantenimiento dentro de la transacción del que escribe ---
+
+    @staticmethod
+    def aplicar_cambio_tarea(cursor, anterior, nueva):
+        """Ajusta las tareas por (proyecto, usuario) al crear, reasignar, mover o eliminar una tarea"""
+        deltas = Counter()
+        par = pertenencia_tarea(anterior)
+        if par:
+            deltas[par] -= 1
+        par = pertenencia_tarea(nueva)
+        if par:
+            deltas[par] += 1
+        # Orden fijo de claves para que dos transacciones no se bloqueen mutuamente
+        for (id_proyecto, id_usuario), delta in sorted(deltas.items()):
+            if delta > 0:
+                cursor.execute("""
+                    INSERT INTO proyecto_miembros (id_proyecto, id_usuario, rol, tareas)
+                    VALUES (%s, %s, 'Miembro', %s)
+                    ON DUPLICATE KEY UPDATE tareas = tareas + VALUES(tareas)
+                """, (id_proyecto, id_usuario, delta))
+            elif delta < 0:
+                cursor.execute("""
+                    UPDATE proyecto_miembros SET tareas = GREATEST(tareas - %s, 0)
+                    WHERE id_proyecto = %s AND id_usuario = %s
+                """, (-delta, id_proyecto, id_usuario))
+                cursor.execute("""
+                    DELETE FROM proyecto_miembros
+                    WHERE id_proyecto = %s AND id_usuario = %s AND tareas = 0 AND rol = 'Miembro'
+                """, (id_proyecto, id_usuario))
+
+    @staticmethod
+    def asignar_lider(cursor, id_proyecto, id_lider):
+        """Deja a id_lider como único líder del proyecto (el anterior sigue si tiene tareas)"""
+        id_lider = _entero(id_lider)
+        if id_lider:
+            cursor.execute("""
+                INSERT INTO proyecto_miembros (id_proyecto, id_usuario, rol)
+                VALUES (%s, %s, 'Líder')
+                ON DUPLICATE KEY UPDATE rol = 'Líder'
+            """, (id_proyecto, id_lider))
+        cursor.execute("""
+            UPDATE proyecto_miembros SET rol = 'Miembro'
+            WHERE id_proyecto = %s AND rol = 'Líder' AND id_usuario <> %s
+        """, (id_proyecto, id_lider or 0))
+        cursor.execute("""
+            DELETE FROM proyecto_miembros
+            WHERE id_proyecto = %s AND tareas = 0 AND rol = 'Miembro'
+        """, (id_proyecto,))
+
+    # --- Lecturas ---
+
+    def obtener_ids(self, id_proyecto):
+        """Usuarios activos que pertenecen al proyecto (líder incluido)"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT m.id_usuario FROM proyecto_miembros m
+                JOIN usuarios u ON u.id = m.id_usuario AND u.estado = 'activo'
+                WHERE m.id_proyecto = %s
+            """, (id_proyecto,))
+            ids = [fila[0] for fila in cursor.fetchall()]
+            cursor.close()
+            conn.close()
+            return ids
+        return []
+
+    def obtener_liderados(self, id_usuario):
+        """Ids de los proyectos de los que el usuario es líder"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id_proyecto FROM proyecto_miembros WHERE id_usuario = %s AND rol = 'Líder'
+            """, (id_usuario,))
+            ids = {fila[0] for fila in cursor.fetchall()}
+            cursor.close()
+            conn.close()
+            return ids
+        return set()
+
+    def obtener_rol(self, id_proyecto, id_usuario):
+        """'Líder', 'Miembro' o None si el usuario no pertenece al proyecto"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT rol FROM proyecto_miembros WHERE id_proyecto = %s AND id_usuario = %s
+            """, (id_proyecto, id_usuario))
+            fila = cursor.fetchone()
+            cursor.close()
+            conn.close()
+            return fila[0] if fila else None
+        return None
+
+    # --- Recalculo ---
+
+    def reconstruir(self):
+        """Reconstruye proyecto_miembros desde tareas y proyectos; devuelve las filas o None"""
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            # Bloquea las tareas para no perder asignaciones concurrentes
+            cursor.execute("SELECT COUNT(*) FROM tareas WHERE estado_registro = 'activo' LOCK IN SHARE MODE")
+            cursor.fetchall()
+            reconstruir_miembros(cursor)
+            cursor.execute("SELECT COUNT(*) FROM proyecto_miembros")
+            filas = cursor.fetchone()[0]
+            conn.commit()
+            print(f"✅ Miembros de proyecto reconstruidos: {filas} filas")
+            return filas
+        except Exception as e:
+            print(f"❌ Error reconstruyendo miembros de proyecto: {e}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+            conn.close()
@@ -1,6 +1,13 @@
 # [file name]: notification_model.py
 from app.utils.database import Database
-from datetime import datetime, timedelta
+from app.utils.helpers import codificar_cursor, decodificar_cursor
+from app.utils import eventos
+from datetime import datetime
+
+# Filas por sentencia INSERT en las creaciones masivas
+LOTE_INSERCION = 500
+# Filas borradas por sentencia en la purga (transacciones cortas)
+LOTE_PURGA = 5000
 
 class NotificationModel:
     def __init__(self):
@@ -11,25 +18,140 @@ class NotificationModel:
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO notificaciones (id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad))
+            try:
+                conn.start_transaction()
+                cursor.execute("""
+                    INSERT INTO notificaciones (id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad))
+                id_notificacion = cursor.lastrowid
+                self.aplicar_deltas_no_leidas(cursor, {id_usuario: 1})
+                conn.commit()
+            except Exception as e:
+                print(f"Error al crear notificación: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
+            self._publicar(id_usuario, 'notificacion', {
+                'notificacion': {
+                    'id': id_notificacion,
+                    'tipo': tipo,
+                    'titulo': titulo,
+                    'mensaje': mensaje,
+                    'enlace': enlace,
+                    'leida': False,
+                    'fecha_creacion': datetime.now().isoformat(),
+                    'fecha_limite': fecha_limite,
+                    'prioridad': prioridad
+                }
+            })
+            return True
+        return False
+    
+    def crear_notificaciones_bulk(self, filas):
+        """Crea varias notificaciones en una sola transacción (INSERT de varias filas).
+        
+        Cada fila es un dict con id_usuario, tipo, titulo, mensaje y, opcionalmente,
+        enlace, fecha_limite, prioridad y clave_dedup. Si ya existe una notificación
+        del usuario con la misma clave_dedup, la fila se ignora.
+        Devuelve el número de notificaciones creadas (None si falló).
+        """
+        if not filas:
+            return 0
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        creadas = []
+        try:
+            conn.start_transaction()
+            con_clave = [f for f in filas if f.get('clave_dedup')]
+            sin_clave = [f for f in filas if not f.get('clave_dedup')]
+            for inicio in range(0, len(sin_clave), LOTE_INSERCION):
+                lote = sin_clave[inicio:inicio + LOTE_INSERCION]
+                self._insertar_lote(cursor, lote)
+                # INSERT simple de varias filas: InnoDB asigna ids consecutivos
+                creadas.extend(zip(range(cursor.lastrowid, cursor.lastrowid + len(lote)), lote))
+            for inicio in range(0, len(con_clave), LOTE_INSERCION):
+                lote = con_clave[inicio:inicio + LOTE_INSERCION]
+                self._insertar_lote(cursor, lote, ignorar_duplicados=True)
+                if cursor.rowcount > 0:
+                    creadas.extend(self._recuperar_creadas(cursor, cursor.lastrowid, lote))
+            deltas = {}
+            for _, f in creadas:
+                deltas[f['id_usuario']] = deltas.get(f['id_usuario'], 0) + 1
+            self.aplicar_deltas_no_leidas(cursor, deltas)
             conn.commit()
+        except Exception as e:
+            print(f"Error al crear notificaciones: {e}")
+            conn.rollback()
+            return None
+        finally:
             cursor.close()
             conn.close()
-            return True
-        return False
+        self._publicar_creadas(creadas)
+        return len(creadas)
+    
+    @staticmethod
+    def _insertar_lote(cursor, lote, ignorar_duplicados=False):
+        marcadores = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(lote))
+        valores = []
+        for f in lote:
+            valores.extend((f['id_usuario'], f['tipo'], f['titulo'], f['mensaje'], f.get('enlace'),
+                            f.get('fecha_limite'), f.get('prioridad', 'media'), f.get('clave_dedup')))
+        cursor.execute(f"""
+            INSERT INTO notificaciones (id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad, clave_dedup)
+            VALUES {marcadores}
+            {'ON DUPLICATE KEY UPDATE id = id' if ignorar_duplicados else ''}
+        """, valores)
+    
+    @staticmethod
+    def _recuperar_creadas(cursor, primer_id, lote):
+        """Empareja con su id las filas de un lote deduplicado que sí se insertaron"""
+        por_clave = {(f['id_usuario'], f['clave_dedup']): f for f in lote}
+        claves = sorted({f['clave_dedup'] for f in lote})
+        cursor.execute(f"""
+            SELECT id, id_usuario, clave_dedup FROM notificaciones
+            WHERE id >= %s AND clave_dedup IN ({', '.join(['%s'] * len(claves))})
+        """, [primer_id] + claves)
+        return [(id_notificacion, por_clave[(id_usuario, clave)])
+                for id_notificacion, id_usuario, clave in cursor.fetchall()
+                if (id_usuario, clave) in por_clave]
+    
+    def _publicar_creadas(self, creadas):
+        """Un evento por notificación nueva, con un único conteo de no leídas por usuario"""
+        if not creadas:
+            return
+        no_leidas = self.contar_no_leidas_usuarios({f['id_usuario'] for _, f in creadas})
+        ahora = datetime.now().isoformat()
+        for id_notificacion, f in creadas:
+            eventos.publicar(eventos.canal_usuario(f['id_usuario']), 'notificacion', {
+                'notificacion': {
+                    'id': id_notificacion,
+                    'tipo': f['tipo'],
+                    'titulo': f['titulo'],
+                    'mensaje': f['mensaje'],
+                    'enlace': f.get('enlace'),
+                    'leida': False,
+                    'fecha_creacion': ahora,
+                    'fecha_limite': f.get('fecha_limite'),
+                    'prioridad': f.get('prioridad', 'media')
+                },
+                'no_leidas': no_leidas[f['id_usuario']]
+            })
     
     def obtener_notificaciones_usuario(self, id_usuario, limite=10):
-        """Obtiene las notificaciones de un usuario"""
+        """Obtiene las notificaciones de un usuario (no leídas primero)"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
+            # Mismo orden que idx_notificaciones_bandeja (id_usuario, leida, id DESC)
             cursor.execute("""
                 SELECT * FROM notificaciones 
                 WHERE id_usuario = %s 
-                ORDER BY leida ASC, fecha_creacion DESC 
+                ORDER BY leida ASC, id DESC 
                 LIMIT %s
             """, (id_usuario, limite))
             notificaciones = cursor.fetchall()
@@ -38,34 +160,96 @@ class NotificationModel:
             return notificaciones
         return []
     
+    def obtener_feed(self, id_usuario, limite=20, cursor=None, solo_no_leidas=False):
+        """Página de notificaciones de la más nueva a la más antigua (cursor keyset sobre id).
+        
+        Devuelve (notificaciones, siguiente_cursor); siguiente_cursor es None en la última página.
+        """
+        condiciones = ["id_usuario = %s"]
+        params = [id_usuario]
+        if solo_no_leidas:
+            condiciones.append("leida = FALSE")
+        if cursor:
+            try:
+                (ultimo_id,) = decodificar_cursor(cursor)
+                params.append(int(ultimo_id))
+            except (TypeError, ValueError):
+                raise ValueError('Cursor inválido')
+            condiciones.append("id < %s")
+        
+        conn = self.db.conectar()
+        if conn:
+            cursor_db = conn.cursor(dictionary=True)
+            cursor_db.execute(f"""
+                SELECT id, tipo, titulo, mensaje, enlace, leida, fecha_creacion, fecha_limite, prioridad
+                FROM notificaciones
+                WHERE {' AND '.join(condiciones)}
+                ORDER BY id DESC
+                LIMIT %s
+            """, params + [limite + 1])
+            notificaciones = cursor_db.fetchall()
+            cursor_db.close()
+            conn.close()
+            
+            siguiente = None
+            if len(notificaciones) > limite:
+                notificaciones = notificaciones[:limite]
+                siguiente = codificar_cursor([notificaciones[-1]['id']])
+            return notificaciones, siguiente
+        return [], None
+    
     def contar_no_leidas(self, id_usuario):
-        """Cuenta las notificaciones no leídas de un usuario"""
+        """Cuenta las notificaciones no leídas de un usuario (contador materializado)"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COUNT(*) FROM notificaciones 
-                WHERE id_usuario = %s AND leida = FALSE
-            """, (id_usuario,))
-            count = cursor.fetchone()[0]
+            cursor.execute("SELECT total FROM notificaciones_no_leidas WHERE id_usuario = %s", (id_usuario,))
+            fila = cursor.fetchone()
             cursor.close()
             conn.close()
-            return count
+            return fila[0] if fila else 0
         return 0
     
-    def marcar_como_leida(self, id_notificacion, id_usuario):
-        """Marca una notificación como leída"""
+    def contar_no_leidas_usuarios(self, ids_usuarios):
+        """{id_usuario: no_leidas} para varios usuarios con una sola consulta"""
+        ids_usuarios = sorted(ids_usuarios)
+        totales = dict.fromkeys(ids_usuarios, 0)
+        if not ids_usuarios:
+            return totales
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE notificaciones 
-                SET leida = TRUE 
-                WHERE id = %s AND id_usuario = %s
-            """, (id_notificacion, id_usuario))
-            conn.commit()
+            cursor.execute(f"""
+                SELECT id_usuario, total FROM notificaciones_no_leidas
+                WHERE id_usuario IN ({', '.join(['%s'] * len(ids_usuarios))})
+            """, ids_usuarios)
+            totales.update(dict(cursor.fetchall()))
             cursor.close()
             conn.close()
+        return totales
+    
+    def marcar_como_leida(self, id_notificacion, id_usuario):
+        """Marca una notificación como leída"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            try:
+                conn.start_transaction()
+                cursor.execute("""
+                    UPDATE notificaciones 
+                    SET leida = TRUE 
+                    WHERE id = %s AND id_usuario = %s AND leida = FALSE
+                """, (id_notificacion, id_usuario))
+                self.aplicar_deltas_no_leidas(cursor, {id_usuario: -cursor.rowcount})
+                conn.commit()
+            except Exception as e:
+                print(f"Error al marcar notificación: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
+            self._publicar(id_usuario, 'leida', {'id': id_notificacion})
             return True
         return False
     
@@ -74,14 +258,24 @@ class NotificationModel:
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE notificaciones 
-                SET leida = TRUE 
-                WHERE id_usuario = %s AND leida = FALSE
-            """, (id_usuario,))
-            conn.commit()
-            cursor.close()
-            conn.close()
+            try:
+                conn.start_transaction()
+                cursor.execute("""
+                    UPDATE notificaciones 
+                    SET leida = TRUE 
+                    WHERE id_usuario = %s AND leida = FALSE
+                """, (id_usuario,))
+                # Se resta lo marcado (no se pone a 0): respeta las creadas en paralelo
+                self.aplicar_deltas_no_leidas(cursor, {id_usuario: -cursor.rowcount})
+                conn.commit()
+            except Exception as e:
+                print(f"Error al marcar notificaciones: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
+            self._publicar(id_usuario, 'todas_leidas', {})
             return True
         return False
     
@@ -90,12 +284,96 @@ class NotificationModel:
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
+            try:
+                conn.start_transaction()
+                cursor.execute("""
+                    SELECT leida FROM notificaciones 
+                    WHERE id = %s AND id_usuario = %s FOR UPDATE
+                """, (id_notificacion, id_usuario))
+                fila = cursor.fetchone()
+                cursor.execute("""
+                    DELETE FROM notificaciones 
+                    WHERE id = %s AND id_usuario = %s
+                """, (id_notificacion, id_usuario))
+                if fila and not fila[0]:
+                    self.aplicar_deltas_no_leidas(cursor, {id_usuario: -1})
+                conn.commit()
+            except Exception as e:
+                print(f"Error al eliminar notificación: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
+            self._publicar(id_usuario, 'eliminada', {'id': id_notificacion})
+            return True
+        return False
+    
+    def purgar_leidas(self, dias):
+        """Borra por lotes las notificaciones leídas con más de `dias` días; devuelve cuántas"""
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        eliminadas = 0
+        try:
+            while True:
+                # Solo leídas: el contador de no leídas no cambia
+                cursor.execute("""
+                    DELETE FROM notificaciones
+                    WHERE leida = TRUE AND fecha_creacion < NOW() - INTERVAL %s DAY
+                    LIMIT %s
+                """, (dias, LOTE_PURGA))
+                conn.commit()
+                eliminadas += cursor.rowcount
+                if cursor.rowcount < LOTE_PURGA:
+                    return eliminadas
+        finally:
+            cursor.close()
+            conn.close()
+    
+    # --- Contador de no leídas (notificaciones_no_leidas) ---
+    
+    @staticmethod
+    def aplicar_deltas_no_leidas(cursor, deltas):
+        """Suma los deltas {id_usuario: n} dentro de la transacción del que escribe"""
+        filas = [(id_usuario, valor) for id_usuario, valor in sorted(deltas.items()) if valor]
+        if filas:
+            # Orden fijo de usuarios para que dos transacciones no se bloqueen mutuamente
+            cursor.executemany("""
+                INSERT INTO notificaciones_no_leidas (id_usuario, total)
+                VALUES (%s, GREATEST(%s, 0))
+                ON DUPLICATE KEY UPDATE total = GREATEST(total + %s, 0)
+            """, [(id_usuario, valor, valor) for id_usuario, valor in filas])
+    
+    def recalcular_no_leidas(self):
+        """Reconstruye notificaciones_no_leidas desde la tabla de notificaciones"""
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
             cursor.execute("""
-                DELETE FROM notificaciones 
-                WHERE id = %s AND id_usuario = %s
-            """, (id_notificacion, id_usuario))
+                SELECT id_usuario, COUNT(*) FROM notificaciones
+                WHERE leida = FALSE GROUP BY id_usuario LOCK IN SHARE MODE
+            """)
+            totales = cursor.fetchall()
+            cursor.execute("DELETE FROM notificaciones_no_leidas")
+            cursor.executemany("""
+                INSERT INTO notificaciones_no_leidas (id_usuario, total) VALUES (%s, %s)
+            """, totales)
             conn.commit()
+            return len(totales)
+        except Exception as e:
+            print(f"❌ Error recalculando no leídas: {e}")
+            conn.rollback()
+            return None
+        finally:
             cursor.close()
             conn.close()
-            return True
-        return False
\ No newline at end of file
+    
+    def _publicar(self, id_usuario, tipo, datos):
+        """Empuja el cambio a las pestañas abiertas del usuario junto con el contador actualizado"""
+        datos['no_leidas'] = self.contar_no_leidas(id_usuario)
+        eventos.publicar(eventos.canal_usuario(id_usuario), tipo, datos)
\ No newline at end of file
@@ -0,0 +1,223 @@
+# [file name]: productividad_model.py
+# Snapshots diarios de productividad (día × usuario, día × proyecto) y lecturas del reporte
+import os
+from collections import Counter
+from datetime import timedelta
+from mysql.connector import Error
+from app.utils.database import Database
+from app.models.contadores_model import METRICA_RECALCULADO
+
+# Días de snapshots que se conservan (la tendencia usa 90)
+PRODUCTIVIDAD_RETENCION_DIAS = int(os.environ.get('PRODUCTIVIDAD_RETENCION_DIAS', '400'))
+
+
+class ProductividadModel:
+    def __init__(self):
+        self.db = Database()
+
+    def tomar_snapshot(self, margen_cierre=0):
+        """Escribe (o reescribe) las filas de hoy de snapshot_productividad.
+
+        Una sola lectura agrupada de tareas; repetirlo en el mismo día sustituye
+        las filas. La primera ejecución del día, si llega dentro de los
+        `margen_cierre` segundos tras la medianoche, reescribe también el día
+        anterior con los valores actuales: es su cierre (lo completado entre la
+        última ejecución de ayer y la medianoche cuenta para ayer).
+        Devuelve {fecha, filas, eliminadas, cierre} o None sin conexión.
+        """
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            cursor.execute("SELECT CURDATE(), TIMESTAMPDIFF(SECOND, CURDATE(), NOW())")
+            hoy, desde_medianoche = cursor.fetchone()
+            ayer = hoy - timedelta(days=1)
+            cursor.execute("""
+                SELECT COUNT(*) FROM snapshot_productividad
+                WHERE ambito = 'global' AND id_ambito = 0 AND fecha = %s
+            """, (hoy,))
+            fechas = [hoy]
+            if cursor.fetchone()[0] == 0 and desde_medianoche <= margen_cierre:
+                fechas.insert(0, ayer)
+            cursor.execute("""
+                SELECT id_proyecto, id_asignado, COUNT(*),
+                       COALESCE(SUM(estado = 'completada'), 0),
+                       COALESCE(SUM(estado <> 'completada' AND fecha_vencimiento < %s), 0),
+                       COALESCE(SUM(estado <> 'completada' AND fecha_vencimiento < %s), 0)
+                FROM tareas
+                WHERE estado_registro = 'activo'
+                GROUP BY id_proyecto, id_asignado
+            """, (hoy, ayer))
+            totales = Counter({('global', 0, 'total_tareas'): 0})
+            for id_proyecto, id_asignado, total, completadas, vencidas, vencidas_ayer in cursor.fetchall():
+                ambitos = [('global', 0)]
+                if id_proyecto:
+                    ambitos.append(('proyecto', id_proyecto))
+                if id_asignado:
+                    ambitos.append(('usuario', id_asignado))
+                for ambito, id_ambito in ambitos:
+                    totales[(ambito, id_ambito, 'total_tareas')] += total
+                    totales[(ambito, id_ambito, 'completadas')] += int(completadas)
+                    totales[(ambito, id_ambito, 'vencidas')] += int(vencidas)
+                    totales[(ambito, id_ambito, 'vencidas_ayer')] += int(vencidas_ayer)
+
+            claves = sorted({(ambito, id_ambito) for ambito, id_ambito, _ in totales})
+            filas = [(ambito, id_ambito, fecha,
+                      totales[(ambito, id_ambito, 'total_tareas')],
+                      totales[(ambito, id_ambito, 'completadas')],
+                      totales[(ambito, id_ambito, 'vencidas' if fecha == hoy else 'vencidas_ayer')])
+                     for fecha in fechas
+                     for ambito, id_ambito in claves]
+            cursor.execute("DELETE FROM snapshot_productividad WHERE fecha IN (%s, %s)", (fechas[0], hoy))
+            cursor.executemany("""
+                INSERT INTO snapshot_productividad
+                    (ambito, id_ambito, fecha, total_tareas, completadas, vencidas)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, filas)
+            cursor.execute(
+                "DELETE FROM snapshot_productividad WHERE fecha < %s - INTERVAL %s DAY",
+                (hoy, PRODUCTIVIDAD_RETENCION_DIAS)
+            )
+            eliminadas = cursor.rowcount
+            conn.commit()
+            return {'fecha': str(hoy), 'filas': len(filas), 'eliminadas': eliminadas,
+                    'cierre': str(ayer) if len(fechas) > 1 else None}
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    # --- Lecturas del reporte ---
+
+    def _base(self, cursor):
+        """Fecha del snapshot de ayer (None si no existe), o False si no se puede usar la tabla.
+
+        También exige contadores materializados: lo de hoy sale de ellos. Un
+        snapshot más antiguo no sirve de base: su diferencia no sería "hoy".
+        """
+        try:
+            cursor.execute("""
+                SELECT valor FROM estadisticas_contadores
+                WHERE ambito = 'global' AND id_ambito = 0 AND metrica = %s
+            """, (METRICA_RECALCULADO,))
+            recalculado = cursor.fetchall()
+            cursor.execute("""
+                SELECT MAX(fecha) AS fecha FROM snapshot_productividad
+                WHERE ambito = 'global' AND id_ambito = 0 AND fecha = CURDATE() - INTERVAL 1 DAY
+            """)
+            fecha = cursor.fetchone()['fecha']
+        except Error as e:
+            # Tablas aún no creadas en bases antiguas
+            print(f"⚠️  Snapshots de productividad no disponibles: {e}")
+            return False
+        if not recalculado or not recalculado[0]['valor']:
+            return False
+        return fecha
+
+    def obtener_usuarios(self):
+        """Asignadas/completadas de cada usuario activo más lo completado hoy.
+
+        Snapshot de ayer + delta de hoy: los valores actuales vienen de
+        estadisticas_contadores y el delta es la diferencia con el snapshot
+        (completadas_hoy es None si no hay snapshot de ayer). Devuelve None si
+        no hay contadores o tablas (usar la consulta directa).
+        """
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            base = self._base(cursor)
+            if base is False:
+                return None
+            cursor.execute("""
+                SELECT u.id, u.nombre, u.email, u.rol,
+                       COALESCE(SUM(CASE WHEN c.metrica = 'tareas_total' THEN c.valor END), 0) AS tareas_asignadas,
+                       COALESCE(SUM(CASE WHEN c.metrica = 'tareas_completada' THEN c.valor END), 0) AS tareas_completadas,
+                       COALESCE(MAX(s.completadas), 0) AS completadas_base
+                FROM usuarios u
+                LEFT JOIN estadisticas_contadores c
+                       ON c.ambito = 'usuario' AND c.id_ambito = u.id
+                      AND c.metrica IN ('tareas_total', 'tareas_completada')
+                LEFT JOIN snapshot_productividad s
+                       ON s.ambito = 'usuario' AND s.id_ambito = u.id AND s.fecha = %s
+                WHERE u.estado = 'activo'
+                GROUP BY u.id, u.nombre, u.email, u.rol
+                ORDER BY u.nombre
+            """, (base,))
+            filas = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        for fila in filas:
+            fila['tareas_asignadas'] = int(fila['tareas_asignadas'])
+            fila['tareas_completadas'] = int(fila['tareas_completadas'])
+            completadas_base = int(fila.pop('completadas_base'))
+            fila['completadas_hoy'] = fila['tareas_completadas'] - completadas_base if base else None
+            fila['eficiencia'] = (fila['tareas_completadas'] / fila['tareas_asignadas'] * 100) if fila['tareas_asignadas'] > 0 else 0
+        return filas
+
+    def obtener_proyectos(self):
+        """Total y completadas de cada proyecto activo más lo completado hoy (ver obtener_usuarios)"""
+        conn = self.db.conectar()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            base = self._base(cursor)
+            if base is False:
+                return None
+            cursor.execute("""
+                SELECT p.id, p.nombre,
+                       COALESCE(SUM(CASE WHEN c.metrica = 'tareas_total' THEN c.valor END), 0) AS total_tareas,
+                       COALESCE(SUM(CASE WHEN c.metrica = 'tareas_completada' THEN c.valor END), 0) AS completadas,
+                       COALESCE(MAX(s.completadas), 0) AS completadas_base
+                FROM proyectos p
+                LEFT JOIN estadisticas_contadores c
+                       ON c.ambito = 'proyecto' AND c.id_ambito = p.id
+                      AND c.metrica IN ('tareas_total', 'tareas_completada')
+                LEFT JOIN snapshot_productividad s
+                       ON s.ambito = 'proyecto' AND s.id_ambito = p.id AND s.fecha = %s
+                WHERE p.estado = 'activo'
+                GROUP BY p.id, p.nombre
+            """, (base,))
+            filas = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        for fila in filas:
+            fila['total_tareas'] = int(fila['total_tareas'])
+            fila['completadas'] = int(fila['completadas'])
+            completadas_base = int(fila.pop('completadas_base'))
+            fila['completadas_hoy'] = fila['completadas'] - completadas_base if base else None
+            fila['porcentaje'] = (fila['completadas'] / fila['total_tareas'] * 100) if fila['total_tareas'] > 0 else 0
+        return filas
+
+    def obtener_tendencia(self, dias=90):
+        """Tasa de finalización global de los últimos `dias` días (sin hoy), desde los snapshots"""
+        conn = self.db.conectar()
+        if not conn:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT fecha, total_tareas, completadas, vencidas
+                FROM snapshot_productividad
+                WHERE ambito = 'global' AND id_ambito = 0
+                  AND fecha >= CURDATE() - INTERVAL %s DAY AND fecha < CURDATE()
+                ORDER BY fecha
+            """, (dias,))
+            filas = cursor.fetchall()
+        except Error as e:
+            print(f"⚠️  Tendencia de productividad no disponible: {e}")
+            return []
+        finally:
+            cursor.close()
+            conn.close()
+        for fila in filas:
+            fila['tasa'] = (fila['completadas'] / fila['total_tareas'] * 100) if fila['total_tareas'] > 0 else 0
+        return filas
@@ -1,4 +1,15 @@
 from app.utils.database import Database
+from app.utils.referencias import referencias
+from app.models.contadores_model import ContadoresModel
+from app.models.miembros_model import MiembrosModel
+
+class ProyectoResumen:
+    """Proyecto activo en los desplegables: id y nombre"""
+    __slots__ = ('id', 'nombre')
+
+    def __init__(self, id, nombre):
+        self.id = id
+        self.nombre = nombre
 
 class ProyectoModel:
     def __init__(self):
@@ -22,17 +33,32 @@ class ProyectoModel:
             return proyectos
         return []
     
+    def listar_para_selector(self):
+        """Proyectos activos como tupla de ProyectoResumen ordenada por nombre (datos de referencia en caché)"""
+        return referencias.obtener('proyectos')
+    
+    def cargar_selector(self):
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, nombre FROM proyectos WHERE estado = 'activo' ORDER BY nombre")
+            proyectos = tuple(ProyectoResumen(id_proyecto, nombre) for id_proyecto, nombre in cursor.fetchall())
+            cursor.close()
+            conn.close()
+            return proyectos
+        return None
+    
     def obtener_por_usuario(self, id_usuario):
-        """Obtiene proyectos visibles para un usuario específico"""
+        """Obtiene los proyectos de los que el usuario es líder o tiene tareas asignadas"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
             cursor.execute("""
-                SELECT DISTINCT p.*, u.nombre as lider_nombre 
-                FROM proyectos p 
+                SELECT p.*, u.nombre as lider_nombre 
+                FROM proyecto_miembros m 
+                JOIN proyectos p ON p.id = m.id_proyecto 
                 LEFT JOIN usuarios u ON p.id_lider = u.id 
-                LEFT JOIN tareas t ON p.id = t.id_proyecto 
-                WHERE p.estado = 'activo' AND t.id_asignado = %s
+                WHERE m.id_usuario = %s AND p.estado = 'activo'
                 ORDER BY p.fecha_creacion DESC
             """, (id_usuario,))
             proyectos = cursor.fetchall()
@@ -53,34 +79,45 @@ class ProyectoModel:
             return proyecto
         return None
     
-    def crear(self, nombre, descripcion, id_lider):
+    def crear(self, nombre, descripcion, id_lider, fecha_vencimiento=None):
         """Crea un nuevo proyecto"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO proyectos (nombre, descripcion, id_lider)
-                VALUES (%s, %s, %s)
-            """, (nombre, descripcion, id_lider))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
+            try:
+                conn.start_transaction()
+                cursor.execute("""
+                    INSERT INTO proyectos (nombre, descripcion, id_lider, fecha_vencimiento)
+                    VALUES (%s, %s, %s, %s)
+                """, (nombre, descripcion, id_lider, fecha_vencimiento))
+                MiembrosModel.asignar_lider(cursor, cursor.lastrowid, id_lider)
+                ContadoresModel.aplicar_deltas(cursor, {('global', 0, 'proyectos_activos'): 1})
+                conn.commit()
+                referencias.invalidar('proyectos')
+                return True
+            except Exception as e:
+                print(f"Error al crear proyecto: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
         return False
     
-    def actualizar(self, id_proyecto, nombre, descripcion):
+    def actualizar(self, id_proyecto, nombre, descripcion, fecha_vencimiento=None):
         """Actualiza un proyecto existente"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE proyectos 
-                SET nombre = %s, descripcion = %s
+                SET nombre = %s, descripcion = %s, fecha_vencimiento = %s
                 WHERE id = %s
-            """, (nombre, descripcion, id_proyecto))
+            """, (nombre, descripcion, fecha_vencimiento, id_proyecto))
             conn.commit()
             cursor.close()
             conn.close()
+            referencias.invalidar('proyectos')
             return True
         return False
     
@@ -89,11 +126,23 @@ class ProyectoModel:
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE proyectos SET estado = 'inactivo' WHERE id = %s", (id_proyecto,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
+            try:
+                conn.start_transaction()
+                cursor.execute("SELECT estado FROM proyectos WHERE id = %s FOR UPDATE", (id_proyecto,))
+                fila = cursor.fetchone()
+                cursor.execute("UPDATE proyectos SET estado = 'inactivo' WHERE id = %s", (id_proyecto,))
+                if fila and fila[0] == 'activo':
+                    ContadoresModel.aplicar_deltas(cursor, {('global', 0, 'proyectos_activos'): -1})
+                conn.commit()
+                referencias.invalidar('proyectos')
+                return True
+            except Exception as e:
+                print(f"Error al eliminar proyecto: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
         return False
     
     def obtener_estadisticas(self):
@@ -150,4 +199,6 @@ class ProyectoModel:
             cursor.close()
             conn.close()
             return proyectos
-        return []
\ No newline at end of file
+        return []
+
+referencias.registrar('proyectos', lambda: ProyectoModel().cargar_selector())
@@ -1,4 +1,11 @@
 from app.utils.database import Database
+from app.utils.helpers import codificar_cursor, decodificar_cursor
+from app.models.contadores_model import ContadoresModel, ESTADOS_TAREA
+from app.models.miembros_model import MiembrosModel
+from datetime import date
+
+# Valores del ENUM tareas.prioridad en orden (prioridad + 0 es la posición desde 1)
+PRIORIDADES = ('baja', 'media', 'alta')
 
 class TareaModel:
     def __init__(self):
@@ -23,6 +30,122 @@ class TareaModel:
             return tareas
         return []
     
+    def obtener_pagina(self, limite=50, cursor=None, id_proyecto=None, id_asignado=None,
+                       estado=None, vence_desde=None, vence_hasta=None):
+        """Página de tareas activas ordenada por (prioridad, vencimiento, id) con cursor keyset.
+        
+        Devuelve (tareas, siguiente_cursor); siguiente_cursor es None en la última página.
+        """
+        condiciones = ["t.estado_registro = 'activo'"]
+        params = []
+        if id_proyecto:
+            condiciones.append("t.id_proyecto = %s")
+            params.append(id_proyecto)
+        if id_asignado:
+            condiciones.append("t.id_asignado = %s")
+            params.append(id_asignado)
+        if estado in ESTADOS_TAREA:
+            condiciones.append("t.estado = %s")
+            params.append(estado)
+        if vence_desde:
+            condiciones.append("t.fecha_vencimiento >= %s")
+            params.append(vence_desde)
+        if vence_hasta:
+            condiciones.append("t.fecha_vencimiento <= %s")
+            params.append(vence_hasta)
+        if cursor:
+            condicion, valores = self._condicion_cursor(cursor)
+            condiciones.append(condicion)
+            params.extend(valores)
+        
+        conn = self.db.conectar()
+        if conn:
+            cursor_db = conn.cursor(dictionary=True)
+            cursor_db.execute(f"""
+                SELECT t.*, t.prioridad + 0 AS prioridad_orden,
+                       p.nombre as proyecto_nombre, u.nombre as asignado_nombre 
+                FROM tareas t 
+                LEFT JOIN proyectos p ON t.id_proyecto = p.id 
+                LEFT JOIN usuarios u ON t.id_asignado = u.id 
+                WHERE {' AND '.join(condiciones)}
+                ORDER BY t.prioridad DESC, t.fecha_vencimiento ASC, t.id ASC
+                LIMIT %s
+            """, params + [limite + 1])
+            tareas = cursor_db.fetchall()
+            cursor_db.close()
+            conn.close()
+            
+            siguiente = None
+            if len(tareas) > limite:
+                tareas = tareas[:limite]
+                ultima = tareas[-1]
+                fecha = ultima['fecha_vencimiento']
+                siguiente = codificar_cursor([
+                    int(ultima['prioridad_orden']),
+                    fecha.isoformat() if fecha else None,
+                    ultima['id']
+                ])
+            return tareas, siguiente
+        return [], None
+    
+    def iterar(self, tamano_pagina=500, **filtros):
+        """Recorre todas las tareas que cumplen los filtros página a página (memoria acotada)"""
+        cursor = None
+        while True:
+            tareas, cursor = self.obtener_pagina(tamano_pagina, cursor, **filtros)
+            yield from tareas
+            if not cursor:
+                break
+    
+    @staticmethod
+    def _condicion_cursor(cursor):
+        """Condición SQL 'después de' para el orden prioridad DESC, vencimiento ASC (NULL primero), id ASC.
+        
+        Compara la columna sin expresiones (IN / =) para que MySQL busque en
+        idx_tareas_orden en lugar de filtrar todas las filas anteriores.
+        """
+        try:
+            prioridad, fecha, id_tarea = decodificar_cursor(cursor)
+            prioridad, id_tarea = int(prioridad), int(id_tarea)
+            fecha = date.fromisoformat(fecha) if fecha is not None else None
+        except (TypeError, ValueError):
+            raise ValueError('Cursor inválido')
+        if not 1 <= prioridad <= len(PRIORIDADES):
+            raise ValueError('Cursor inválido')
+        menores = list(PRIORIDADES[:prioridad - 1])
+        if fecha is None:
+            despues_fecha = "t.fecha_vencimiento IS NOT NULL"
+            misma_fecha = "t.fecha_vencimiento IS NULL"
+            valores_fecha = []
+        else:
+            despues_fecha = "t.fecha_vencimiento > %s"
+            misma_fecha = "t.fecha_vencimiento = %s"
+            valores_fecha = [fecha]
+        misma_prioridad = f"(t.prioridad = %s AND ({despues_fecha} OR ({misma_fecha} AND t.id > %s)))"
+        valores = [PRIORIDADES[prioridad - 1]] + valores_fecha + valores_fecha + [id_tarea]
+        if not menores:
+            return misma_prioridad, valores
+        condicion = f"(t.prioridad IN ({', '.join(['%s'] * len(menores))}) OR {misma_prioridad})"
+        return condicion, menores + valores
+    
+    def contar_por_estado(self, id_asignado=None):
+        """Cuenta las tareas activas por estado en una sola consulta"""
+        conteo = {estado: 0 for estado in ESTADOS_TAREA}
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            query = "SELECT estado, COUNT(*) FROM tareas WHERE estado_registro = 'activo'"
+            params = ()
+            if id_asignado:
+                query += " AND id_asignado = %s"
+                params = (id_asignado,)
+            cursor.execute(query + " GROUP BY estado", params)
+            for estado, total in cursor.fetchall():
+                conteo[estado] = total
+            cursor.close()
+            conn.close()
+        return conteo
+    
     def obtener_por_usuario(self, id_usuario, limite=None):
         """Obtiene tareas asignadas a un usuario específico"""
         conn = self.db.conectar()
@@ -51,81 +174,99 @@ class TareaModel:
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO tareas (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
-        return False
-    
-    def actualizar_estado(self, id_tarea, estado):
-        """Actualiza el estado de una tarea"""
-        conn = self.db.conectar()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE tareas SET estado = %s WHERE id = %s", (estado, id_tarea))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
+            try:
+                conn.start_transaction()
+                cursor.execute("""
+                    INSERT INTO tareas (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento))
+                nueva = {
+                    'id_proyecto': id_proyecto,
+                    'id_asignado': id_asignado,
+                    'estado': 'pendiente'
+                }
+                ContadoresModel.aplicar_cambio_tarea(cursor, None, nueva)
+                MiembrosModel.aplicar_cambio_tarea(cursor, None, nueva)
+                conn.commit()
+                return True
+            except Exception as e:
+                print(f"Error al crear tarea: {e}")
+                conn.rollback()
+                return False
+            finally:
+                cursor.close()
+                conn.close()
         return False
     
-    def actualizar_tarea_completa(self, id_tarea, titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento=None, estado=None):
-        """Actualiza una tarea completa incluyendo estado"""
+    def _actualizar_con_contadores(self, id_tarea, query, params, cambios):
+        """Ejecuta un UPDATE de la tarea y ajusta contadores y miembros en la misma transacción"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
             try:
-                # Actualizar todos los campos incluyendo estado
-                cursor.execute("""
-                    UPDATE tareas 
-                    SET titulo = %s, descripcion = %s, id_proyecto = %s, id_asignado = %s, 
-                        prioridad = %s, fecha_vencimiento = %s, estado = %s
-                    WHERE id = %s
-                """, (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento, estado, id_tarea))
+                conn.start_transaction()
+                anterior = ContadoresModel.leer_tarea(cursor, id_tarea)
+                cursor.execute(query, params)
+                if anterior is not None:
+                    nueva = dict(anterior, **cambios)
+                    ContadoresModel.aplicar_cambio_tarea(cursor, anterior, nueva)
+                    MiembrosModel.aplicar_cambio_tarea(cursor, anterior, nueva)
                 conn.commit()
-                cursor.close()
-                conn.close()
                 return True
             except Exception as e:
                 print(f"Error al actualizar tarea: {e}")
                 conn.rollback()
+                return False
+            finally:
                 cursor.close()
                 conn.close()
-            return False
         return False
+    
+    def actualizar_estado(self, id_tarea, estado):
+        """Actualiza el estado de una tarea"""
+        return self._actualizar_con_contadores(
+            id_tarea,
+            "UPDATE tareas SET estado = %s WHERE id = %s",
+            (estado, id_tarea),
+            {'estado': estado}
+        )
+    
+    def actualizar_tarea_completa(self, id_tarea, titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento=None, estado=None):
+        """Actualiza una tarea completa incluyendo estado"""
+        return self._actualizar_con_contadores(
+            id_tarea,
+            """
+                UPDATE tareas 
+                SET titulo = %s, descripcion = %s, id_proyecto = %s, id_asignado = %s, 
+                    prioridad = %s, fecha_vencimiento = %s, estado = %s
+                WHERE id = %s
+            """,
+            (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento, estado, id_tarea),
+            {'id_proyecto': id_proyecto, 'id_asignado': id_asignado, 'estado': estado}
+        )
 
     def actualizar_tarea(self, id_tarea, titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento=None):
         """Actualiza una tarea completa"""
-        conn = self.db.conectar()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
+        return self._actualizar_con_contadores(
+            id_tarea,
+            """
                 UPDATE tareas 
                 SET titulo = %s, descripcion = %s, id_proyecto = %s, id_asignado = %s, 
                     prioridad = %s, fecha_vencimiento = %s
                 WHERE id = %s
-            """, (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento, id_tarea))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
-        return False
+            """,
+            (titulo, descripcion, id_proyecto, id_asignado, prioridad, fecha_vencimiento, id_tarea),
+            {'id_proyecto': id_proyecto, 'id_asignado': id_asignado}
+        )
     
     def eliminar(self, id_tarea):
         """Elimina una tarea (cambia estado a inactivo)"""
-        conn = self.db.conectar()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE tareas SET estado_registro = 'inactivo' WHERE id = %s", (id_tarea,))
-            conn.commit()
-            cursor.close()
-            conn.close()
-            return True
-        return False
+        return self._actualizar_con_contadores(
+            id_tarea,
+            "UPDATE tareas SET estado_registro = 'inactivo' WHERE id = %s",
+            (id_tarea,),
+            {'estado_registro': 'inactivo'}
+        )
     
     def obtener_estadisticas(self):
         """Obtiene estadísticas de tareas"""
@@ -162,4 +303,51 @@ class TareaModel:
             cursor.close()
             conn.close()
             return result['total'] if result else 0
-        return 0
\ No newline at end of file
+        return 0
+    
+    def obtener_productividad_usuarios(self):
+        """Tareas asignadas y completadas de cada usuario activo en una sola consulta"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT u.id, u.nombre, u.email, u.rol,
+                       COUNT(t.id) AS tareas_asignadas,
+                       COALESCE(SUM(t.estado = 'completada'), 0) AS tareas_completadas
+                FROM usuarios u
+                LEFT JOIN tareas t ON t.id_asignado = u.id AND t.estado_registro = 'activo'
+                WHERE u.estado = 'activo'
+                GROUP BY u.id, u.nombre, u.email, u.rol
+                ORDER BY u.nombre
+            """)
+            filas = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            for fila in filas:
+                fila['tareas_completadas'] = int(fila['tareas_completadas'])
+                fila['eficiencia'] = (fila['tareas_completadas'] / fila['tareas_asignadas'] * 100) if fila['tareas_asignadas'] > 0 else 0
+            return filas
+        return []
+    
+    def obtener_productividad_proyectos(self):
+        """Total de tareas y completadas de cada proyecto activo en una sola consulta"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT p.id, p.nombre,
+                       COUNT(t.id) AS total_tareas,
+                       COALESCE(SUM(t.estado = 'completada'), 0) AS completadas
+                FROM proyectos p
+                LEFT JOIN tareas t ON t.id_proyecto = p.id AND t.estado_registro = 'activo'
+                WHERE p.estado = 'activo'
+                GROUP BY p.id, p.nombre
+            """)
+            filas = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            for fila in filas:
+                fila['completadas'] = int(fila['completadas'])
+                fila['porcentaje'] = (fila['completadas'] / fila['total_tareas'] * 100) if fila['total_tareas'] > 0 else 0
+            return filas
+        return []
\ No newline at end of file
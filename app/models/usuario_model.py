@@ -1,9 +1,30 @@
 # [file name]: usuario_model.py
 # [CORRECCIÓN COMPLETA]
 from app.utils.database import Database
-from flask_login import UserMixin
+from app.utils.cache import TTLCache
+from app.utils.contrasenas import pool_hash, HashSaturadoError
+from app.utils.referencias import referencias
+import os
+
+# Usuarios de sesión (user_loader): evita un SELECT por request autenticado
+cache_usuarios = TTLCache(
+    'usuarios',
+    max_items=int(os.environ.get('USER_CACHE_SIZE', '2048')),
+    ttl=float(os.environ.get('USER_CACHE_TTL', '60'))
+)
+
+# Emails sin cuenta activa: los reintentos de login no llegan a MySQL
+cache_emails_desconocidos = TTLCache(
+    'emails_desconocidos',
+    max_items=int(os.environ.get('LOGIN_CACHE_DESCONOCIDOS', '10000')),
+    ttl=float(os.environ.get('LOGIN_CACHE_DESCONOCIDOS_TTL', '300'))
+)
+
+class User:
+    # Sin __dict__ por instancia (cientos de usuarios en caché). No hereda de UserMixin,
+    # que no define __slots__: la interfaz de Flask-Login se implementa aquí mismo
+    __slots__ = ('id', 'nombre', 'email', 'password', 'rol', 'estado', 'fecha_creacion')
 
-class User(UserMixin):
     def __init__(self, id, nombre, email, password, rol, estado='activo', fecha_creacion=None):
         self.id = id
         self.nombre = nombre
@@ -28,6 +49,15 @@ class User(UserMixin):
     def is_anonymous(self):
         return False
 
+class UserSummary:
+    """Lo que necesitan los desplegables y la lista del chat: id, nombre y rol"""
+    __slots__ = ('id', 'nombre', 'rol')
+
+    def __init__(self, id, nombre, rol):
+        self.id = id
+        self.nombre = nombre
+        self.rol = rol
+
 class UsuarioModel:
     def __init__(self):
         self.db = Database()
@@ -56,11 +86,14 @@ class UsuarioModel:
         return None
     
     def obtener_por_id(self, id_usuario):
-        """Obtiene usuario por ID - CORREGIDO"""
+        """Obtiene el usuario de sesión por ID (sin el hash de la contraseña)"""
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM usuarios WHERE id = %s AND estado = 'activo'", (id_usuario,))
+            cursor.execute("""
+                SELECT id, nombre, email, rol, estado, fecha_creacion
+                FROM usuarios WHERE id = %s AND estado = 'activo'
+            """, (id_usuario,))
             usuario_data = cursor.fetchone()
             cursor.close()
             conn.close()
@@ -70,7 +103,7 @@ class UsuarioModel:
                     usuario_data['id'], 
                     usuario_data['nombre'], 
                     usuario_data['email'], 
-                    usuario_data['password'],
+                    None,
                     usuario_data['rol'], 
                     usuario_data['estado'],
                     usuario_data['fecha_creacion']
@@ -78,17 +111,39 @@ class UsuarioModel:
             return None
         return None
     
+    def obtener_por_id_cache(self, id_usuario):
+        """Obtiene usuario por ID pasando por la caché de sesiones"""
+        return cache_usuarios.obtener_o_cargar(id_usuario, lambda: self.obtener_por_id(id_usuario))
+    
     def verificar_login(self, email, password):
-        """Verifica credenciales de login - CORREGIDO"""
+        """Verifica credenciales de login y actualiza el hash si es antiguo.
+
+        El hash se calcula en el pool de contrasenas; lanza HashSaturadoError
+        si está saturado. Un email desconocido cuesta lo mismo que una
+        contraseña incorrecta y se recuerda para no volver a consultarlo.
+        """
+        clave_email = email.lower()
+        if cache_emails_desconocidos.obtener(clave_email):
+            return pool_hash.verificar_ficticio(password) or None
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM usuarios WHERE email = %s AND estado = 'activo'", (email,))
+            cursor.execute("""
+                SELECT id, nombre, email, password, rol, estado, fecha_creacion
+                FROM usuarios WHERE email = %s AND estado = 'activo'
+            """, (email,))
             usuario_data = cursor.fetchone()
             cursor.close()
             conn.close()
             
-            if usuario_data and usuario_data['password'] == password:
+            if usuario_data is None:
+                cache_emails_desconocidos.guardar(clave_email, True)
+                return pool_hash.verificar_ficticio(password) or None
+            if pool_hash.verificar(usuario_data['password'], password):
+                if pool_hash.necesita_rehash(usuario_data['password']):
+                    usuario_data['password'] = self._rehashear(
+                        usuario_data['id'], usuario_data['password'], password
+                    )
                 return User(
                     usuario_data['id'], 
                     usuario_data['nombre'], 
@@ -100,32 +155,49 @@ class UsuarioModel:
                 )
         return None
     
-    def obtener_usuarios_activos(self):
-        """Obtiene todos los usuarios activos"""
+    def _rehashear(self, id_usuario, anterior, password):
+        """Sustituye texto plano o un hash de otro coste por uno con el método actual"""
+        try:
+            nuevo = pool_hash.hashear(password)
+        except HashSaturadoError:
+            return anterior  # Se reintenta en el próximo login
+        conn = self.db.conectar()
+        if not conn:
+            return anterior
+        cursor = conn.cursor()
+        # Solo si nadie cambió la contraseña entretanto; un rehash no invalida la caché de reportes
+        cursor.execute("""
+            UPDATE usuarios SET password = %s, fecha_actualizacion = fecha_actualizacion
+            WHERE id = %s AND password = %s
+        """, (nuevo, id_usuario, anterior))
+        actualizado = cursor.rowcount
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return nuevo if actualizado else anterior
+    
+    def listar_para_selector(self):
+        """Usuarios activos como tupla de UserSummary ordenada por nombre (datos de referencia en caché)"""
+        return referencias.obtener('usuarios')
+    
+    def cargar_selector(self):
         conn = self.db.conectar()
         if conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT id, nombre, email, rol, password, fecha_creacion FROM usuarios WHERE estado = 'activo'")
-            usuarios_data = cursor.fetchall()
+            cursor = conn.cursor()
+            # Cubierta por idx_usuarios_estado (estado, nombre)
+            cursor.execute("SELECT id, nombre, rol FROM usuarios WHERE estado = 'activo' ORDER BY nombre")
+            directorio = tuple(UserSummary(id_usuario, nombre, rol) for id_usuario, nombre, rol in cursor.fetchall())
             cursor.close()
             conn.close()
-            
-            usuarios = []
-            for usuario_data in usuarios_data:
-                usuarios.append(User(
-                    usuario_data['id'], 
-                    usuario_data['nombre'], 
-                    usuario_data['email'], 
-                    usuario_data['password'],
-                    usuario_data['rol'],
-                    'activo',
-                    usuario_data['fecha_creacion']
-                ))
-            return usuarios
-        return []
+            return directorio
+        return None
     
     def crear(self, nombre, email, password, rol='Colaborador'):
         """Crea un nuevo usuario - MEJORADO"""
+        try:
+            password_hash = pool_hash.hashear(password)
+        except HashSaturadoError:
+            return False, "El servidor está ocupado, inténtalo de nuevo en unos segundos"
         conn = self.db.conectar()
         if conn:
             cursor = conn.cursor()
@@ -137,9 +209,14 @@ class UsuarioModel:
                 cursor.execute("""
                     INSERT INTO usuarios (nombre, email, password, rol)
                     VALUES (%s, %s, %s, %s)
-                """, (nombre, email, password, rol))
+                """, (nombre, email, password_hash, rol))
+                
+                # Configuración por defecto creada junto con el usuario
+                cursor.execute("INSERT IGNORE INTO config_usuario (id_usuario) VALUES (%s)", (cursor.lastrowid,))
                 
                 conn.commit()
+                cache_emails_desconocidos.invalidar(email.lower())
+                referencias.invalidar('usuarios')
                 cursor.close()
                 conn.close()
                 return True, "Usuario creado exitosamente"
@@ -149,4 +226,22 @@ class UsuarioModel:
                 cursor.close()
                 conn.close()
                 return False, f"Error al crear usuario: {str(e)}"
-        return False, "Error de conexión a la base de datos"
\ No newline at end of file
+        return False, "Error de conexión a la base de datos"
+    
+    def registrar_acceso(self, id_usuario):
+        """Guarda la fecha del último inicio de sesión"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            # fecha_actualizacion se conserva: un login no invalida la caché de reportes
+            cursor.execute("""
+                UPDATE usuarios SET ultimo_acceso = NOW(), fecha_actualizacion = fecha_actualizacion
+                WHERE id = %s
+            """, (id_usuario,))
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return True
+        return False
+
+referencias.registrar('usuarios', lambda: UsuarioModel().cargar_selector())
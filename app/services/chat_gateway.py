@@ -0,0 +1,240 @@
+# [file name]: chat_gateway.py
+# Gateway asyncio del chat: WebSockets por usuario, difusión en memoria e inserciones por lotes
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import parse_qs
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+CHAT_TOKEN_SALT = 'chat-ws'
+CHAT_TOKEN_TTL = int(os.environ.get('CHAT_TOKEN_TTL', str(12 * 3600)))
+CHAT_LOTE_MAXIMO = int(os.environ.get('CHAT_LOTE_MAXIMO', '100'))
+CHAT_LOTE_ESPERA = float(os.environ.get('CHAT_LOTE_ESPERA', '0.05'))
+# Frames pendientes por conexión antes de cerrarla por lenta
+CHAT_COLA_CONEXION = 256
+LONGITUD_MAXIMA = 500
+
+
+def generar_token(secret_key, usuario):
+    """Token firmado con los datos del usuario para abrir el WebSocket"""
+    serializer = URLSafeTimedSerializer(secret_key, salt=CHAT_TOKEN_SALT)
+    return serializer.dumps({'id': usuario.id, 'nombre': usuario.nombre, 'rol': usuario.rol})
+
+
+def leer_token(secret_key, token):
+    """Devuelve los datos del usuario o None si el token no es válido o expiró"""
+    serializer = URLSafeTimedSerializer(secret_key, salt=CHAT_TOKEN_SALT)
+    try:
+        return serializer.loads(token, max_age=CHAT_TOKEN_TTL)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+class Conexion:
+    """Un WebSocket abierto: los envíos pasan por una cola para no frenar la difusión"""
+
+    def __init__(self, usuario, send):
+        self.usuario = usuario
+        self._send = send
+        self._cola = asyncio.Queue(maxsize=CHAT_COLA_CONEXION)
+        self._tarea = asyncio.ensure_future(self._enviar())
+        self.cerrada = False
+
+    def encolar(self, texto):
+        if self.cerrada:
+            return
+        try:
+            self._cola.put_nowait(texto)
+        except asyncio.QueueFull:
+            # Cliente que no lee: se desconecta y recuperará con after_id
+            self.cerrar(1013)
+
+    def cerrar(self, codigo=1000):
+        if not self.cerrada:
+            self.cerrada = True
+            asyncio.ensure_future(self._cerrar_socket(codigo))
+
+    def descartar(self):
+        """Libera la tarea de envío cuando el cliente ya se fue"""
+        self.cerrada = True
+        self._tarea.cancel()
+
+    async def _cerrar_socket(self, codigo):
+        self._tarea.cancel()
+        try:
+            await self._send({'type': 'websocket.close', 'code': codigo})
+        except Exception:
+            pass
+
+    async def _enviar(self):
+        while True:
+            texto = await self._cola.get()
+            try:
+                await self._send({'type': 'websocket.send', 'text': texto})
+            except Exception:
+                self.cerrada = True
+                return
+
+
+class EscritorLotes:
+    """Agrupa los mensajes recibidos y los persiste en MySQL desde un hilo"""
+
+    def __init__(self, guardar, al_guardar):
+        self._guardar = guardar
+        self._al_guardar = al_guardar
+        self._cola = asyncio.Queue()
+        self._tarea = None
+        self.stats = {'lotes': 0, 'mensajes': 0, 'fallidos': 0, 'ultimo_lote_ms': 0.0}
+
+    def iniciar(self):
+        if self._tarea is None:
+            self._tarea = asyncio.ensure_future(self._ejecutar())
+
+    def encolar(self, mensaje):
+        self._cola.put_nowait(mensaje)
+
+    async def detener(self):
+        """Persiste lo pendiente antes de apagar el proceso"""
+        if self._tarea is not None:
+            self._cola.put_nowait(None)
+            await self._tarea
+            self._tarea = None
+
+    async def _ejecutar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            primero = await self._cola.get()
+            lote = [] if primero is None else [primero]
+            fin = primero is None
+            # Espera corta para juntar lo que llegue casi a la vez
+            limite = loop.time() + CHAT_LOTE_ESPERA
+            while not fin and len(lote) < CHAT_LOTE_MAXIMO:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = await asyncio.wait_for(self._cola.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                if siguiente is None:
+                    fin = True
+                else:
+                    lote.append(siguiente)
+            while fin and not self._cola.empty():
+                siguiente = self._cola.get_nowait()
+                if siguiente is not None:
+                    lote.append(siguiente)
+            if lote:
+                await self._persistir(loop, lote)
+            if fin:
+                return
+
+    async def _persistir(self, loop, lote):
+        inicio = time.perf_counter()
+        try:
+            ids = await loop.run_in_executor(None, self._guardar, lote)
+        except Exception as e:
+            print(f"❌ Error persistiendo lote del chat: {e}")
+            ids = None
+        self.stats['ultimo_lote_ms'] = (time.perf_counter() - inicio) * 1000
+        self.stats['lotes'] += 1
+        if ids is None:
+            self.stats['fallidos'] += len(lote)
+        else:
+            self.stats['mensajes'] += len(lote)
+        self._al_guardar(lote, ids)
+
+
+class ChatGateway:
+    """Sala única del chat del equipo: conexiones en memoria del proceso"""
+
+    def __init__(self, secret_key, guardar):
+        self.secret_key = secret_key
+        self._conexiones = set()
+        # uid -> (conexión del autor, frame) de los mensajes aún no guardados
+        self._pendientes = {}
+        self.escritor = EscritorLotes(guardar, self._confirmar)
+        self.stats = {'recibidos': 0, 'difundidos': 0, 'rechazadas': 0}
+
+    def metricas(self):
+        datos = dict(self.stats)
+        datos['conexiones'] = len(self._conexiones)
+        datos['escritor'] = dict(self.escritor.stats)
+        return datos
+
+    def _difundir(self, frame):
+        texto = json.dumps(frame, default=str)
+        for conexion in list(self._conexiones):
+            conexion.encolar(texto)
+        self.stats['difundidos'] += 1
+
+    def _confirmar(self, lote, ids):
+        """Tras guardar un lote, difunde sus mensajes con el id definitivo (o avisa al autor del fallo)"""
+        for posicion, m in enumerate(lote):
+            conexion, frame = self._pendientes.pop(m['uid'])
+            if ids is None:
+                conexion.encolar(json.dumps({'tipo': 'fallidos', 'uids': [m['uid']]}))
+            else:
+                self._difundir(dict(frame, id=ids[posicion]))
+
+    def recibir(self, conexion, texto):
+        try:
+            mensaje = str(json.loads(texto).get('mensaje', '')).strip()
+        except (ValueError, AttributeError):
+            return
+        if not mensaje or len(mensaje) > LONGITUD_MAXIMA:
+            conexion.encolar(json.dumps({'tipo': 'error', 'error': 'Mensaje vacío o demasiado largo'}))
+            return
+        ahora = datetime.now()
+        usuario = conexion.usuario
+        item = {
+            'uid': uuid.uuid4().hex,
+            'id_usuario': usuario['id'],
+            'mensaje': mensaje,
+            'fecha': ahora
+        }
+        self.stats['recibidos'] += 1
+        # El autor lo ve al instante como provisional; el resto de la sala solo
+        # lo recibe cuando el lote está guardado, así nadie ve mensajes que se pierden
+        frame = {
+            'tipo': 'mensaje',
+            'uid': item['uid'],
+            'id_usuario': usuario['id'],
+            'usuario_nombre': usuario['nombre'],
+            'usuario_rol': usuario['rol'],
+            'mensaje': mensaje,
+            'hora': ahora.strftime('%H:%M')
+        }
+        self._pendientes[item['uid']] = (conexion, frame)
+        conexion.encolar(json.dumps(dict(frame, provisional=True)))
+        self.escritor.encolar(item)
+
+    async def atender(self, scope, receive, send):
+        """Ciclo de vida de un WebSocket según el protocolo ASGI"""
+        evento = await receive()
+        if evento['type'] != 'websocket.connect':
+            return
+        parametros = parse_qs(scope.get('query_string', b'').decode())
+        usuario = leer_token(self.secret_key, parametros.get('token', [''])[0])
+        if usuario is None:
+            self.stats['rechazadas'] += 1
+            await send({'type': 'websocket.close', 'code': 4401})
+            return
+
+        self.escritor.iniciar()
+        await send({'type': 'websocket.accept'})
+        conexion = Conexion(usuario, send)
+        self._conexiones.add(conexion)
+        try:
+            while not conexion.cerrada:
+                evento = await receive()
+                if evento['type'] == 'websocket.disconnect':
+                    break
+                if evento['type'] == 'websocket.receive' and evento.get('text'):
+                    self.recibir(conexion, evento['text'])
+        finally:
+            self._conexiones.discard(conexion)
+            conexion.descartar()
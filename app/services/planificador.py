@@ -0,0 +1,148 @@
+# [file name]: planificador.py
+# Trabajos periódicos en segundo plano con un único líder por bloqueo de MySQL (GET_LOCK)
+import json
+import os
+import threading
+import time
+from app.utils.metricas import registrar_metricas
+
+# web: hilo dentro de cada worker | externo: solo con 'flask trabajos servir' | desactivado
+PLANIFICADOR = os.environ.get('PLANIFICADOR', 'web')
+PLANIFICADOR_TICK = float(os.environ.get('PLANIFICADOR_TICK', '15'))
+
+
+class Trabajo:
+    """Función sin argumentos que se ejecuta cada `intervalo` segundos"""
+
+    def __init__(self, nombre, funcion, intervalo):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self.proximo = 0.0
+        self.stats = {'ejecuciones': 0, 'errores': 0, 'omitidas': 0,
+                      'ultima_duracion_ms': None, 'max_duracion_ms': 0.0,
+                      'total_duracion_ms': 0.0, 'ultimo_resultado': None}
+
+
+class Planificador:
+    """Registro de trabajos y bucle que los lanza cuando les toca.
+
+    Todos los workers pueden tener el bucle activo: cada ejecución toma un
+    bloqueo con nombre y consulta la última ejecución correcta en
+    trabajos_ejecuciones, así que un trabajo corre una sola vez por intervalo.
+    """
+
+    def __init__(self, tick=PLANIFICADOR_TICK):
+        self.tick = tick
+        self._trabajos = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+
+    def registrar(self, nombre, intervalo):
+        """Decorador: @planificador.registrar('vencimientos', intervalo=3600)"""
+        def decorador(funcion):
+            self._trabajos[nombre] = Trabajo(nombre, funcion, intervalo)
+            return funcion
+        return decorador
+
+    def trabajos(self):
+        return list(self._trabajos)
+
+    def iniciar(self):
+        """Arranca el hilo del bucle (una vez por proceso, también tras un fork)"""
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self.servir, name='planificador', daemon=True)
+                self._hilo.start()
+
+    def servir(self):
+        """Bucle del planificador (en un hilo o como proceso aparte)"""
+        while True:
+            for trabajo in list(self._trabajos.values()):
+                if time.monotonic() >= trabajo.proximo:
+                    self.ejecutar(trabajo.nombre)
+            time.sleep(self.tick)
+
+    def ejecutar(self, nombre, forzar=False):
+        """Ejecuta un trabajo si este proceso es el líder y ya le toca.
+
+        forzar=True ignora el intervalo, pero nunca corre en paralelo con otra
+        ejecución. Devuelve {'estado': 'ok'|'error'|'omitido', ...}.
+        """
+        from app.utils.database import Database
+        trabajo = self._trabajos[nombre]
+        conn = Database().conectar()
+        if not conn:
+            trabajo.proximo = time.monotonic() + self.tick
+            return {'estado': 'omitido', 'motivo': 'sin conexión'}
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (f'startask_trabajo_{nombre}',))
+            if cursor.fetchone()[0] != 1:
+                # Otro proceso lo está ejecutando; se vuelve a mirar en el siguiente tick
+                trabajo.proximo = time.monotonic() + self.tick
+                return self._omitir(trabajo, 'en ejecución en otro proceso')
+            try:
+                cursor.execute("""
+                    SELECT NOW(), TIMESTAMPDIFF(SECOND, MAX(inicio), NOW())
+                    FROM trabajos_ejecuciones WHERE trabajo = %s AND estado = 'ok'
+                """, (nombre,))
+                inicio, transcurrido = cursor.fetchone()
+                if not forzar and transcurrido is not None and transcurrido < trabajo.intervalo:
+                    trabajo.proximo = time.monotonic() + trabajo.intervalo - transcurrido
+                    return self._omitir(trabajo, 'ejecutado recientemente')
+                return self._correr(cursor, conn, trabajo, inicio)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (f'startask_trabajo_{nombre}',))
+                cursor.fetchone()
+        except Exception as e:
+            print(f"⚠️  Planificador: error coordinando '{nombre}': {e}")
+            trabajo.proximo = time.monotonic() + self.tick
+            return {'estado': 'error', 'error': str(e)}
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _correr(self, cursor, conn, trabajo, inicio):
+        t0 = time.perf_counter()
+        try:
+            resultado = trabajo.funcion()
+            estado = 'ok'
+        except Exception as e:
+            print(f"❌ Trabajo '{trabajo.nombre}' falló: {e}")
+            resultado = {'error': str(e)}
+            estado = 'error'
+        duracion = (time.perf_counter() - t0) * 1000
+        trabajo.proximo = time.monotonic() + (trabajo.intervalo if estado == 'ok' else self.tick * 4)
+        with self._lock:
+            stats = trabajo.stats
+            stats['ejecuciones'] += 1
+            stats['errores'] += estado == 'error'
+            stats['ultima_duracion_ms'] = round(duracion, 1)
+            stats['max_duracion_ms'] = max(stats['max_duracion_ms'], round(duracion, 1))
+            stats['total_duracion_ms'] += duracion
+            stats['ultimo_resultado'] = resultado
+        cursor.execute("""
+            INSERT INTO trabajos_ejecuciones (trabajo, inicio, duracion_ms, estado, resultado)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (trabajo.nombre, inicio, int(duracion), estado, json.dumps(resultado, default=str)[:500]))
+        conn.commit()
+        return {'estado': estado, 'duracion_ms': round(duracion, 1), 'resultado': resultado}
+
+    def _omitir(self, trabajo, motivo):
+        with self._lock:
+            trabajo.stats['omitidas'] += 1
+        return {'estado': 'omitido', 'motivo': motivo}
+
+    def metricas(self):
+        with self._lock:
+            return {nombre: dict(t.stats, intervalo=t.intervalo)
+                    for nombre, t in self._trabajos.items()}
+
+
+planificador = Planificador()
+registrar_metricas('planificador', planificador.metricas)
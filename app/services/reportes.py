@@ -0,0 +1,263 @@
+# [file name]: reportes.py
+# Cola de reportes PDF: se dibujan en un pool de procesos y se guardan en disco por versión de datos
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from app.services.reportes_pdf import generar_reporte
+from app.utils.database import Database
+from app.utils.metricas import registrar_metricas
+
+REPORTES_DIR = os.environ.get('REPORTES_DIR', os.path.join(tempfile.gettempdir(), 'startask_reportes'))
+# 0 = dibujar en hilos del propio worker (entornos sin multiprocessing)
+REPORTES_PROCESOS = int(os.environ.get('REPORTES_PROCESOS', '2'))
+REPORTES_CACHE_DIAS = int(os.environ.get('REPORTES_CACHE_DIAS', '7'))
+# Un trabajo sin terminar pasado este tiempo se da por perdido (worker reiniciado)
+REPORTES_TIMEOUT = 600
+
+_ID_VALIDO = re.compile(r'^[0-9a-f]{32}$')
+
+
+class TipoReporte:
+    def __init__(self, tablas, archivo, actividad, roles=None):
+        self.tablas = tablas          # Tablas cuya versión invalida el reporte
+        self.archivo = archivo        # Prefijo del nombre de descarga
+        self.actividad = actividad    # Texto para el historial
+        self.roles = roles            # None = cualquier usuario autenticado
+
+
+TIPOS = {
+    'proyectos': TipoReporte(('proyectos', 'usuarios'), 'reporte_proyectos',
+                             'Generó reporte PDF de proyectos'),
+    'tareas': TipoReporte(('tareas', 'proyectos', 'usuarios'), 'reporte_tareas',
+                          'Generó reporte PDF de tareas'),
+    'equipo': TipoReporte(('usuarios', 'tareas'), 'reporte_equipo',
+                          'Generó reporte PDF del equipo', ('Administrador', 'Líder de Proyecto')),
+    'resumen_proyectos': TipoReporte(('proyectos', 'usuarios'), 'reporte_proyectos',
+                                     'Generó reporte PDF de proyectos')
+}
+
+
+def alcance(tipo, usuario):
+    """Filas que ve el usuario en el reporte (el Colaborador solo ve sus tareas)"""
+    if tipo == 'tareas' and usuario['rol'] == 'Colaborador':
+        return f"usuario:{usuario['id']}"
+    return 'todos'
+
+
+def version_datos(tablas):
+    """Huella barata de las tablas: último id y última modificación (ambos por índice)"""
+    conn = Database().conectar()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute(" UNION ALL ".join(
+            f"SELECT '{tabla}', COALESCE(MAX(id), 0), MAX(fecha_actualizacion) FROM {tabla}"
+            for tabla in tablas
+        ))
+        return [[tabla, ultimo_id, str(modificado)] for tabla, ultimo_id, modificado in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class ColaReportes:
+    """Trabajos de reporte compartidos entre workers a través del disco local.
+
+    El estado de cada trabajo es un JSON en <dir>/trabajos y los PDF terminados
+    quedan en <dir>/cache con nombre derivado de (tipo, alcance, versión de datos),
+    así que pedir otra vez un reporte sin cambios se sirve sin dibujarlo.
+    """
+
+    def __init__(self, directorio=REPORTES_DIR, procesos=REPORTES_PROCESOS):
+        self.directorio = directorio
+        self.procesos = procesos
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._en_curso = {}
+        self._stats = {'enviados': 0, 'desde_cache': 0, 'generados': 0, 'errores': 0,
+                       'ultimo_ms': None, 'max_ms': 0.0}
+
+    # --- API ---
+
+    def enviar(self, tipo, usuario):
+        """Encola un reporte y devuelve su trabajo (ya 'listo' si estaba en caché).
+
+        usuario es un dict {id, nombre, rol}. Lanza RuntimeError sin base de datos.
+        """
+        version = version_datos(TIPOS[tipo].tablas)
+        if version is None:
+            raise RuntimeError('sin conexión a la base de datos')
+        # El nombre de quien lo generó y la fecha de generación aparecen en la cabecera
+        # del PDF: la fecha en la clave hace que la caché no sirva un PDF de otro día
+        hoy = datetime.now().date().isoformat()
+        huella = json.dumps([tipo, alcance(tipo, usuario), usuario['nombre'], version, hoy])
+        clave = hashlib.sha256(huella.encode('utf-8')).hexdigest()[:32]
+        archivo = os.path.join(self.directorio, 'cache', f'{tipo}_{clave}.pdf')
+        trabajo = {
+            'id': uuid.uuid4().hex,
+            'tipo': tipo,
+            'id_usuario': usuario['id'],
+            'estado': 'en_cola',
+            'archivo': archivo,
+            'nombre': f"{TIPOS[tipo].archivo}_{datetime.now().strftime('%Y%m%d')}.pdf",
+            'creado': time.time(),
+            'cache': False,
+            'error': None
+        }
+        with self._lock:
+            self._stats['enviados'] += 1
+
+        if os.path.exists(archivo):
+            os.utime(archivo)  # La purga cuenta desde el último uso
+            trabajo.update(estado='listo', cache=True, terminado=time.time())
+            with self._lock:
+                self._stats['desde_cache'] += 1
+            self._guardar(trabajo)
+            return trabajo
+
+        with self._lock:
+            # Mismo reporte ya en marcha en este proceso: se espera al mismo resultado
+            esperando = self._en_curso.get(clave)
+            if esperando is not None:
+                esperando.append(trabajo['id'])
+            else:
+                self._en_curso[clave] = [trabajo['id']]
+        self._guardar(trabajo)
+        if esperando is not None:
+            return trabajo
+
+        temporal = f"{archivo}.{trabajo['id']}.tmp"
+        inicio = time.perf_counter()
+        try:
+            futuro = self._obtener_pool().submit(generar_reporte, tipo, usuario, temporal)
+        except Exception as e:
+            self._terminar(clave, error=f'No se pudo encolar: {e}')
+            return self.estado(trabajo['id'])
+        self._actualizar(trabajo['id'], estado='procesando')
+        futuro.add_done_callback(lambda f: self._al_terminar(f, clave, temporal, archivo, inicio))
+        return self.estado(trabajo['id'])
+
+    def estado(self, id_trabajo):
+        """Estado de un trabajo o None si no existe"""
+        if not _ID_VALIDO.match(id_trabajo or ''):
+            return None
+        try:
+            with open(self._ruta_trabajo(id_trabajo), encoding='utf-8') as f:
+                trabajo = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if trabajo['estado'] in ('en_cola', 'procesando') and time.time() - trabajo['creado'] > REPORTES_TIMEOUT:
+            trabajo.update(estado='error', error='Tiempo de generación agotado')
+        return trabajo
+
+    def esperar(self, id_trabajo, timeout):
+        """Espera a que el trabajo termine (listo o error) como mucho `timeout` segundos"""
+        fin = time.monotonic() + timeout
+        while True:
+            trabajo = self.estado(id_trabajo)
+            if trabajo is None or trabajo['estado'] in ('listo', 'error') or time.monotonic() >= fin:
+                return trabajo
+            time.sleep(0.25)
+
+    def purgar(self, dias=REPORTES_CACHE_DIAS):
+        """Borra PDF y estados de trabajo sin usar desde hace más de `dias` días"""
+        limite = time.time() - dias * 86400
+        eliminados = 0
+        for subdirectorio in ('cache', 'trabajos'):
+            ruta = os.path.join(self.directorio, subdirectorio)
+            if not os.path.isdir(ruta):
+                continue
+            for nombre in os.listdir(ruta):
+                archivo = os.path.join(ruta, nombre)
+                try:
+                    if os.path.getmtime(archivo) < limite:
+                        os.remove(archivo)
+                        eliminados += 1
+                except OSError:
+                    pass
+        return eliminados
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['en_curso'] = len(self._en_curso)
+        datos['procesos'] = self.procesos
+        return datos
+
+    # --- Internos ---
+
+    def _obtener_pool(self):
+        # Un pool por proceso: tras el fork de gunicorn el del padre no sirve
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                if self.procesos > 0:
+                    # 'spawn': hacer fork de un worker con hilos y conexiones abiertas no es seguro
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.procesos, mp_context=multiprocessing.get_context('spawn')
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='reportes')
+            return self._pool
+
+    def _al_terminar(self, futuro, clave, temporal, archivo, inicio):
+        duracion = (time.perf_counter() - inicio) * 1000
+        try:
+            futuro.result()
+            os.replace(temporal, archivo)
+        except Exception as e:
+            print(f"❌ Error generando reporte: {e}")
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            self._terminar(clave, error=str(e) or e.__class__.__name__)
+            return
+        with self._lock:
+            self._stats['generados'] += 1
+            self._stats['ultimo_ms'] = round(duracion, 1)
+            self._stats['max_ms'] = max(self._stats['max_ms'], round(duracion, 1))
+        self._terminar(clave)
+
+    def _terminar(self, clave, error=None):
+        with self._lock:
+            ids = self._en_curso.pop(clave, [])
+            if error:
+                self._stats['errores'] += 1
+        for id_trabajo in ids:
+            if error:
+                self._actualizar(id_trabajo, estado='error', error=error, terminado=time.time())
+            else:
+                self._actualizar(id_trabajo, estado='listo', terminado=time.time())
+
+    def _ruta_trabajo(self, id_trabajo):
+        return os.path.join(self.directorio, 'trabajos', f'{id_trabajo}.json')
+
+    def _guardar(self, trabajo):
+        ruta = self._ruta_trabajo(trabajo['id'])
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        os.makedirs(os.path.join(self.directorio, 'cache'), exist_ok=True)
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(trabajo, f)
+        os.replace(temporal, ruta)
+
+    def _actualizar(self, id_trabajo, **cambios):
+        trabajo = self.estado(id_trabajo)
+        if trabajo is not None:
+            trabajo.update(cambios)
+            self._guardar(trabajo)
+
+
+cola_reportes = ColaReportes()
+registrar_metricas('reportes', cola_reportes.metricas)
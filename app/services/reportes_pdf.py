@@ -0,0 +1,396 @@
+# [file name]: reportes_pdf.py
+# Carga de datos y dibujo de los reportes PDF; se ejecuta en los procesos del pool de reportes
+#
+# Cada reporte es una especificación declarativa (EspecReporte: cabecera, columnas,
+# anchos y tamaños de letra) que se compila una sola vez al importar el módulo en
+# una PlantillaReporte con los ParagraphStyle y TableStyle ya construidos. Dibujar
+# un reporte solo crea las filas y los flowables con los datos de la petición.
+import io
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Table, TableStyle, Paragraph
+from reportlab.lib.units import inch
+
+FILAS_POR_LOTE = 500
+ALTO_CABECERA_TABLA = 24
+ALTO_FILA = 14
+ALTO_LINEA_LISTA = 15
+MARGEN = 1 * inch
+
+
+def generar_reporte(tipo, usuario, destino):
+    """Punto de entrada del proceso hijo: consulta los datos y escribe el PDF en `destino`.
+
+    usuario es un dict {id, nombre, rol}; no hay request ni current_user en el hijo.
+    """
+    cargar, plantilla = REPORTES[tipo]
+    plantilla.dibujar(destino, usuario, cargar(usuario))
+    return destino
+
+
+# --- Especificación ---
+
+@dataclass(frozen=True)
+class Columna:
+    """Columna de un reporte: título, ancho en puntos y valor a partir del registro"""
+    titulo: str
+    ancho: int
+    valor: Callable
+
+
+@dataclass(frozen=True)
+class EspecReporte:
+    """Definición declarativa de un reporte.
+
+    info(usuario, datos) devuelve las líneas (etiqueta, valor) de la cabecera y
+    `filas` es la clave de `datos` con los registros (lista o iterador).
+    disposicion 'tabla' dibuja una tabla con cabecera repetida en cada página;
+    'lista' dibuja cada registro como viñeta y el resto de columnas debajo.
+    """
+    titulo: str
+    columnas: tuple
+    info: Callable
+    filas: str
+    vacio: str
+    subtitulo: str = None
+    tamano_cabecera: int = 10
+    tamano_cuerpo: int = 8
+    disposicion: str = 'tabla'
+
+
+# --- Plantilla compilada ---
+
+_ESTILOS = getSampleStyleSheet()
+_ESTILO_TITULO = ParagraphStyle(
+    'CustomTitle',
+    parent=_ESTILOS['Heading1'],
+    fontSize=16,
+    spaceAfter=30,
+    textColor=colors.HexColor('#7c3aed')
+)
+_ESTILO_SUBTITULO = ParagraphStyle(
+    'Subtitulo',
+    parent=_ESTILOS['Heading3'],
+    fontName='Helvetica-Bold',
+    fontSize=12,
+    spaceBefore=0,
+    spaceAfter=12
+)
+
+
+def _estilo_tabla(tamano_cabecera, tamano_cuerpo):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), tamano_cabecera),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), tamano_cuerpo),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+class PlantillaReporte:
+    """EspecReporte compilada: estilos, cabecera y extractores de columna ya resueltos"""
+
+    def __init__(self, espec, estilo_titulo=None, estilo_subtitulo=None, estilo_texto=None):
+        self.espec = espec
+        self.estilo_titulo = estilo_titulo or _ESTILO_TITULO
+        self.estilo_subtitulo = estilo_subtitulo or _ESTILO_SUBTITULO
+        self.estilo_texto = estilo_texto or _ESTILOS['Normal']
+        self.estilo_tabla = _estilo_tabla(espec.tamano_cabecera, espec.tamano_cuerpo)
+        self.cabecera = [columna.titulo for columna in espec.columnas]
+        self.anchos = [columna.ancho for columna in espec.columnas]
+        self._valores = tuple(columna.valor for columna in espec.columnas)
+
+    def fila(self, registro):
+        return [valor(registro) for valor in self._valores]
+
+    def dibujar(self, destino, usuario, datos):
+        """Escribe el PDF en `destino` (ruta o archivo binario)"""
+        c = canvas.Canvas(destino, pagesize=A4)
+        y = self._encabezado(c, usuario, datos)
+        filas = (self.fila(registro) for registro in datos[self.espec.filas])
+        if self.espec.disposicion == 'lista':
+            dibujadas = dibujar_lista_paginada(c, filas, self.cabecera, y)
+        else:
+            dibujadas = dibujar_tabla_paginada(c, filas, self.cabecera, self.anchos, self.estilo_tabla, y)
+        if not dibujadas:
+            self._bloque(c, Paragraph(self.espec.vacio, self.estilo_texto), y)
+        c.save()
+
+    def _encabezado(self, c, usuario, datos):
+        """Título, líneas de información y subtítulo; devuelve la y donde siguen las filas"""
+        lineas = ''.join(f"<b>{etiqueta}:</b> {valor}<br/>"
+                         for etiqueta, valor in self.espec.info(usuario, datos))
+        y = A4[1] - MARGEN
+        y = self._bloque(c, Paragraph(self.espec.titulo, self.estilo_titulo), y)
+        y = self._bloque(c, Paragraph(lineas, self.estilo_texto), y) - 20
+        if self.espec.subtitulo:
+            y = self._bloque(c, Paragraph(self.espec.subtitulo, self.estilo_subtitulo), y)
+        return y
+
+    @staticmethod
+    def _bloque(c, flowable, y):
+        _, alto = flowable.wrapOn(c, A4[0] - 2 * MARGEN, y - MARGEN)
+        flowable.drawOn(c, MARGEN, y - alto)
+        return y - alto - flowable.getSpaceAfter()
+
+
+def compilar(espec):
+    """Compila una especificación en su plantilla (estilos construidos una sola vez)"""
+    return PlantillaReporte(espec)
+
+
+def dibujar_tabla_paginada(c, filas, cabecera, anchos, estilo, tope, alto_pagina=A4[1]):
+    """Dibuja `filas` (iterable) en tablas de una página, repitiendo la cabecera.
+
+    Solo hay en memoria las filas de la página actual. `tope` es la coordenada y
+    donde empieza la tabla en la primera página. Devuelve el número de filas dibujadas.
+    """
+    total = 0
+    pagina = []
+
+    def cabe(tope_actual):
+        return int((tope_actual - MARGEN - ALTO_CABECERA_TABLA) // ALTO_FILA)
+
+    def volcar(tope_actual):
+        tabla = Table([cabecera] + pagina, colWidths=anchos,
+                      rowHeights=[ALTO_CABECERA_TABLA] + [ALTO_FILA] * len(pagina))
+        tabla.setStyle(estilo)
+        _, alto = tabla.wrapOn(c, sum(anchos), tope_actual - MARGEN)
+        tabla.drawOn(c, MARGEN, tope_actual - alto)
+
+    capacidad = cabe(tope)
+    for fila in filas:
+        pagina.append(fila)
+        total += 1
+        if len(pagina) == capacidad:
+            volcar(tope)
+            c.showPage()
+            pagina = []
+            tope = alto_pagina - MARGEN
+            capacidad = cabe(tope)
+    if pagina:
+        volcar(tope)
+    return total
+
+
+def dibujar_lista_paginada(c, filas, etiquetas, tope, alto_pagina=A4[1]):
+    """Dibuja cada fila como '• primera columna' y debajo 'Etiqueta: valor' del resto"""
+    total = 0
+    alto_item = ALTO_LINEA_LISTA * len(etiquetas) + 10
+    y = tope
+    for fila in filas:
+        if y - alto_item < MARGEN:
+            c.showPage()
+            y = alto_pagina - MARGEN
+        c.setFont('Helvetica', 10)
+        linea = y - 10
+        c.drawString(MARGEN + 20, linea, f"• {fila[0]}")
+        for etiqueta, valor in zip(etiquetas[1:], fila[1:]):
+            linea -= ALTO_LINEA_LISTA
+            c.drawString(MARGEN + 40, linea, f"{etiqueta}: {valor}")
+        y -= alto_item
+        total += 1
+    return total
+
+
+# --- Formato de valores ---
+
+def _texto(campo, largo=None, defecto='N/A'):
+    def valor(registro):
+        texto = registro.get(campo) or defecto
+        return texto[:largo] if largo else texto
+    return valor
+
+
+def _fecha(campo, defecto='N/A'):
+    return lambda registro: registro[campo].strftime('%d/%m/%Y') if registro[campo] else defecto
+
+
+def _resumen(campo, largo):
+    def valor(registro):
+        texto = registro[campo] or ''
+        return texto[:largo] + '...' if len(texto) > largo else texto
+    return valor
+
+
+def _ahora():
+    return datetime.now().strftime('%d/%m/%Y %H:%M')
+
+
+# --- Carga de datos ---
+
+def cargar_proyectos(usuario):
+    from app.models.proyecto_model import ProyectoModel
+    return {'proyectos': ProyectoModel().obtener_todos()}
+
+
+def cargar_tareas(usuario):
+    from app.models.tarea_model import TareaModel
+    from app.services.stats_service import StatsService
+    filtros = {'id_asignado': usuario['id']} if usuario['rol'] == 'Colaborador' else {}
+    return {
+        # Páginas keyset: el PDF se dibuja sin cargar todas las tareas
+        'tareas': TareaModel().iterar(tamano_pagina=FILAS_POR_LOTE, **filtros),
+        'stats': StatsService().obtener_dashboard()
+    }
+
+
+def cargar_equipo(usuario):
+    from app.models.tarea_model import TareaModel
+    return {'usuarios': TareaModel().obtener_productividad_usuarios()}
+
+
+# --- Especificaciones ---
+
+ESPEC_PROYECTOS = EspecReporte(
+    titulo="REPORTE DE PROYECTOS - STARTASK",
+    columnas=(
+        Columna('Nombre', 120, lambda p: p['nombre']),
+        Columna('Líder', 80, _texto('lider_nombre')),
+        Columna('Descripción', 180, _resumen('descripcion', 40)),
+        Columna('Fecha Creación', 80, _fecha('fecha_creacion'))
+    ),
+    info=lambda usuario, datos: [
+        ('Generado por', usuario['nombre']),
+        ('Fecha', _ahora()),
+        ('Total de proyectos', len(datos['proyectos']))
+    ],
+    filas='proyectos',
+    vacio="No hay proyectos activos"
+)
+
+ESPEC_TAREAS = EspecReporte(
+    titulo="REPORTE DE TAREAS - STARTASK",
+    columnas=(
+        Columna('Título', 100, lambda t: t['titulo'][:30]),
+        Columna('Proyecto', 80, _texto('proyecto_nombre', 20)),
+        Columna('Asignado', 80, _texto('asignado_nombre', 20)),
+        Columna('Estado', 60, lambda t: t['estado'].replace('_', ' ').title()),
+        Columna('Prioridad', 50, lambda t: t['prioridad'].title()),
+        Columna('Vencimiento', 70, _fecha('fecha_vencimiento', 'No definida'))
+    ),
+    info=lambda usuario, datos: [
+        ('Generado por', usuario['nombre']),
+        ('Fecha', _ahora()),
+        ('Total de tareas', datos['stats'].total_tareas),
+        ('Tareas completadas', datos['stats'].tareas_completadas),
+        ('Tasa de finalización', f"{datos['stats'].porcentaje(datos['stats'].tareas_completadas):.1f}%")
+    ],
+    filas='tareas',
+    vacio="No hay tareas para mostrar",
+    tamano_cabecera=8,
+    tamano_cuerpo=7
+)
+
+ESPEC_EQUIPO = EspecReporte(
+    titulo="REPORTE DE EQUIPO - STARTASK",
+    columnas=(
+        Columna('Nombre', 100, lambda m: m['nombre']),
+        Columna('Email', 120, lambda m: m['email']),
+        Columna('Rol', 80, lambda m: m['rol']),
+        Columna('Tareas Asignadas', 60, lambda m: str(m['tareas_asignadas'])),
+        Columna('Tareas Completadas', 60, lambda m: str(m['tareas_completadas']))
+    ),
+    info=lambda usuario, datos: [
+        ('Generado por', usuario['nombre']),
+        ('Fecha', _ahora()),
+        ('Total de miembros', len(datos['usuarios']))
+    ],
+    filas='usuarios',
+    vacio="No hay miembros en el equipo",
+    tamano_cabecera=9
+)
+
+# Listado simple de /reporte/proyectos
+ESPEC_RESUMEN_PROYECTOS = EspecReporte(
+    titulo="Reporte de Proyectos - StarTask",
+    columnas=(
+        Columna('Nombre', 0, lambda p: p['nombre']),
+        Columna('Líder', 0, _texto('lider_nombre'))
+    ),
+    info=lambda usuario, datos: [
+        ('Generado por', usuario['nombre']),
+        ('Fecha', _ahora())
+    ],
+    filas='proyectos',
+    vacio="No hay proyectos activos",
+    subtitulo="Proyectos Activos:",
+    disposicion='lista'
+)
+
+ESPECIFICACIONES = {
+    'proyectos': (cargar_proyectos, ESPEC_PROYECTOS),
+    'tareas': (cargar_tareas, ESPEC_TAREAS),
+    'equipo': (cargar_equipo, ESPEC_EQUIPO),
+    'resumen_proyectos': (cargar_proyectos, ESPEC_RESUMEN_PROYECTOS)
+}
+
+# tipo -> (carga de datos, plantilla compilada); se compila al importar el módulo,
+# una vez por proceso del pool
+REPORTES = {tipo: (cargar, compilar(espec)) for tipo, (cargar, espec) in ESPECIFICACIONES.items()}
+
+
+# --- Micro-benchmark ---
+
+def _datos_de_prueba(tipo, filas):
+    """Registros sintéticos con todos los campos que usan las columnas de los reportes"""
+    from app.services.stats_service import EstadisticasDashboard
+    hoy = datetime.now()
+    registros = [{
+        'nombre': f'Registro {i}', 'descripcion': 'Descripción de prueba ' * 8,
+        'fecha_creacion': hoy, 'lider_nombre': 'Líder', 'titulo': f'Tarea {i}',
+        'proyecto_nombre': 'Proyecto', 'asignado_nombre': 'Usuario', 'estado': 'en_progreso',
+        'prioridad': 'media', 'fecha_vencimiento': hoy + timedelta(days=i % 30),
+        'email': f'usuario{i}@startask.local', 'rol': 'Colaborador',
+        'tareas_asignadas': i % 40, 'tareas_completadas': i % 20
+    } for i in range(filas)]
+    return {ESPECIFICACIONES[tipo][1].filas: registros,
+            'stats': EstadisticasDashboard(total_tareas=filas, tareas_completadas=filas // 2)}
+
+
+def medir(tipo, filas=50, repeticiones=20):
+    """Tiempo medio de dibujo (ms) con la plantilla compilada al arrancar frente a
+    construir estilos y plantilla en cada petición, como se hacía antes.
+
+    Dibuja en memoria con datos sintéticos, sin base de datos.
+    """
+    espec = ESPECIFICACIONES[tipo][1]
+    plantilla = REPORTES[tipo][1]
+    usuario = {'id': 0, 'nombre': 'Benchmark', 'rol': 'Administrador'}
+    datos = _datos_de_prueba(tipo, filas)
+
+    def por_peticion():
+        # Equivalente al código anterior: hoja de estilos y estilos nuevos en cada llamada
+        estilos = getSampleStyleSheet()
+        PlantillaReporte(
+            espec,
+            estilo_titulo=ParagraphStyle('CustomTitle', parent=estilos['Heading1'], fontSize=16,
+                                         spaceAfter=30, textColor=colors.HexColor('#7c3aed')),
+            estilo_subtitulo=ParagraphStyle('Subtitulo', parent=estilos['Heading3'], fontName='Helvetica-Bold',
+                                            fontSize=12, spaceBefore=0, spaceAfter=12),
+            estilo_texto=estilos['Normal']
+        ).dibujar(io.BytesIO(), usuario, datos)
+
+    def compilada():
+        plantilla.dibujar(io.BytesIO(), usuario, datos)
+
+    resultado = {'tipo': tipo, 'filas': filas, 'repeticiones': repeticiones}
+    for nombre, funcion in (('por_peticion_ms', por_peticion), ('compilada_ms', compilada)):
+        funcion()  # calentamiento (fuentes e imports de reportlab)
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        resultado[nombre] = round((time.perf_counter() - inicio) * 1000 / repeticiones, 2)
+    return resultado
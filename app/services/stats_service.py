@@ -0,0 +1,101 @@
+# [file name]: stats_service.py
+# Contadores de los dashboards (tabla materializada o una sola consulta agrupada)
+from dataclasses import dataclass
+from mysql.connector import Error
+from app.utils.database import Database
+from app.models.contadores_model import METRICA_RECALCULADO
+
+
+@dataclass(frozen=True)
+class EstadisticasDashboard:
+    """Contadores globales que muestran /tablero y /reportes"""
+    total_proyectos: int = 0
+    proyectos_esta_semana: int = 0
+    total_tareas: int = 0
+    tareas_pendientes: int = 0
+    tareas_en_progreso: int = 0
+    tareas_completadas: int = 0
+    tareas_vencidas: int = 0
+    total_usuarios: int = 0
+
+    def porcentaje(self, cantidad):
+        """Porcentaje de `cantidad` sobre el total de tareas"""
+        return (cantidad / self.total_tareas * 100) if self.total_tareas > 0 else 0
+
+
+class StatsService:
+    def __init__(self):
+        self.db = Database()
+
+    def obtener_dashboard(self):
+        """Contadores del dashboard: tabla materializada o, si no existe aún, consulta agrupada"""
+        stats = self._desde_contadores()
+        if stats is None:
+            stats = self._desde_tareas()
+        return stats
+
+    def _desde_contadores(self):
+        """Lee los contadores materializados (O(1)) más los que dependen de la fecha actual"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    SELECT metrica, valor FROM estadisticas_contadores
+                    WHERE ambito = 'global' AND id_ambito = 0
+                    UNION ALL
+                    SELECT 'proyectos_esta_semana', COUNT(*) FROM proyectos
+                    WHERE estado = 'activo' AND fecha_creacion >= DATE_SUB(NOW(), INTERVAL 1 WEEK)
+                    UNION ALL
+                    SELECT 'tareas_vencidas', COUNT(*) FROM tareas
+                    WHERE estado_registro = 'activo' AND estado <> 'completada' AND fecha_vencimiento < CURDATE()
+                    UNION ALL
+                    SELECT 'total_usuarios', COUNT(*) FROM usuarios WHERE estado = 'activo'
+                """)
+                valores = {metrica: int(valor or 0) for metrica, valor in cursor.fetchall()}
+            except Error as e:
+                # Tabla aún no creada en bases antiguas
+                print(f"⚠️  Contadores materializados no disponibles: {e}")
+                return None
+            finally:
+                cursor.close()
+                conn.close()
+            if not valores.get(METRICA_RECALCULADO):
+                return None
+            return EstadisticasDashboard(
+                total_proyectos=valores.get('proyectos_activos', 0),
+                proyectos_esta_semana=valores.get('proyectos_esta_semana', 0),
+                total_tareas=valores.get('tareas_total', 0),
+                tareas_pendientes=valores.get('tareas_pendiente', 0),
+                tareas_en_progreso=valores.get('tareas_en_progreso', 0),
+                tareas_completadas=valores.get('tareas_completada', 0),
+                tareas_vencidas=valores.get('tareas_vencidas', 0),
+                total_usuarios=valores.get('total_usuarios', 0)
+            )
+        return None
+
+    def _desde_tareas(self):
+        """Calcula todos los contadores del dashboard en un solo viaje a la base de datos"""
+        conn = self.db.conectar()
+        if conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT
+                    COUNT(*) AS total_tareas,
+                    COALESCE(SUM(t.estado = 'pendiente'), 0) AS tareas_pendientes,
+                    COALESCE(SUM(t.estado = 'en_progreso'), 0) AS tareas_en_progreso,
+                    COALESCE(SUM(t.estado = 'completada'), 0) AS tareas_completadas,
+                    COALESCE(SUM(t.estado <> 'completada' AND t.fecha_vencimiento < CURDATE()), 0) AS tareas_vencidas,
+                    (SELECT COUNT(*) FROM proyectos WHERE estado = 'activo') AS total_proyectos,
+                    (SELECT COUNT(*) FROM proyectos
+                     WHERE estado = 'activo' AND fecha_creacion >= DATE_SUB(NOW(), INTERVAL 1 WEEK)) AS proyectos_esta_semana,
+                    (SELECT COUNT(*) FROM usuarios WHERE estado = 'activo') AS total_usuarios
+                FROM tareas t
+                WHERE t.estado_registro = 'activo'
+            """)
+            fila = cursor.fetchone()
+            cursor.close()
+            conn.close()
+            if fila:
+                return EstadisticasDashboard(**{campo: int(valor or 0) for campo, valor in fila.items()})
+        return EstadisticasDashboard()
@@ -0,0 +1,132 @@
+# [file name]: trabajos.py
+# Trabajos periódicos registrados en el planificador
+import os
+from app.models.historial_model import HistorialModel
+from app.models.notification_model import NotificationModel
+from app.models.productividad_model import ProductividadModel
+from app.services.planificador import planificador
+from app.utils.database import Database
+from app.utils import eventos
+
+VENCIMIENTOS_INTERVALO = int(os.environ.get('VENCIMIENTOS_INTERVALO', '3600'))
+# Días de antelación con los que se empieza a avisar
+VENCIMIENTOS_DIAS = 7
+# Días que se conservan las notificaciones ya leídas
+NOTIFICACIONES_RETENCION_DIAS = int(os.environ.get('NOTIFICACIONES_RETENCION_DIAS', '30'))
+# Cada ejecución reescribe el snapshot de hoy; la primera tras la medianoche cierra el
+# día anterior, así que el intervalo acota lo que se atribuye al día equivocado
+PRODUCTIVIDAD_INTERVALO = int(os.environ.get('PRODUCTIVIDAD_INTERVALO', '900'))
+# Archivar borra particiones de MySQL tras escribirlas en HISTORIAL_ARCHIVO_DIR: solo
+# se activa donde ese directorio es persistente (en Railway el disco no lo es)
+HISTORIAL_ARCHIVAR_AUTOMATICO = os.environ.get('HISTORIAL_ARCHIVAR_AUTOMATICO', '0') == '1'
+
+# Un aviso por proyecto, fecha de vencimiento y tramo (7, 3, 1 y 0 días): la clave
+# de deduplicación hace que repetir el escaneo no cree notificaciones nuevas.
+SQL_AVISOS_VENCIMIENTO = """
+    INSERT INTO notificaciones (id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad, clave_dedup)
+    SELECT d.id_usuario, 'fecha_limite',
+           CASE WHEN d.dias = 0 THEN '¡Fecha límite hoy!'
+                WHEN d.dias = 1 THEN 'Fecha límite próxima'
+                WHEN d.dias <= 3 THEN 'Fecha límite cercana'
+                ELSE 'Recordatorio de proyecto' END,
+           CASE WHEN d.dias = 0 THEN CONCAT('El proyecto "', d.nombre, '" vence hoy')
+                WHEN d.dias = 1 THEN CONCAT('El proyecto "', d.nombre, '" vence mañana')
+                ELSE CONCAT('El proyecto "', d.nombre, '" vence en ', d.dias, ' días') END,
+           '/proyectos', d.fecha_vencimiento,
+           CASE WHEN d.dias <= 1 THEN 'alta' WHEN d.dias <= 3 THEN 'media' ELSE 'baja' END,
+           CONCAT('vence:', d.id, ':', d.fecha_vencimiento, ':',
+                  CASE WHEN d.dias = 0 THEN 0 WHEN d.dias = 1 THEN 1 WHEN d.dias <= 3 THEN 3 ELSE 7 END)
+    FROM (
+        SELECT p.id, p.nombre, p.fecha_vencimiento,
+               DATEDIFF(p.fecha_vencimiento, CURDATE()) AS dias, m.id_usuario
+        FROM proyectos p
+        JOIN proyecto_miembros m ON m.id_proyecto = p.id
+        WHERE p.estado = 'activo'
+          AND p.fecha_vencimiento BETWEEN CURDATE() AND CURDATE() + INTERVAL %s DAY
+    ) d
+    JOIN usuarios u ON u.id = d.id_usuario AND u.estado = 'activo'
+    ON DUPLICATE KEY UPDATE id = id
+"""
+
+
+@planificador.registrar('vencimientos', intervalo=VENCIMIENTOS_INTERVALO)
+def escanear_vencimientos():
+    """Avisa a los miembros (líder y asignados) de los proyectos que vencen pronto"""
+    notification_model = NotificationModel()
+    conn = Database().conectar()
+    if not conn:
+        raise RuntimeError('sin conexión a la base de datos')
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS ultimo FROM notificaciones")
+        ultimo = cursor.fetchone()['ultimo']
+        cursor.execute(SQL_AVISOS_VENCIMIENTO, (VENCIMIENTOS_DIAS,))
+        # Solo este trabajo escribe claves 'vence:' y corre con un único líder
+        cursor.execute("""
+            SELECT id, id_usuario, tipo, titulo, mensaje, enlace, fecha_limite, prioridad, fecha_creacion
+            FROM notificaciones
+            WHERE id > %s AND clave_dedup LIKE 'vence:%%'
+        """, (ultimo,))
+        creadas = cursor.fetchall()
+        deltas = {}
+        for fila in creadas:
+            deltas[fila['id_usuario']] = deltas.get(fila['id_usuario'], 0) + 1
+        notification_model.aplicar_deltas_no_leidas(cursor, deltas)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    no_leidas = notification_model.contar_no_leidas_usuarios(deltas)
+    for fila in creadas:
+        id_usuario = fila.pop('id_usuario')
+        fila['leida'] = False
+        eventos.publicar(eventos.canal_usuario(id_usuario), 'notificacion',
+                         {'notificacion': fila, 'no_leidas': no_leidas[id_usuario]})
+    return {'notificaciones': len(creadas)}
+
+
+@planificador.registrar('purga_notificaciones', intervalo=24 * 3600)
+def purgar_notificaciones():
+    """Borra las notificaciones leídas más antiguas que la retención"""
+    eliminadas = NotificationModel().purgar_leidas(NOTIFICACIONES_RETENCION_DIAS)
+    if eliminadas is None:
+        raise RuntimeError('sin conexión a la base de datos')
+    return {'eliminadas': eliminadas, 'dias': NOTIFICACIONES_RETENCION_DIAS}
+
+
+@planificador.registrar('purga_reportes', intervalo=24 * 3600)
+def purgar_reportes():
+    """Borra los PDF en caché y los estados de trabajo sin usar"""
+    from app.services.reportes import cola_reportes, REPORTES_CACHE_DIAS
+    return {'eliminados': cola_reportes.purgar(REPORTES_CACHE_DIAS)}
+
+
+@planificador.registrar('particiones_historial', intervalo=24 * 3600)
+def mantener_historial():
+    """Particiones de los próximos meses (nada cae en pfuturo) y, si está activado, archivo"""
+    historial_model = HistorialModel()
+    nuevas = historial_model.asegurar_particiones()
+    if nuevas is None:
+        raise RuntimeError('sin conexión o historial_actividades sin particionar')
+    resultado = {'particiones_nuevas': nuevas}
+    if HISTORIAL_ARCHIVAR_AUTOMATICO:
+        archivadas = historial_model.archivar()
+        if archivadas is None:
+            raise RuntimeError('sin conexión a la base de datos')
+        resultado['archivadas'] = len(archivadas)
+        resultado['filas_archivadas'] = sum(a['filas'] for a in archivadas)
+    return resultado
+
+
+@planificador.registrar('productividad', intervalo=PRODUCTIVIDAD_INTERVALO)
+def snapshot_productividad():
+    """Acumulado diario de tareas por usuario y proyecto para /reportes/productividad"""
+    resultado = ProductividadModel().tomar_snapshot(margen_cierre=2 * PRODUCTIVIDAD_INTERVALO)
+    if resultado is None:
+        raise RuntimeError('sin conexión a la base de datos')
+    return resultado
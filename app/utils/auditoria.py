@@ -0,0 +1,230 @@
+# [file name]: auditoria.py
+# Escritor en segundo plano del historial de actividades (inserciones por lotes)
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from app.utils.metricas import registrar_metricas
+
+AUDIT_MAX_COLA = int(os.environ.get('AUDIT_MAX_COLA', '10000'))
+AUDIT_LOTE = int(os.environ.get('AUDIT_LOTE', '200'))
+AUDIT_INTERVALO = float(os.environ.get('AUDIT_INTERVALO_MS', '500')) / 1000
+# Con la cola llena: 'descartar' (no frena el request) o 'bloquear' (espera hasta AUDIT_BLOQUEO_TIMEOUT)
+AUDIT_POLITICA = os.environ.get('AUDIT_POLITICA', 'descartar')
+AUDIT_BLOQUEO_TIMEOUT = float(os.environ.get('AUDIT_BLOQUEO_TIMEOUT', '0.5'))
+# Archivo local opcional donde se anota cada registro hasta que llega a MySQL
+AUDIT_SPOOL = os.environ.get('AUDIT_SPOOL', '')
+
+INSERT_ACTIVIDAD = """
+    INSERT INTO historial_actividades (id_usuario, accion, tabla_afectada, id_registro_afectado, fecha)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+class EscritorAuditoria:
+    """Cola acotada + hilo que vuelca el historial con INSERT de varias filas"""
+
+    def __init__(self, max_cola=AUDIT_MAX_COLA, lote=AUDIT_LOTE, intervalo=AUDIT_INTERVALO,
+                 politica=AUDIT_POLITICA, bloqueo_timeout=AUDIT_BLOQUEO_TIMEOUT, spool=AUDIT_SPOOL):
+        self.lote = lote
+        self.intervalo = intervalo
+        self.politica = politica
+        self.bloqueo_timeout = bloqueo_timeout
+        self.spool = spool
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._detenido = threading.Event()
+        self._stats = {'encoladas': 0, 'escritas': 0, 'descartadas': 0,
+                       'lotes': 0, 'errores': 0, 'recuperadas_spool': 0}
+
+    # --- Lado del request ---
+
+    def registrar(self, id_usuario, accion, tabla_afectada=None, id_registro_afectado=None):
+        """Encola una fila; devuelve False si se descartó por la política de la cola"""
+        self._asegurar_hilo()
+        fila = (id_usuario, accion, tabla_afectada, id_registro_afectado, datetime.now())
+        limite = time.monotonic() + (self.bloqueo_timeout if self.politica == 'bloquear' else 0)
+        while True:
+            with self._lock:
+                try:
+                    self._cola.put_nowait(fila)
+                    self._anotar_spool(fila)
+                    self._stats['encoladas'] += 1
+                    return True
+                except queue.Full:
+                    pass
+            if time.monotonic() >= limite:
+                with self._lock:
+                    self._stats['descartadas'] += 1
+                return False
+            time.sleep(0.005)
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._stats)
+        datos['pendientes'] = self._cola.qsize()
+        datos['politica'] = self.politica
+        return datos
+
+    def detener(self, timeout=5):
+        """Vacía la cola antes de salir (registrado con atexit)"""
+        self._detenido.set()
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            self._hilo.join(timeout)
+
+    # --- Hilo escritor ---
+
+    def _asegurar_hilo(self):
+        # Tras un fork (workers de gunicorn) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._pid == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._detenido.clear()
+                self._hilo = threading.Thread(target=self._ejecutar, name='auditoria', daemon=True)
+                self._hilo.start()
+
+    def _ejecutar(self):
+        recuperado = False
+        pendientes = []
+        espera = self.intervalo
+        while True:
+            if not recuperado:
+                recuperado = self._recuperar_spool()
+            fin = time.monotonic() + self.intervalo
+            while len(pendientes) < self.lote:
+                restante = fin - time.monotonic()
+                if restante <= 0 or (self._detenido.is_set() and self._cola.empty()):
+                    break
+                try:
+                    pendientes.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            if pendientes:
+                if self._escribir(pendientes):
+                    pendientes = []
+                    espera = self.intervalo
+                    self._limpiar_spool()
+                elif self._detenido.is_set():
+                    # Al apagar no se reintenta: el spool (si existe) conserva las filas
+                    return
+                else:
+                    # MySQL caído: se reintenta con espera creciente; la cola aplica la política
+                    time.sleep(espera)
+                    espera = min(espera * 2, 30)
+            elif self._detenido.is_set():
+                return
+
+    def _escribir(self, filas):
+        from app.utils.database import Database
+        conn = Database().conectar()
+        if not conn:
+            with self._lock:
+                self._stats['errores'] += 1
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(INSERT_ACTIVIDAD, filas)
+            conn.commit()
+            with self._lock:
+                self._stats['escritas'] += len(filas)
+                self._stats['lotes'] += 1
+            return True
+        except Exception as e:
+            print(f"⚠️  Error escribiendo {len(filas)} actividades: {e}")
+            with self._lock:
+                self._stats['errores'] += 1
+            return False
+        finally:
+            cursor.close()
+            conn.close()
+
+    # --- Spool local ---
+    # Cada proceso anota en <AUDIT_SPOOL>.<pid>; al arrancar, un proceso reclama
+    # los archivos de procesos muertos y reinserta sus filas (al menos una vez).
+
+    def _ruta_spool(self):
+        return f"{self.spool}.{self._pid}"
+
+    def _anotar_spool(self, fila):
+        if not self.spool:
+            return
+        try:
+            with open(self._ruta_spool(), 'a', encoding='utf-8') as archivo:
+                archivo.write(json.dumps(fila, default=str) + '\n')
+        except OSError as e:
+            print(f"⚠️  No se pudo escribir el spool de auditoría: {e}")
+
+    def _limpiar_spool(self):
+        """Todo lo anotado ya llegó a MySQL: se vacía el archivo"""
+        if not self.spool:
+            return
+        with self._lock:
+            if self._cola.empty():
+                try:
+                    open(self._ruta_spool(), 'w').close()
+                except OSError:
+                    pass
+
+    def _reclamar_huerfanos(self):
+        """Renombra los spools de procesos que ya no existen para reinsertarlos"""
+        # Recuperaciones que quedaron a medias en este mismo pid
+        reclamados = glob.glob(f"{glob.escape(self.spool)}.*.recuperando.{self._pid}")
+        for ruta in glob.glob(f"{glob.escape(self.spool)}.*"):
+            sufijo = ruta[len(self.spool) + 1:]
+            if not sufijo.isdigit() or int(sufijo) == self._pid or _proceso_vivo(int(sufijo)):
+                continue
+            destino = f"{ruta}.recuperando.{self._pid}"
+            try:
+                os.rename(ruta, destino)
+                reclamados.append(destino)
+            except OSError:
+                pass  # Otro worker lo reclamó primero
+        return reclamados
+
+    def _recuperar_spool(self):
+        """Reinserta las filas que quedaron en spools de procesos caídos; False si hay que reintentar"""
+        if not self.spool:
+            return True
+        for ruta in self._reclamar_huerfanos():
+            try:
+                with open(ruta, encoding='utf-8') as archivo:
+                    filas = [tuple(json.loads(linea)) for linea in archivo if linea.strip()]
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Spool de auditoría ilegible ({ruta}): {e}")
+                continue
+            for inicio in range(0, len(filas), self.lote):
+                if not self._escribir(filas[inicio:inicio + self.lote]):
+                    return False
+            os.remove(ruta)
+            with self._lock:
+                self._stats['recuperadas_spool'] += len(filas)
+            if filas:
+                print(f"✅ {len(filas)} actividades recuperadas del spool")
+        return True
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_escritor = EscritorAuditoria()
+registrar_metricas('auditoria', _escritor.metricas)
+atexit.register(_escritor.detener)
+
+
+def obtener_escritor():
+    return _escritor
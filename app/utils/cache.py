@@ -0,0 +1,212 @@
+# [file name]: cache.py
+# Caché en proceso (TTL + LRU) con invalidación compartida entre workers
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from app.utils.metricas import registrar_metricas
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+CACHE_SQLITE_PATH = os.environ.get(
+    'CACHE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'startask_cache.db')
+)
+CACHE_SYNC_INTERVAL = float(os.environ.get('CACHE_SYNC_INTERVAL', '1'))
+
+_TODAS = '*'
+
+
+class BusMemoria:
+    """Bus de invalidación local: solo sirve dentro del mismo proceso"""
+
+    def publicar(self, espacio, clave):
+        pass
+
+    def ultimo_id(self):
+        return 0
+
+    def pendientes(self, espacio, desde_id):
+        return []
+
+
+class BusSQLite:
+    """Bus de invalidación sobre un archivo SQLite compartido por los workers"""
+
+    RETENCION = 3600
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS invalidaciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                espacio TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                fecha REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_invalidaciones_espacio ON invalidaciones (espacio, id)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def publicar(self, espacio, clave):
+        ahora = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO invalidaciones (espacio, clave, fecha) VALUES (?, ?, ?)",
+            (espacio, str(clave), ahora)
+        )
+        conn.execute("DELETE FROM invalidaciones WHERE fecha < ?", (ahora - self.RETENCION,))
+
+    def ultimo_id(self):
+        fila = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM invalidaciones").fetchone()
+        return fila[0]
+
+    def pendientes(self, espacio, desde_id):
+        return self._conn().execute(
+            "SELECT id, clave FROM invalidaciones WHERE espacio = ? AND id > ? ORDER BY id",
+            (espacio, desde_id)
+        ).fetchall()
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def obtener_bus():
+    """Bus de invalidación configurado con CACHE_BACKEND (memoria | sqlite)"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            if CACHE_BACKEND == 'sqlite':
+                try:
+                    _bus = BusSQLite(CACHE_SQLITE_PATH)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Bus de caché SQLite no disponible ({e}), usando memoria")
+                    _bus = BusMemoria()
+            else:
+                _bus = BusMemoria()
+        return _bus
+
+
+class TTLCache:
+    """Caché LRU con expiración por TTL, contadores y sincronización vía bus"""
+
+    def __init__(self, nombre, max_items=1024, ttl=60, bus=None):
+        self.nombre = nombre
+        self.max_items = max_items
+        self.ttl = ttl
+        self.bus = bus if bus is not None else obtener_bus()
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._ultimo_id = self._leer_ultimo_id()
+        self._ultima_sync = time.monotonic()
+        self._stats = {'hits': 0, 'misses': 0, 'expiradas': 0, 'desalojadas': 0, 'invalidaciones': 0}
+        registrar_metricas(f'cache_{nombre}', self.metricas)
+
+    def obtener(self, clave, default=None):
+        """Devuelve el valor en caché o `default` si no está o expiró"""
+        self._sincronizar()
+        clave = str(clave)
+        ahora = time.monotonic()
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                self._stats['misses'] += 1
+                return default
+            valor, expira = item
+            if expira < ahora:
+                del self._datos[clave]
+                self._stats['expiradas'] += 1
+                self._stats['misses'] += 1
+                return default
+            self._datos.move_to_end(clave)
+            self._stats['hits'] += 1
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        clave = str(clave)
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+                self._stats['desalojadas'] += 1
+
+    def obtener_o_cargar(self, clave, cargar, ttl=None):
+        """Lee de la caché; si falta, ejecuta `cargar()` y guarda el resultado si no es None"""
+        faltante = object()
+        valor = self.obtener(clave, faltante)
+        if valor is not faltante:
+            return valor
+        valor = cargar()
+        if valor is not None:
+            self.guardar(clave, valor, ttl)
+        return valor
+
+    def invalidar(self, clave):
+        """Elimina la clave aquí y la anuncia al resto de workers"""
+        self._eliminar_local(str(clave))
+        self._publicar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._stats['invalidaciones'] += 1
+        self._publicar(_TODAS)
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['items'] = len(self._datos)
+        consultas = datos['hits'] + datos['misses']
+        datos['hit_ratio'] = datos['hits'] / consultas if consultas else 0.0
+        return datos
+
+    def _eliminar_local(self, clave):
+        with self._lock:
+            if clave == _TODAS:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+            self._stats['invalidaciones'] += 1
+
+    def _publicar(self, clave):
+        try:
+            self.bus.publicar(self.nombre, clave)
+        except Exception as e:
+            print(f"⚠️  Error publicando invalidación de caché '{self.nombre}': {e}")
+
+    def _leer_ultimo_id(self):
+        try:
+            return self.bus.ultimo_id()
+        except Exception:
+            return 0
+
+    def _sincronizar(self):
+        """Aplica las invalidaciones publicadas por otros workers (como mucho cada CACHE_SYNC_INTERVAL)"""
+        ahora = time.monotonic()
+        if ahora - self._ultima_sync < CACHE_SYNC_INTERVAL:
+            return
+        self._ultima_sync = ahora
+        try:
+            pendientes = self.bus.pendientes(self.nombre, self._ultimo_id)
+        except Exception as e:
+            print(f"⚠️  Error sincronizando caché '{self.nombre}': {e}")
+            return
+        for id_evento, clave in pendientes:
+            self._ultimo_id = max(self._ultimo_id, id_evento)
+            with self._lock:
+                if clave == _TODAS:
+                    self._datos.clear()
+                else:
+                    self._datos.pop(clave, None)
@@ -0,0 +1,183 @@
+# [file name]: contrasenas.py
+# Hash de contraseñas con scrypt en un pool de procesos acotado
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import string
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from app.utils.metricas import registrar_metricas
+
+# scrypt:N:r:p (N potencia de 2). Cada hash usa 128 * N * r bytes de memoria
+PASSWORD_HASH_METODO = os.environ.get('PASSWORD_HASH_METODO', 'scrypt:32768:8:1')
+# 0 = calcular en hilos del propio worker (entornos sin multiprocessing)
+PASSWORD_HASH_PROCESOS = int(os.environ.get('PASSWORD_HASH_PROCESOS', '2'))
+# Hashes en espera además de los que se están calculando; por encima se rechaza
+PASSWORD_HASH_COLA = int(os.environ.get('PASSWORD_HASH_COLA', '8'))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+
+_CARACTERES_SAL = string.ascii_letters + string.digits
+
+
+class HashSaturadoError(Exception):
+    """El pool de hash tiene la cola llena o no respondió a tiempo"""
+
+
+# --- Funciones puras (se ejecutan en los procesos del pool) ---
+
+def parametros(metodo):
+    """(N, r, p) de un método 'scrypt:N:r:p'"""
+    nombre, n, r, p = metodo.split(':')
+    if nombre != 'scrypt':
+        raise ValueError(f'Método de hash no soportado: {nombre}')
+    return int(n), int(r), int(p)
+
+
+def _scrypt(password, sal, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=sal.encode('utf-8'),
+                          n=n, r=r, p=p, maxmem=132 * n * r * p, dklen=64).hex()
+
+
+def calcular_hash(password, metodo=PASSWORD_HASH_METODO):
+    """Hash 'scrypt:N:r:p$sal$hex' (mismo formato que werkzeug.security)"""
+    n, r, p = parametros(metodo)
+    sal = ''.join(secrets.choice(_CARACTERES_SAL) for _ in range(16))
+    return f"{metodo}${sal}${_scrypt(password, sal, n, r, p)}"
+
+
+def es_hash(guardado):
+    return guardado.startswith('scrypt:') and guardado.count('$') == 2
+
+
+def comprobar_hash(guardado, password):
+    """Compara en tiempo constante; acepta también filas antiguas en texto plano"""
+    if not es_hash(guardado):
+        return hmac.compare_digest(guardado.encode('utf-8'), password.encode('utf-8'))
+    metodo, sal, esperado = guardado.split('$')
+    try:
+        n, r, p = parametros(metodo)
+    except ValueError:
+        return False
+    return hmac.compare_digest(_scrypt(password, sal, n, r, p), esperado)
+
+
+def necesita_rehash(guardado, metodo=PASSWORD_HASH_METODO):
+    """True para texto plano o hashes con otros parámetros de coste"""
+    return not es_hash(guardado) or guardado.split('$', 1)[0] != metodo
+
+
+# --- Pool ---
+
+class PoolHash:
+    """Calcula los hashes fuera del worker web, con cupo fijo de trabajos pendientes.
+
+    Una ráfaga de logins ocupa como mucho `procesos` núcleos; lo que no cabe en
+    la cola se rechaza con HashSaturadoError en vez de acumular peticiones.
+    """
+
+    def __init__(self, procesos=PASSWORD_HASH_PROCESOS, cola=PASSWORD_HASH_COLA,
+                 metodo=PASSWORD_HASH_METODO, timeout=PASSWORD_HASH_TIMEOUT):
+        parametros(metodo)  # Falla al arrancar si la configuración no es válida
+        self.procesos = procesos
+        self.metodo = metodo
+        self.timeout = timeout
+        self._cupos = threading.BoundedSemaphore(max(procesos, 1) + cola)
+        self._pool = None
+        self._pid = None
+        self._ficticio = None
+        self._lock = threading.Lock()
+        self._stats = {'hashes': 0, 'verificaciones': 0, 'ficticias': 0, 'rechazados': 0,
+                       'ultimo_ms': None, 'max_ms': 0.0}
+
+    def hashear(self, password):
+        """Hash con el método configurado"""
+        return self._ejecutar('hashes', calcular_hash, password, self.metodo)
+
+    def verificar(self, guardado, password):
+        """Comprueba una contraseña; el texto plano antiguo no pasa por el pool"""
+        if not guardado:
+            return False
+        if not es_hash(guardado):
+            return comprobar_hash(guardado, password)
+        return self._ejecutar('verificaciones', comprobar_hash, guardado, password)
+
+    def verificar_ficticio(self, password):
+        """Verificación con el mismo coste para un email sin cuenta; siempre False.
+
+        Así el tiempo de respuesta no revela qué emails están registrados.
+        """
+        if self._ficticio is None:
+            self._ficticio = self.hashear(secrets.token_hex(16))
+        self._ejecutar('ficticias', comprobar_hash, self._ficticio, password)
+        return False
+
+    def necesita_rehash(self, guardado):
+        return necesita_rehash(guardado, self.metodo)
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._stats)
+        datos.update(procesos=self.procesos, metodo=self.metodo)
+        return datos
+
+    def _ejecutar(self, contador, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            with self._lock:
+                self._stats['rechazados'] += 1
+            raise HashSaturadoError('demasiadas contraseñas pendientes de verificar')
+        inicio = time.perf_counter()
+        try:
+            resultado = self._obtener_pool().submit(funcion, *args).result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self._stats['rechazados'] += 1
+            raise HashSaturadoError('el cálculo del hash no terminó a tiempo')
+        finally:
+            self._cupos.release()
+        duracion = round((time.perf_counter() - inicio) * 1000, 1)
+        with self._lock:
+            self._stats[contador] += 1
+            self._stats['ultimo_ms'] = duracion
+            self._stats['max_ms'] = max(self._stats['max_ms'], duracion)
+        return resultado
+
+    def _obtener_pool(self):
+        # Un pool por proceso: tras el fork de gunicorn el del padre no sirve
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                if self.procesos > 0:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.procesos, mp_context=multiprocessing.get_context('spawn')
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hash')
+            return self._pool
+
+
+def medir(metodos, segundos=1.0):
+    """Logins por segundo y núcleo para cada método (verificaciones seguidas en este proceso)"""
+    resultados = []
+    for metodo in metodos:
+        n, r, p = parametros(metodo)
+        guardado = calcular_hash('contraseña de prueba', metodo)
+        verificaciones = 0
+        inicio = time.perf_counter()
+        while time.perf_counter() - inicio < segundos:
+            comprobar_hash(guardado, 'contraseña de prueba')
+            verificaciones += 1
+        transcurrido = time.perf_counter() - inicio
+        resultados.append({
+            'metodo': metodo,
+            'memoria_mib': 128 * n * r / 2 ** 20,
+            'ms_por_login': round(transcurrido * 1000 / verificaciones, 1),
+            'logins_por_segundo': round(verificaciones / transcurrido, 1)
+        })
+    return resultados
+
+
+pool_hash = PoolHash()
+registrar_metricas('contrasenas', pool_hash.metricas)
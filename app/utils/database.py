@@ -2,8 +2,24 @@
 # [CORRECCIÓN PARA RAILWAY]
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context
+from app.utils.pool import obtener_pool, metricas_pools, ConexionPooled, PoolAgotadoError
+from app.utils.metricas import registrar_metricas
+from app.utils.migraciones import aplicar_migraciones
 import os
 
+# ⚙️ Parámetros del pool (dimensionar junto con los workers de gunicorn)
+POOL_CONFIG = {
+    'size': int(os.environ.get('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', '10')),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+    'recycle': float(os.environ.get('DB_POOL_RECYCLE', '1800')),
+    'idle_timeout': float(os.environ.get('DB_POOL_IDLE_TIMEOUT', '300')),
+    'ping_interval': float(os.environ.get('DB_POOL_PING_INTERVAL', '10'))
+}
+
+registrar_metricas('pool_mysql', metricas_pools)
+
 class Database:
     def __init__(self):
         # ⚠️ CORRECCIÓN: Usar variables de entorno específicas de Railway
@@ -18,23 +34,35 @@ class Database:
             'connect_timeout': 30,
             'autocommit': True
         }
-        print(f"🔧 Configuración DB: host={self.config['host']}, db={self.config['database']}")
+        self.pool = obtener_pool(self.config, **POOL_CONFIG)
     
     def conectar(self):
-        """Establece conexión con la base de datos MySQL"""
+        """Entrega una conexión del pool; dentro de un request siempre la misma"""
         try:
-            connection = mysql.connector.connect(**self.config)
-            if connection.is_connected():
-                print(f"✅ Conectado a MySQL en {self.config['host']}")
+            if has_app_context():
+                connection = g.get('_db_conexion')
+                if connection is None:
+                    connection = ConexionPooled(self.pool, self.pool.obtener(), persistente=True)
+                    g._db_conexion = connection
                 return connection
-        except Error as e:
+            return ConexionPooled(self.pool, self.pool.obtener())
+        except (Error, PoolAgotadoError) as e:
             print(f"❌ Error conectando a MySQL: {e}")
             print(f"🔧 Config usada: {self.config['host']}:{self.config['port']}, user: {self.config['user']}, db: {self.config['database']}")
             return None
 
-    # ... resto del código se mantiene igual ...
-    
-    # ... (el resto del código se mantiene igual)
+    @staticmethod
+    def liberar_conexion_request(exception=None):
+        """Teardown de Flask: devuelve al pool la conexión usada en el request"""
+        connection = g.pop('_db_conexion', None)
+        if connection is None:
+            return
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error as e:
+            print(f"⚠️  Error limpiando conexión del request: {e}")
+        connection.liberar()
     
     def crear_base_datos(self):
         """Crea la base de datos si no existe"""
@@ -62,160 +90,19 @@ class Database:
             print(f"❌ Error creando base de datos: {e}")
     
     def crear_tablas_completas(self, conn=None):
-        """Crea todas las tablas necesarias para StarTask"""
+        """Crea/actualiza las tablas de StarTask aplicando las migraciones pendientes"""
         try:
-            if conn is None:
+            propia = conn is None
+            if propia:
                 conn = self.conectar()
             if not conn:
                 return False
-                
-            cursor = conn.cursor()
-            
-            # Tabla de usuarios
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nombre VARCHAR(100) NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    rol ENUM('Administrador', 'Líder de Proyecto', 'Colaborador') NOT NULL,
-                    estado ENUM('activo', 'inactivo') DEFAULT 'activo',
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de proyectos
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS proyectos (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nombre VARCHAR(200) NOT NULL,
-                    descripcion TEXT,
-                    fecha_inicio DATE,
-                    fecha_fin DATE,
-                    estado ENUM('activo', 'inactivo', 'completado') DEFAULT 'activo',
-                    id_lider INT,
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (id_lider) REFERENCES usuarios(id) ON DELETE SET NULL
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de tareas
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS tareas (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    titulo VARCHAR(200) NOT NULL,
-                    descripcion TEXT,
-                    id_proyecto INT,
-                    id_asignado INT,
-                    estado ENUM('pendiente', 'en_progreso', 'completada') DEFAULT 'pendiente',
-                    prioridad ENUM('baja', 'media', 'alta') DEFAULT 'media',
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    fecha_vencimiento DATE,
-                    estado_registro ENUM('activo', 'inactivo') DEFAULT 'activo',
-                    FOREIGN KEY (id_proyecto) REFERENCES proyectos(id) ON DELETE CASCADE,
-                    FOREIGN KEY (id_asignado) REFERENCES usuarios(id) ON DELETE SET NULL
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
             
-            # Tabla de mensajes de chat
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS mensajes_chat (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    id_usuario INT,
-                    mensaje TEXT NOT NULL,
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    estado ENUM('activo', 'eliminado') DEFAULT 'activo',
-                    FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
+            version = aplicar_migraciones(conn)
+            if propia:
+                conn.close()
             
-            # Tabla de configuración de usuario
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS config_usuario (
-                    id_usuario INT PRIMARY KEY,
-                    tema VARCHAR(20) DEFAULT 'light',
-                    notificaciones_email BOOLEAN DEFAULT TRUE,
-                    notificaciones_tareas BOOLEAN DEFAULT TRUE,
-                    FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de configuración del sistema
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS config_sistema (
-                    id INT PRIMARY KEY DEFAULT 1,
-                    nombre VARCHAR(100) DEFAULT 'StarTask',
-                    logo_url VARCHAR(255),
-                    version VARCHAR(20) DEFAULT '1.0.0'
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de notificaciones
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS notificaciones (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    id_usuario INT NOT NULL,
-                    tipo ENUM('proyecto_asignado', 'fecha_limite', 'nuevo_mensaje', 'tarea_urgente') NOT NULL,
-                    titulo VARCHAR(255) NOT NULL,
-                    mensaje TEXT NOT NULL,
-                    enlace VARCHAR(500),
-                    leida TINYINT(1) DEFAULT 0,
-                    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    fecha_limite DATE,
-                    prioridad ENUM('baja', 'media', 'alta') DEFAULT 'media',
-                    FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE,
-                    INDEX idx_notificaciones_usuario (id_usuario, leida, fecha_creacion)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de historial de actividades
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS historial_actividades (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    id_usuario INT,
-                    accion VARCHAR(200) NOT NULL,
-                    tabla_afectada VARCHAR(50),
-                    id_registro_afectado INT,
-                    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de comentarios de tareas
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS comentarios_tareas (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    id_tarea INT,
-                    id_usuario INT,
-                    comentario TEXT NOT NULL,
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    estado ENUM('activo', 'inactivo') DEFAULT 'activo',
-                    FOREIGN KEY (id_tarea) REFERENCES tareas(id) ON DELETE CASCADE,
-                    FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            # Tabla de miembros de proyecto
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS proyecto_miembros (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    id_proyecto INT,
-                    id_usuario INT,
-                    rol ENUM('Líder', 'Miembro') DEFAULT 'Miembro',
-                    fecha_union TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE KEY unique_proyecto_usuario (id_proyecto, id_usuario),
-                    FOREIGN KEY (id_proyecto) REFERENCES proyectos(id) ON DELETE CASCADE,
-                    FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """)
-            
-            if conn:
-                conn.commit()
-                cursor.close()
-                if not conn.in_transaction:
-                    conn.close()
-            
-            print("✅ Todas las tablas creadas/verificadas correctamente")
+            print(f"✅ Todas las tablas creadas/verificadas correctamente (esquema v{version})")
             return True
             
         except Error as e:
@@ -313,6 +200,12 @@ class Database:
             if not self.verificar_usuarios_existen():
                 self.insertar_datos_iniciales()
                 print("✅ Datos iniciales insertados")
+                
+                # Los datos iniciales se insertan sin pasar por los modelos
+                from app.models.contadores_model import ContadoresModel
+                from app.models.miembros_model import MiembrosModel
+                ContadoresModel().recomputar()
+                MiembrosModel().reconstruir()
             else:
                 print("ℹ️  La base de datos ya contiene datos")
                 
@@ -0,0 +1,237 @@
+# [file name]: eventos.py
+# Pub/sub en proceso para empujar eventos a los navegadores (SSE), con reparto entre workers
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from app.utils.metricas import registrar_metricas
+
+EVENTOS_BACKEND = os.environ.get('EVENTOS_BACKEND', 'memoria')
+EVENTOS_SQLITE_PATH = os.environ.get(
+    'EVENTOS_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'startask_eventos.db')
+)
+EVENTOS_POLL_INTERVAL = float(os.environ.get('EVENTOS_POLL_INTERVAL', '0.5'))
+
+# Eventos recientes que se guardan por canal para reanudar con Last-Event-ID
+HISTORIAL_POR_CANAL = 50
+# Eventos sin consumir tolerados por suscriptor antes de darlo por desbordado
+MAX_PENDIENTES = 100
+
+
+class Suscripcion:
+    """Cola de eventos de un canal para un único cliente conectado"""
+
+    def __init__(self, canal):
+        self.canal = canal
+        self.desbordada = False
+        self._cola = queue.Queue(maxsize=MAX_PENDIENTES)
+
+    def entregar(self, evento):
+        try:
+            self._cola.put_nowait(evento)
+        except queue.Full:
+            # Cliente demasiado lento: se le pedirá que se resincronice
+            self.desbordada = True
+
+    def siguiente(self, timeout):
+        """Devuelve el próximo evento (id, tipo, datos) o None si no llegó ninguno"""
+        try:
+            return self._cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class CentroEventos:
+    """Reparte los eventos a los suscriptores locales y conserva un historial corto"""
+
+    def __init__(self, primer_id=0):
+        self._lock = threading.Lock()
+        self._suscriptores = {}
+        self._historial = {}
+        self._descartado = {}
+        # Eventos anteriores a este id no pasaron por este proceso
+        self._primer_id = primer_id
+        self._ultimo_id = primer_id
+        self._stats = {'publicados': 0, 'entregados': 0, 'desbordados': 0}
+
+    def entregar(self, id_evento, canal, tipo, datos):
+        evento = (id_evento, tipo, datos)
+        with self._lock:
+            self._ultimo_id = max(self._ultimo_id, id_evento)
+            historial = self._historial.setdefault(canal, deque(maxlen=HISTORIAL_POR_CANAL))
+            if len(historial) == historial.maxlen:
+                self._descartado[canal] = historial[0][0]
+            historial.append(evento)
+            suscriptores = list(self._suscriptores.get(canal, ()))
+            self._stats['publicados'] += 1
+        entregados = 0
+        for suscripcion in suscriptores:
+            suscripcion.entregar(evento)
+            entregados += not suscripcion.desbordada
+        with self._lock:
+            self._stats['entregados'] += entregados
+            self._stats['desbordados'] += len(suscriptores) - entregados
+
+    def suscribir(self, canal, ultimo_id=None):
+        """Registra un suscriptor; devuelve (suscripcion, eventos_a_reenviar).
+
+        eventos_a_reenviar es None cuando ultimo_id no se puede reanudar desde el
+        historial (el cliente debe pedir el estado completo).
+        """
+        suscripcion = Suscripcion(canal)
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(suscripcion)
+            if ultimo_id is None:
+                return suscripcion, []
+            minimo = max(self._primer_id, self._descartado.get(canal, 0))
+            if ultimo_id < minimo or ultimo_id > self._ultimo_id:
+                return suscripcion, None
+            pendientes = [e for e in self._historial.get(canal, ()) if e[0] > ultimo_id]
+        return suscripcion, pendientes
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            suscriptores = self._suscriptores.get(suscripcion.canal)
+            if suscriptores is not None:
+                suscriptores.discard(suscripcion)
+                if not suscriptores:
+                    del self._suscriptores[suscripcion.canal]
+
+    def metricas(self):
+        with self._lock:
+            datos = dict(self._stats)
+            datos['canales'] = len(self._suscriptores)
+            datos['conexiones'] = sum(len(s) for s in self._suscriptores.values())
+            datos['ultimo_id'] = self._ultimo_id
+        return datos
+
+
+class BackendLocal:
+    """Reparto solo dentro del proceso (un único worker)"""
+
+    def __init__(self):
+        # Ids crecientes entre reinicios para que un Last-Event-ID viejo no se confunda
+        self._siguiente = int(time.time() * 1000)
+        self._lock = threading.Lock()
+        self.centro = CentroEventos(self._siguiente)
+
+    def publicar(self, canal, tipo, datos):
+        with self._lock:
+            self._siguiente += 1
+            id_evento = self._siguiente
+        self.centro.entregar(id_evento, canal, tipo, datos)
+        return id_evento
+
+
+class BackendSQLite:
+    """Reparto entre workers: los eventos se escriben en SQLite y cada proceso los sondea"""
+
+    RETENCION = 600
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS eventos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                canal TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                datos TEXT NOT NULL,
+                fecha REAL NOT NULL
+            )
+        """)
+        ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM eventos").fetchone()[0]
+        self.centro = CentroEventos(ultimo)
+        self._leido = ultimo
+        self._hilo = None
+        self._hilo_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def publicar(self, canal, tipo, datos):
+        ahora = time.time()
+        conn = self._conn()
+        cursor = conn.execute(
+            "INSERT INTO eventos (canal, tipo, datos, fecha) VALUES (?, ?, ?, ?)",
+            (canal, tipo, json.dumps(datos, default=str), ahora)
+        )
+        conn.execute("DELETE FROM eventos WHERE fecha < ?", (ahora - self.RETENCION,))
+        self.iniciar()
+        return cursor.lastrowid
+
+    def iniciar(self):
+        """Arranca (una vez por proceso) el hilo que lee los eventos nuevos"""
+        with self._hilo_lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._sondear, name='eventos-sqlite', daemon=True)
+                self._hilo.start()
+
+    def _sondear(self):
+        while True:
+            try:
+                filas = self._conn().execute(
+                    "SELECT id, canal, tipo, datos FROM eventos WHERE id > ? ORDER BY id",
+                    (self._leido,)
+                ).fetchall()
+                for id_evento, canal, tipo, datos in filas:
+                    self._leido = id_evento
+                    self.centro.entregar(id_evento, canal, tipo, json.loads(datos))
+            except sqlite3.Error as e:
+                print(f"⚠️  Error leyendo eventos compartidos: {e}")
+            time.sleep(EVENTOS_POLL_INTERVAL)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def obtener_backend():
+    """Backend de reparto configurado con EVENTOS_BACKEND (memoria | sqlite)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if EVENTOS_BACKEND == 'sqlite':
+                try:
+                    _backend = BackendSQLite(EVENTOS_SQLITE_PATH)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Bus de eventos SQLite no disponible ({e}), usando memoria")
+                    _backend = BackendLocal()
+            else:
+                _backend = BackendLocal()
+            registrar_metricas('eventos', _backend.centro.metricas)
+        return _backend
+
+
+def publicar(canal, tipo, datos):
+    """Publica un evento; nunca interrumpe la escritura que lo origina"""
+    try:
+        return obtener_backend().publicar(canal, tipo, datos)
+    except Exception as e:
+        print(f"⚠️  Error publicando evento '{tipo}' en {canal}: {e}")
+        return None
+
+
+def suscribir(canal, ultimo_id=None):
+    backend = obtener_backend()
+    if hasattr(backend, 'iniciar'):
+        backend.iniciar()
+    return backend.centro.suscribir(canal, ultimo_id)
+
+
+def cancelar(suscripcion):
+    obtener_backend().centro.cancelar(suscripcion)
+
+
+def canal_usuario(id_usuario):
+    return f'usuario:{id_usuario}'
@@ -1,6 +1,8 @@
 from functools import wraps
 from flask import redirect, url_for, flash, render_template
 from flask_login import current_user
+import base64
+import json
 
 def roles_required(*roles):
     def decorator(f):
@@ -18,20 +20,22 @@ def roles_required(*roles):
     return decorator
 
 def registrar_actividad(id_usuario, accion, tabla_afectada=None, id_registro_afectado=None):
-    """Registra actividad en el historial"""
-    from app.utils.database import Database
-    db = Database()
-    conn = db.conectar()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "INSERT INTO historial_actividades (id_usuario, accion, tabla_afectada, id_registro_afectado) VALUES (%s, %s, %s, %s)",
-                (id_usuario, accion, tabla_afectada, id_registro_afectado)
-            )
-            conn.commit()
-        except Exception as e:
-            print(f"Error registrando actividad: {e}")
-        finally:
-            cursor.close()
-            conn.close()
\ No newline at end of file
+    """Registra actividad en el historial (encolada; la escribe el hilo de auditoría por lotes)"""
+    from app.utils.auditoria import obtener_escritor
+    obtener_escritor().registrar(id_usuario, accion, tabla_afectada, id_registro_afectado)
+
+def codificar_cursor(valores):
+    """Convierte la clave de la última fila de una página en un cursor opaco para la URL"""
+    texto = json.dumps(valores, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Inverso de codificar_cursor; lanza ValueError si el cursor no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode('utf-8'))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not isinstance(valores, list):
+        raise ValueError('Cursor inválido')
+    return valores
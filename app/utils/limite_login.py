@@ -0,0 +1,166 @@
+# [file name]: limite_login.py
+# Límite de intentos de login por IP y por email con ventana deslizante (memoria | sqlite)
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from app.utils.cache import CACHE_BACKEND, CACHE_SQLITE_PATH
+from app.utils.metricas import registrar_metricas
+
+
+def _limite(variable, defecto):
+    """'intentos/segundos' de una variable de entorno"""
+    intentos, segundos = os.environ.get(variable, defecto).split('/')
+    return int(intentos), float(segundos)
+
+
+# Todos los intentos de una IP y los fallidos de un email (un login correcto reinicia el email)
+LOGIN_LIMITE_IP = _limite('LOGIN_LIMITE_IP', '20/60')
+LOGIN_LIMITE_EMAIL = _limite('LOGIN_LIMITE_EMAIL', '5/900')
+# memoria: por worker | sqlite: compartido por los workers de la máquina
+LOGIN_LIMITE_BACKEND = os.environ.get('LOGIN_LIMITE_BACKEND', CACHE_BACKEND)
+LOGIN_LIMITE_MAX_CLAVES = int(os.environ.get('LOGIN_LIMITE_MAX_CLAVES', '100000'))
+
+
+class VentanaMemoria:
+    """Marcas de tiempo por clave en este proceso (LRU acotado a max_claves)"""
+
+    def __init__(self, max_claves=LOGIN_LIMITE_MAX_CLAVES):
+        self.max_claves = max_claves
+        self._eventos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consultar(self, clave, desde):
+        """(intentos desde `desde`, marca más antigua de esos intentos)"""
+        with self._lock:
+            eventos = self._eventos.get(clave)
+            if not eventos:
+                return 0, None
+            while eventos and eventos[0] < desde:
+                eventos.popleft()
+            if not eventos:
+                del self._eventos[clave]
+                return 0, None
+            return len(eventos), eventos[0]
+
+    def registrar(self, clave, ahora, ventana):
+        with self._lock:
+            eventos = self._eventos.get(clave)
+            if eventos is None:
+                eventos = self._eventos[clave] = deque()
+            eventos.append(ahora)
+            while eventos[0] < ahora - ventana:
+                eventos.popleft()
+            self._eventos.move_to_end(clave)
+            while len(self._eventos) > self.max_claves:
+                self._eventos.popitem(last=False)
+
+    def limpiar(self, clave):
+        with self._lock:
+            self._eventos.pop(clave, None)
+
+
+class VentanaSQLite:
+    """Intentos en un archivo SQLite compartido por los workers (mismo archivo que el bus de caché)"""
+
+    def __init__(self, ruta, retencion):
+        self.ruta = ruta
+        self.retencion = retencion
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS intentos_login (
+                clave TEXT NOT NULL,
+                fecha REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_intentos_login_clave ON intentos_login (clave, fecha)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_intentos_login_fecha ON intentos_login (fecha)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def consultar(self, clave, desde):
+        return tuple(self._conn().execute(
+            "SELECT COUNT(*), MIN(fecha) FROM intentos_login WHERE clave = ? AND fecha >= ?",
+            (clave, desde)
+        ).fetchone())
+
+    def registrar(self, clave, ahora, ventana):
+        conn = self._conn()
+        conn.execute("INSERT INTO intentos_login (clave, fecha) VALUES (?, ?)", (clave, ahora))
+        conn.execute("DELETE FROM intentos_login WHERE fecha < ?", (ahora - self.retencion,))
+
+    def limpiar(self, clave):
+        self._conn().execute("DELETE FROM intentos_login WHERE clave = ?", (clave,))
+
+
+class LimitadorLogin:
+    """Decide antes de tocar MySQL si un intento de login se atiende.
+
+    comprobar() devuelve los segundos que faltan para poder reintentar (0 = permitido);
+    registrar() anota el resultado cuando el intento sí se procesó.
+    """
+
+    def __init__(self, backend, por_ip=LOGIN_LIMITE_IP, por_email=LOGIN_LIMITE_EMAIL):
+        self.backend = backend
+        self.por_ip = por_ip
+        self.por_email = por_email
+        self._lock = threading.Lock()
+        self._stats = {'permitidos': 0, 'bloqueados_ip': 0, 'bloqueados_email': 0, 'errores': 0}
+
+    def comprobar(self, ip, email):
+        ahora = time.time()
+        for tipo, clave, (limite, ventana) in (('ip', f'ip:{ip}', self.por_ip),
+                                               ('email', f'email:{email}', self.por_email)):
+            try:
+                intentos, primero = self.backend.consultar(clave, ahora - ventana)
+            except Exception as e:
+                # Sin backend no se bloquea a nadie: el login sigue funcionando
+                print(f"⚠️  Límite de login no disponible: {e}")
+                self._contar('errores')
+                return 0
+            if intentos >= limite:
+                self._contar(f'bloqueados_{tipo}')
+                return max(1, int(primero + ventana - ahora) + 1)
+        self._contar('permitidos')
+        return 0
+
+    def registrar(self, ip, email, exito):
+        ahora = time.time()
+        try:
+            self.backend.registrar(f'ip:{ip}', ahora, self.por_ip[1])
+            if exito:
+                self.backend.limpiar(f'email:{email}')
+            else:
+                self.backend.registrar(f'email:{email}', ahora, self.por_email[1])
+        except Exception as e:
+            print(f"⚠️  Error registrando intento de login: {e}")
+            self._contar('errores')
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _contar(self, contador):
+        with self._lock:
+            self._stats[contador] += 1
+
+
+def _crear_backend():
+    if LOGIN_LIMITE_BACKEND == 'sqlite':
+        try:
+            return VentanaSQLite(CACHE_SQLITE_PATH, max(LOGIN_LIMITE_IP[1], LOGIN_LIMITE_EMAIL[1]))
+        except sqlite3.Error as e:
+            print(f"⚠️  Límite de login SQLite no disponible ({e}), usando memoria")
+    return VentanaMemoria()
+
+
+limitador_login = LimitadorLogin(_crear_backend())
+registrar_metricas('limite_login', limitador_login.metricas)
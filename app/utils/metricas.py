@@ -0,0 +1,25 @@
+# [file name]: metricas.py
+# Registro de métricas internas del proceso (pool, cachés, colas...)
+import threading
+
+_proveedores = {}
+_lock = threading.Lock()
+
+
+def registrar_metricas(nombre, proveedor):
+    """Registra una función sin argumentos que devuelve un dict de métricas"""
+    with _lock:
+        _proveedores[nombre] = proveedor
+
+
+def obtener_metricas():
+    """Recolecta las métricas de todos los componentes registrados"""
+    with _lock:
+        proveedores = dict(_proveedores)
+    resultado = {}
+    for nombre, proveedor in proveedores.items():
+        try:
+            resultado[nombre] = proveedor()
+        except Exception as e:
+            resultado[nombre] = {'error': str(e)}
+    return resultado
@@ -0,0 +1,491 @@
+# [file name]: migraciones.py
+# Migraciones versionadas del esquema (tabla schema_version) y verificación de planes
+from datetime import date
+from mysql.connector import Error
+from app.utils.particiones import definiciones_mensuales, particiones_existentes, sumar_meses
+
+BLOQUEO_MIGRACIONES = 'startask_migraciones'
+
+OPCIONES_TABLA = "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci"
+
+
+def indice(tabla, nombre, columnas, unico=False):
+    """Paso de migración que crea un índice solo si aún no existe"""
+    def crear(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (tabla, nombre))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"CREATE {'UNIQUE ' if unico else ''}INDEX {nombre} ON {tabla} ({columnas})")
+    crear.descripcion = f"índice {tabla}.{nombre}"
+    return crear
+
+
+def sin_indice(tabla, nombre):
+    """Paso de migración que elimina un índice si todavía existe"""
+    def eliminar(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (tabla, nombre))
+        if cursor.fetchone()[0]:
+            cursor.execute(f"DROP INDEX {nombre} ON {tabla}")
+    eliminar.descripcion = f"sin índice {tabla}.{nombre}"
+    return eliminar
+
+
+def columna(tabla, nombre, definicion):
+    """Paso de migración que agrega una columna solo si aún no existe"""
+    def agregar(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (tabla, nombre))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {definicion}")
+    agregar.descripcion = f"columna {tabla}.{nombre}"
+    return agregar
+
+
+def particionar_historial(cursor):
+    """Convierte historial_actividades en una tabla particionada por mes.
+
+    MySQL no admite claves foráneas en tablas particionadas y exige que la
+    columna de partición forme parte de la clave primaria.
+    """
+    if particiones_existentes(cursor, 'historial_actividades'):
+        return
+    cursor.execute("""
+        SELECT constraint_name FROM information_schema.referential_constraints
+        WHERE constraint_schema = DATABASE() AND table_name = 'historial_actividades'
+    """)
+    for (restriccion,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE historial_actividades DROP FOREIGN KEY {restriccion}")
+    cursor.execute("UPDATE historial_actividades SET fecha = CURRENT_TIMESTAMP WHERE fecha IS NULL")
+    cursor.execute("""
+        ALTER TABLE historial_actividades
+            MODIFY fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (id, fecha)
+    """)
+    cursor.execute("SELECT MIN(fecha) FROM historial_actividades")
+    primera = cursor.fetchone()[0]
+    hoy = date.today()
+    desde = primera.date() if primera else hoy
+    particiones = definiciones_mensuales(desde, sumar_meses(hoy, 2))
+    cursor.execute(f"""
+        ALTER TABLE historial_actividades
+        PARTITION BY RANGE (UNIX_TIMESTAMP(fecha)) ({', '.join(particiones)})
+    """)
+
+
+particionar_historial.descripcion = "particiones mensuales de historial_actividades"
+
+
+def reconstruir_miembros(cursor):
+    """Recalcula proyecto_miembros desde tareas y proyectos.
+
+    Miembro = usuario con tareas activas asignadas en el proyecto; el líder
+    se conserva aunque no tenga tareas. Las filas que siguen siendo válidas
+    mantienen su fecha_union.
+    """
+    cursor.execute("UPDATE proyecto_miembros SET tareas = 0, rol = 'Miembro'")
+    cursor.execute("""
+        INSERT INTO proyecto_miembros (id_proyecto, id_usuario, rol, tareas)
+        SELECT id_proyecto, id_asignado, 'Miembro', COUNT(*)
+        FROM tareas
+        WHERE estado_registro = 'activo' AND id_proyecto IS NOT NULL AND id_asignado IS NOT NULL
+        GROUP BY id_proyecto, id_asignado
+        ON DUPLICATE KEY UPDATE tareas = VALUES(tareas)
+    """)
+    cursor.execute("""
+        INSERT INTO proyecto_miembros (id_proyecto, id_usuario, rol)
+        SELECT id, id_lider, 'Líder' FROM proyectos WHERE id_lider IS NOT NULL
+        ON DUPLICATE KEY UPDATE rol = 'Líder'
+    """)
+    cursor.execute("DELETE FROM proyecto_miembros WHERE tareas = 0 AND rol = 'Miembro'")
+
+
+reconstruir_miembros.descripcion = "índice de miembros desde tareas y líderes"
+
+
+def recalcular_contadores(cursor):
+    """Rellena estadisticas_contadores (y su marca de recálculo) desde tareas y proyectos"""
+    # Import diferido: los modelos importan Database, que importa este módulo
+    from app.models.contadores_model import ContadoresModel
+    ContadoresModel.escribir_recalculo(cursor)
+
+
+recalcular_contadores.descripcion = "recálculo de estadisticas_contadores"
+
+
+# (versión, descripción, pasos). Los pasos son SQL o funciones(cursor) idempotentes:
+# el DDL de MySQL no es transaccional y una migración a medias debe poder repetirse.
+MIGRACIONES = [
+    (1, 'Esquema inicial', [
+        f"""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            rol ENUM('Administrador', 'Líder de Proyecto', 'Colaborador') NOT NULL,
+            estado ENUM('activo', 'inactivo') DEFAULT 'activo',
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS proyectos (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nombre VARCHAR(200) NOT NULL,
+            descripcion TEXT,
+            fecha_inicio DATE,
+            fecha_fin DATE,
+            estado ENUM('activo', 'inactivo', 'completado') DEFAULT 'activo',
+            id_lider INT,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (id_lider) REFERENCES usuarios(id) ON DELETE SET NULL
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS tareas (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            titulo VARCHAR(200) NOT NULL,
+            descripcion TEXT,
+            id_proyecto INT,
+            id_asignado INT,
+            estado ENUM('pendiente', 'en_progreso', 'completada') DEFAULT 'pendiente',
+            prioridad ENUM('baja', 'media', 'alta') DEFAULT 'media',
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fecha_vencimiento DATE,
+            estado_registro ENUM('activo', 'inactivo') DEFAULT 'activo',
+            FOREIGN KEY (id_proyecto) REFERENCES proyectos(id) ON DELETE CASCADE,
+            FOREIGN KEY (id_asignado) REFERENCES usuarios(id) ON DELETE SET NULL
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS mensajes_chat (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_usuario INT,
+            mensaje TEXT NOT NULL,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            estado ENUM('activo', 'eliminado') DEFAULT 'activo',
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS config_usuario (
+            id_usuario INT PRIMARY KEY,
+            tema VARCHAR(20) DEFAULT 'light',
+            notificaciones_email BOOLEAN DEFAULT TRUE,
+            notificaciones_tareas BOOLEAN DEFAULT TRUE,
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS config_sistema (
+            id INT PRIMARY KEY DEFAULT 1,
+            nombre VARCHAR(100) DEFAULT 'StarTask',
+            logo_url VARCHAR(255),
+            version VARCHAR(20) DEFAULT '1.0.0'
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS notificaciones (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_usuario INT NOT NULL,
+            tipo ENUM('proyecto_asignado', 'fecha_limite', 'nuevo_mensaje', 'tarea_urgente') NOT NULL,
+            titulo VARCHAR(255) NOT NULL,
+            mensaje TEXT NOT NULL,
+            enlace VARCHAR(500),
+            leida TINYINT(1) DEFAULT 0,
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_limite DATE,
+            prioridad ENUM('baja', 'media', 'alta') DEFAULT 'media',
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE,
+            INDEX idx_notificaciones_usuario (id_usuario, leida, fecha_creacion)
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS historial_actividades (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_usuario INT,
+            accion VARCHAR(200) NOT NULL,
+            tabla_afectada VARCHAR(50),
+            id_registro_afectado INT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS comentarios_tareas (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_tarea INT,
+            id_usuario INT,
+            comentario TEXT NOT NULL,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            estado ENUM('activo', 'inactivo') DEFAULT 'activo',
+            FOREIGN KEY (id_tarea) REFERENCES tareas(id) ON DELETE CASCADE,
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS proyecto_miembros (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_proyecto INT,
+            id_usuario INT,
+            rol ENUM('Líder', 'Miembro') DEFAULT 'Miembro',
+            fecha_union TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_proyecto_usuario (id_proyecto, id_usuario),
+            FOREIGN KEY (id_proyecto) REFERENCES proyectos(id) ON DELETE CASCADE,
+            FOREIGN KEY (id_usuario) REFERENCES usuarios(id) ON DELETE CASCADE
+        ) {OPCIONES_TABLA}
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS estadisticas_contadores (
+            ambito ENUM('global', 'proyecto', 'usuario') NOT NULL,
+            id_ambito INT NOT NULL DEFAULT 0,
+            metrica VARCHAR(40) NOT NULL,
+            valor INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (ambito, id_ambito, metrica)
+        ) {OPCIONES_TABLA}
+        """
+    ]),
+    (2, 'Índices para las consultas frecuentes', [
+        # Listados y contadores de tareas (estado_registro siempre va en el WHERE)
+        indice('tareas', 'idx_tareas_registro_estado', 'estado_registro, estado, fecha_vencimiento'),
+        indice('tareas', 'idx_tareas_asignado', 'id_asignado, estado_registro, estado'),
+        indice('tareas', 'idx_tareas_proyecto', 'id_proyecto, estado_registro, estado'),
+        # Orden de la paginación keyset de /tareas
+        indice('tareas', 'idx_tareas_orden', 'estado_registro, prioridad DESC, fecha_vencimiento, id'),
+        indice('proyectos', 'idx_proyectos_estado_fecha', 'estado, fecha_creacion'),
+        indice('mensajes_chat', 'idx_mensajes_estado_fecha', 'estado, fecha_creacion'),
+        indice('historial_actividades', 'idx_historial_usuario_fecha', 'id_usuario, fecha'),
+        indice('usuarios', 'idx_usuarios_estado', 'estado, nombre')
+    ]),
+    (3, 'Índice del chat por id (deltas after_id/before_id)', [
+        indice('mensajes_chat', 'idx_mensajes_estado_id', 'estado, id')
+    ]),
+    (4, 'Último acceso en usuarios e historial particionado por mes', [
+        columna('usuarios', 'ultimo_acceso', 'DATETIME NULL'),
+        """
+        UPDATE usuarios u
+        SET ultimo_acceso = (
+            SELECT MAX(h.fecha) FROM historial_actividades h
+            WHERE h.id_usuario = u.id AND h.accion = 'Inicio de sesión exitoso'
+        )
+        WHERE u.ultimo_acceso IS NULL
+        """,
+        particionar_historial
+    ]),
+    (5, 'Vencimiento de proyectos, deduplicación de notificaciones y ejecuciones de trabajos', [
+        columna('proyectos', 'fecha_vencimiento', 'DATE NULL'),
+        indice('proyectos', 'idx_proyectos_estado_vencimiento', 'estado, fecha_vencimiento'),
+        # Clave de idempotencia: repetir un trabajo no duplica avisos (NULL no choca)
+        columna('notificaciones', 'clave_dedup', 'VARCHAR(150) NULL'),
+        indice('notificaciones', 'uq_notificaciones_dedup', 'id_usuario, clave_dedup', unico=True),
+        f"""
+        CREATE TABLE IF NOT EXISTS trabajos_ejecuciones (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            trabajo VARCHAR(50) NOT NULL,
+            inicio DATETIME NOT NULL,
+            duracion_ms INT NOT NULL,
+            estado ENUM('ok', 'error') NOT NULL,
+            resultado VARCHAR(500),
+            INDEX idx_trabajos_nombre_inicio (trabajo, estado, inicio)
+        ) {OPCIONES_TABLA}
+        """
+    ]),
+    (6, 'Contador de notificaciones no leídas e índices de la bandeja', [
+        f"""
+        CREATE TABLE IF NOT EXISTS notificaciones_no_leidas (
+            id_usuario INT PRIMARY KEY,
+            total INT NOT NULL DEFAULT 0
+        ) {OPCIONES_TABLA}
+        """,
+        """
+        INSERT INTO notificaciones_no_leidas (id_usuario, total)
+        SELECT id_usuario, COUNT(*) FROM notificaciones WHERE leida = FALSE GROUP BY id_usuario
+        ON DUPLICATE KEY UPDATE total = VALUES(total)
+        """,
+        # Desplegable (no leídas primero), feed por id y purga de leídas antiguas
+        indice('notificaciones', 'idx_notificaciones_bandeja', 'id_usuario, leida, id DESC'),
+        indice('notificaciones', 'idx_notificaciones_feed', 'id_usuario, id'),
+        indice('notificaciones', 'idx_notificaciones_purga', 'leida, fecha_creacion'),
+        sin_indice('notificaciones', 'idx_notificaciones_usuario')
+    ]),
+    (7, 'Fecha de última modificación para versionar la caché de reportes', [
+        columna('tareas', 'fecha_actualizacion',
+                'TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+        columna('proyectos', 'fecha_actualizacion',
+                'TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+        columna('usuarios', 'fecha_actualizacion',
+                'TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+        indice('tareas', 'idx_tareas_actualizacion', 'fecha_actualizacion'),
+        indice('proyectos', 'idx_proyectos_actualizacion', 'fecha_actualizacion'),
+        indice('usuarios', 'idx_usuarios_actualizacion', 'fecha_actualizacion')
+    ]),
+    (8, 'Snapshots diarios de productividad por usuario y proyecto', [
+        f"""
+        CREATE TABLE IF NOT EXISTS snapshot_productividad (
+            ambito ENUM('global', 'proyecto', 'usuario') NOT NULL,
+            id_ambito INT NOT NULL DEFAULT 0,
+            fecha DATE NOT NULL,
+            total_tareas INT NOT NULL DEFAULT 0,
+            completadas INT NOT NULL DEFAULT 0,
+            vencidas INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (ambito, id_ambito, fecha),
+            INDEX idx_snapshot_fecha (fecha)
+        ) {OPCIONES_TABLA}
+        """
+    ]),
+    (9, 'proyecto_miembros como índice de pertenencia (líder y asignados)', [
+        # Tareas activas del usuario en el proyecto: la fila de un Miembro desaparece al llegar a 0
+        columna('proyecto_miembros', 'tareas', 'INT NOT NULL DEFAULT 0'),
+        indice('proyecto_miembros', 'idx_proyecto_miembros_usuario', 'id_usuario, id_proyecto'),
+        reconstruir_miembros
+    ]),
+    (10, 'Prioridad de tareas obligatoria (clave del orden keyset)', [
+        "UPDATE tareas SET prioridad = 'media' WHERE prioridad IS NULL",
+        "ALTER TABLE tareas MODIFY prioridad ENUM('baja', 'media', 'alta') NOT NULL DEFAULT 'media'"
+    ]),
+    # Las bases existentes nunca pasaron por el recálculo inicial: sin la marca los
+    # dashboards recorrían las tablas y los deltas de cada escritura no se leían
+    (11, 'Recálculo inicial de los contadores materializados', [
+        recalcular_contadores
+    ])
+]
+
+
+def version_actual(cursor):
+    """Última versión aplicada (0 si la base nunca se migró)"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            descripcion VARCHAR(200) NOT NULL,
+            fecha_aplicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) {OPCIONES_TABLA}
+    """)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def pendientes(cursor):
+    """Migraciones aún no aplicadas, en orden"""
+    actual = version_actual(cursor)
+    return [m for m in MIGRACIONES if m[0] > actual]
+
+
+def aplicar_migraciones(conn):
+    """Aplica en orden las migraciones pendientes; devuelve la versión final.
+
+    Un bloqueo con nombre (GET_LOCK) evita que varios workers migren a la vez.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (BLOQUEO_MIGRACIONES,))
+        if cursor.fetchone()[0] != 1:
+            raise Error(msg="No se pudo obtener el bloqueo de migraciones")
+        try:
+            for version, descripcion, pasos in pendientes(cursor):
+                print(f"🔄 Migración {version}: {descripcion}")
+                for paso in pasos:
+                    if callable(paso):
+                        paso(cursor)
+                    else:
+                        cursor.execute(paso)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, descripcion) VALUES (%s, %s)",
+                    (version, descripcion)
+                )
+                conn.commit()
+            return version_actual(cursor)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (BLOQUEO_MIGRACIONES,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+# Consultas calientes que nunca deben recorrer la tabla completa.
+# (nombre, SQL, parámetros de ejemplo, tablas vigiladas)
+CONSULTAS_CRITICAS = [
+    ('tareas_por_estado',
+     "SELECT estado, COUNT(*) FROM tareas WHERE estado_registro = 'activo' GROUP BY estado",
+     (), ('tareas',)),
+    ('tareas_de_usuario',
+     "SELECT * FROM tareas WHERE id_asignado = %s AND estado_registro = 'activo'",
+     (1,), ('tareas',)),
+    ('tareas_de_proyecto',
+     "SELECT * FROM tareas WHERE id_proyecto = %s AND estado_registro = 'activo'",
+     (1,), ('tareas',)),
+    ('tareas_pagina',
+     """SELECT t.* FROM tareas t WHERE t.estado_registro = 'activo'
+        ORDER BY t.prioridad DESC, t.fecha_vencimiento ASC, t.id ASC LIMIT 51""",
+     (), ('t',)),
+    # Página siguiente: el predicado del cursor debe poder buscar en idx_tareas_orden
+    ('tareas_pagina_cursor',
+     """SELECT t.* FROM tareas t WHERE t.estado_registro = 'activo'
+        AND (t.prioridad IN ('baja')
+             OR (t.prioridad = 'media' AND (t.fecha_vencimiento > %s
+                 OR (t.fecha_vencimiento = %s AND t.id > %s))))
+        ORDER BY t.prioridad DESC, t.fecha_vencimiento ASC, t.id ASC LIMIT 51""",
+     ('2000-01-01', '2000-01-01', 0), ('t',)),
+    ('tareas_vencidas',
+     """SELECT COUNT(*) FROM tareas WHERE estado_registro = 'activo'
+        AND estado <> 'completada' AND fecha_vencimiento < CURDATE()""",
+     (), ('tareas',)),
+    ('proyectos_semana',
+     """SELECT COUNT(*) FROM proyectos WHERE estado = 'activo'
+        AND fecha_creacion >= DATE_SUB(NOW(), INTERVAL 1 WEEK)""",
+     (), ('proyectos',)),
+    ('mensajes_chat_delta',
+     "SELECT * FROM mensajes_chat WHERE estado = 'activo' AND id > %s ORDER BY id LIMIT 100",
+     (0,), ('mensajes_chat',)),
+    ('actividad_reciente',
+     """SELECT accion, fecha FROM historial_actividades
+        WHERE id_usuario = %s ORDER BY fecha DESC LIMIT 5""",
+     (1,), ('historial_actividades',)),
+    ('notificaciones_bandeja',
+     "SELECT * FROM notificaciones WHERE id_usuario = %s ORDER BY leida ASC, id DESC LIMIT 10",
+     (1,), ('notificaciones',)),
+    ('notificaciones_feed',
+     "SELECT * FROM notificaciones WHERE id_usuario = %s AND id < %s ORDER BY id DESC LIMIT 21",
+     (1, 2 ** 31 - 1), ('notificaciones',)),
+    ('productividad_tendencia',
+     """SELECT fecha, total_tareas, completadas FROM snapshot_productividad
+        WHERE ambito = 'global' AND id_ambito = 0 AND fecha >= CURDATE() - INTERVAL 90 DAY""",
+     (), ('snapshot_productividad',)),
+    ('proyectos_de_usuario',
+     """SELECT p.* FROM proyecto_miembros m JOIN proyectos p ON p.id = m.id_proyecto
+        WHERE m.id_usuario = %s AND p.estado = 'activo'""",
+     (1,), ('m',))
+]
+
+
+def verificar_planes(conn):
+    """Ejecuta EXPLAIN sobre CONSULTAS_CRITICAS y devuelve los recorridos completos.
+
+    Es un fallo cuando el plan hace type=ALL sin ningún índice utilizable;
+    si hay índice pero el optimizador prefiere recorrer (tablas diminutas)
+    solo se reporta como aviso.
+    """
+    cursor = conn.cursor(dictionary=True)
+    resultados = []
+    try:
+        for nombre, sql, params, tablas in CONSULTAS_CRITICAS:
+            cursor.execute("EXPLAIN " + sql, params)
+            for fila in cursor.fetchall():
+                if fila.get('table') not in tablas or fila.get('type') != 'ALL':
+                    continue
+                resultados.append({
+                    'consulta': nombre,
+                    'tabla': fila.get('table'),
+                    'filas': fila.get('rows'),
+                    'indices_posibles': fila.get('possible_keys'),
+                    'fallo': not fila.get('possible_keys')
+                })
+    finally:
+        cursor.close()
+    return resultados
@@ -0,0 +1,53 @@
+# [file name]: particiones.py
+# Particiones mensuales por rango (RANGE sobre UNIX_TIMESTAMP de la fecha)
+from datetime import date
+
+PARTICION_FUTURO = 'pfuturo'
+
+
+def inicio_mes(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(fecha, meses):
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(mes):
+    """p202611 contiene las filas de noviembre de 2026"""
+    return f"p{mes.year}{mes.month:02d}"
+
+
+def mes_de_particion(nombre):
+    """Inverso de nombre_particion; None para pfuturo u otros nombres"""
+    if len(nombre) != 7 or not nombre[1:].isdigit():
+        return None
+    return date(int(nombre[1:5]), int(nombre[5:7]), 1)
+
+
+def definicion_particion(mes):
+    siguiente = sumar_meses(mes, 1)
+    return (f"PARTITION {nombre_particion(mes)} "
+            f"VALUES LESS THAN (UNIX_TIMESTAMP('{siguiente.isoformat()} 00:00:00'))")
+
+
+def definiciones_mensuales(desde, hasta):
+    """Particiones de los meses [desde, hasta] más la de desborde"""
+    definiciones = []
+    mes = inicio_mes(desde)
+    while mes <= inicio_mes(hasta):
+        definiciones.append(definicion_particion(mes))
+        mes = sumar_meses(mes, 1)
+    definiciones.append(f"PARTITION {PARTICION_FUTURO} VALUES LESS THAN MAXVALUE")
+    return definiciones
+
+
+def particiones_existentes(cursor, tabla):
+    """Nombres de las particiones de la tabla en orden (vacío si no está particionada)"""
+    cursor.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """, (tabla,))
+    return [fila[0] for fila in cursor.fetchall()]
@@ -0,0 +1,271 @@
+# [file name]: pool.py
+# Pool de conexiones MySQL compartido por todos los modelos del proceso
+import os
+import threading
+import time
+from collections import deque
+import mysql.connector
+
+
+class PoolAgotadoError(Exception):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+
+class _Entrada:
+    """Conexión física del pool con sus marcas de tiempo"""
+    __slots__ = ('raw', 'creada', 'usada')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.creada = time.monotonic()
+        self.usada = self.creada
+
+
+class ConexionPooled:
+    """Envuelve una conexión del pool: close() la devuelve en lugar de cerrarla"""
+
+    def __init__(self, pool, entrada, persistente=False):
+        self._pool = pool
+        self._entrada = entrada
+        # Las conexiones de request se liberan en el teardown, no en close()
+        self._persistente = persistente
+
+    def __getattr__(self, nombre):
+        if self._entrada is None:
+            raise AttributeError(f"Conexión ya devuelta al pool: {nombre}")
+        return getattr(self._entrada.raw, nombre)
+
+    def close(self):
+        if not self._persistente:
+            self.liberar()
+
+    def liberar(self):
+        """Devuelve la conexión física al pool"""
+        entrada, self._entrada = self._entrada, None
+        if entrada is not None:
+            self._pool.devolver(entrada)
+
+
+class ConnectionPool:
+    """Pool con tamaño fijo + desborde, health check, reciclado y limpieza de ociosas"""
+
+    def __init__(self, config, size=5, max_overflow=10, timeout=30,
+                 recycle=1800, idle_timeout=300, ping_interval=10):
+        self.config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._ociosas = deque()
+        self._total = 0
+        self._en_uso = 0
+        self._pid = os.getpid()
+        self._stats = self._stats_vacias()
+
+    @staticmethod
+    def _stats_vacias():
+        return {
+            'checkouts': 0,
+            'checkins': 0,
+            'creadas': 0,
+            'cerradas': 0,
+            'recicladas': 0,
+            'descartadas_ping': 0,
+            'ociosas_cerradas': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'tiempo_espera_max': 0.0,
+            'timeouts': 0,
+            'pico_en_uso': 0,
+        }
+
+    def obtener(self):
+        """Entrega una _Entrada sana; espera hasta `timeout` si el pool está lleno"""
+        inicio = time.monotonic()
+        espero = False
+        while True:
+            a_cerrar = []
+            entrada = None
+            with self._cond:
+                self._verificar_fork()
+                while True:
+                    a_cerrar.extend(self._reap_locked())
+                    if self._ociosas:
+                        entrada = self._ociosas.pop()
+                        break
+                    if self._total < self.size + self.max_overflow:
+                        self._total += 1
+                        break
+                    espero = True
+                    restante = self.timeout - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolAgotadoError(
+                            f"Pool agotado ({self._total} conexiones en uso) tras {self.timeout}s"
+                        )
+                    self._cond.wait(restante)
+            self._cerrar_todas(a_cerrar)
+
+            if entrada is None:
+                try:
+                    entrada = _Entrada(self._abrir())
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['creadas'] += 1
+            elif not self._sana(entrada):
+                self._descartar(entrada)
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._cond:
+                self._en_uso += 1
+                self._stats['checkouts'] += 1
+                self._stats['pico_en_uso'] = max(self._stats['pico_en_uso'], self._en_uso)
+                if espero:
+                    self._stats['esperas'] += 1
+                    self._stats['tiempo_espera_total'] += espera
+                    self._stats['tiempo_espera_max'] = max(self._stats['tiempo_espera_max'], espera)
+            return entrada
+
+    def devolver(self, entrada):
+        """Regresa una conexión al pool o la cierra si sobra o expiró"""
+        cerrar = False
+        with self._cond:
+            if os.getpid() != self._pid:
+                # Conexión heredada de otro proceso: no se reutiliza
+                return
+            self._en_uso -= 1
+            self._stats['checkins'] += 1
+            ahora = time.monotonic()
+            if ahora - entrada.creada > self.recycle:
+                self._stats['recicladas'] += 1
+                cerrar = True
+            elif len(self._ociosas) >= self.size:
+                cerrar = True
+            else:
+                entrada.usada = ahora
+                self._ociosas.append(entrada)
+            if cerrar:
+                self._total -= 1
+                self._stats['cerradas'] += 1
+            self._cond.notify()
+        if cerrar:
+            self._cerrar_raw(entrada.raw)
+
+    def metricas(self):
+        """Estado actual del pool y contadores acumulados"""
+        with self._cond:
+            datos = dict(self._stats)
+            datos.update({
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'abiertas': self._total,
+                'en_uso': self._en_uso,
+                'ociosas': len(self._ociosas),
+                'desborde_en_uso': max(0, self._total - self.size),
+            })
+        esperas = datos['esperas']
+        datos['tiempo_espera_promedio'] = datos['tiempo_espera_total'] / esperas if esperas else 0.0
+        return datos
+
+    def cerrar(self):
+        """Cierra todas las conexiones ociosas (las que están en uso se cierran al devolverse)"""
+        with self._cond:
+            entradas = list(self._ociosas)
+            self._ociosas.clear()
+            self._total -= len(entradas)
+            self._stats['cerradas'] += len(entradas)
+        self._cerrar_todas(entradas)
+
+    def _abrir(self):
+        # buffered: varias consultas comparten la conexión del request sin "Unread result"
+        return mysql.connector.connect(buffered=True, **self.config)
+
+    def _sana(self, entrada):
+        ahora = time.monotonic()
+        if ahora - entrada.creada > self.recycle:
+            with self._cond:
+                self._stats['recicladas'] += 1
+            return False
+        if ahora - entrada.usada > self.ping_interval:
+            try:
+                entrada.raw.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats['descartadas_ping'] += 1
+                return False
+        return True
+
+    def _descartar(self, entrada):
+        with self._cond:
+            self._total -= 1
+            self._stats['cerradas'] += 1
+            self._cond.notify()
+        self._cerrar_raw(entrada.raw)
+
+    def _reap_locked(self):
+        """Saca del pool las conexiones ociosas más viejas que idle_timeout"""
+        ahora = time.monotonic()
+        expiradas = []
+        while self._ociosas and ahora - self._ociosas[0].usada > self.idle_timeout:
+            expiradas.append(self._ociosas.popleft())
+        if expiradas:
+            self._total -= len(expiradas)
+            self._stats['ociosas_cerradas'] += len(expiradas)
+            self._stats['cerradas'] += len(expiradas)
+        return expiradas
+
+    def _verificar_fork(self):
+        # Tras un fork (gunicorn) los sockets del padre no se comparten ni se cierran
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._ociosas = deque()
+            self._total = 0
+            self._en_uso = 0
+            self._stats = self._stats_vacias()
+
+    def _cerrar_todas(self, entradas):
+        for entrada in entradas:
+            self._cerrar_raw(entrada.raw)
+
+    @staticmethod
+    def _cerrar_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(config, **opciones):
+    """Devuelve el pool del proceso para esta configuración, creándolo si hace falta"""
+    clave = tuple(sorted((k, str(v)) for k, v in config.items()))
+    with _pools_lock:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = ConnectionPool(config, **opciones)
+            _pools[clave] = pool
+            print(f"🔧 Pool MySQL: host={config.get('host')}, db={config.get('database')}, "
+                  f"size={pool.size}, overflow={pool.max_overflow}")
+        return pool
+
+
+def metricas_pools():
+    """Métricas de todos los pools del proceso"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [
+        dict(pool.metricas(), host=pool.config.get('host'), database=pool.config.get('database'))
+        for pool in pools
+    ]
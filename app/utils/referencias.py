@@ -0,0 +1,56 @@
+# [file name]: referencias.py
+# Datos de referencia de los desplegables (proyectos y usuarios activos) compartidos por los requests
+import os
+import threading
+from app.utils.cache import TTLCache
+
+# Las escrituras invalidan explícitamente; el TTL solo acota lo que tarda en verse
+# un cambio hecho fuera de los modelos (SQL a mano, otra aplicación)
+REFERENCIAS_TTL = float(os.environ.get('REFERENCIAS_TTL', '300'))
+
+
+class ReferenciasCache:
+    """Listas inmutables por nombre ('proyectos', 'usuarios') con versión por lista.
+
+    Cada invalidación sube la versión: una carga que empezó antes de la
+    invalidación devuelve sus datos pero no los guarda, así que una lista
+    leída justo antes de un cambio no queda en caché hasta el TTL. La
+    invalidación llega al resto de workers por el bus de TTLCache.
+    """
+
+    def __init__(self, ttl=REFERENCIAS_TTL):
+        self._cache = TTLCache('referencias', max_items=16, ttl=ttl)
+        self._cargadores = {}
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre, cargar):
+        """`cargar()` devuelve una tupla con la lista, o None si no hay base de datos"""
+        self._cargadores[nombre] = cargar
+        self._versiones.setdefault(nombre, 0)
+
+    def obtener(self, nombre):
+        datos = self._cache.obtener(nombre)
+        if datos is not None:
+            return datos
+        with self._lock:
+            version = self._versiones[nombre]
+        datos = self._cargadores[nombre]()
+        if datos is None:
+            return ()
+        with self._lock:
+            if self._versiones[nombre] == version:
+                self._cache.guardar(nombre, datos)
+        return datos
+
+    def invalidar(self, nombre):
+        with self._lock:
+            self._versiones[nombre] += 1
+        self._cache.invalidar(nombre)
+
+    def version(self, nombre):
+        with self._lock:
+            return self._versiones[nombre]
+
+
+referencias = ReferenciasCache()
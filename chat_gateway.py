@@ -0,0 +1,54 @@
+"""
+chat_gateway.py
+Aplicación ASGI del chat en tiempo real (WebSockets), separada del worker WSGI.
+
+    uvicorn chat_gateway:app --host 0.0.0.0 --port 8001
+
+La página /chat se conecta a CHAT_WS_URL (p. ej. wss://chat.midominio.com/ws/chat);
+si no está configurada sigue usando los deltas de /api/chat/mensajes.
+"""
+
+import json
+from config import Config
+from app.models.chat_model import ChatModel
+from app.services.chat_gateway import ChatGateway
+
+
+def guardar_lote(lote):
+    return ChatModel().guardar_lote(lote)
+
+
+gateway = ChatGateway(Config.SECRET_KEY, guardar_lote)
+
+
+async def responder_json(send, estado, datos):
+    cuerpo = json.dumps(datos).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': estado,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(cuerpo)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': cuerpo})
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            evento = await receive()
+            if evento['type'] == 'lifespan.startup':
+                gateway.escritor.iniciar()
+                print("🚀 Gateway del chat iniciado")
+                await send({'type': 'lifespan.startup.complete'})
+            elif evento['type'] == 'lifespan.shutdown':
+                # Los mensajes ya difundidos no se pierden al reiniciar
+                await gateway.escritor.detener()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    elif scope['type'] == 'websocket' and scope['path'] == '/ws/chat':
+        await gateway.atender(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        await send({'type': 'websocket.close', 'code': 4404})
+    elif scope['path'] == '/salud':
+        await responder_json(send, 200, gateway.metricas())
+    else:
+        await responder_json(send, 404, {'error': 'No encontrado'})
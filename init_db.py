@@ -9,6 +9,7 @@ import os
 import sys
 import mysql.connector
 from mysql.connector import Error
+from app.utils.migraciones import aplicar_migraciones, reconstruir_miembros, recalcular_contadores
 
 # -----------------------
 # Config (leer env)
@@ -37,156 +38,8 @@ CREATE_DB_SQL = f"""
 CREATE DATABASE IF NOT EXISTS `{DB_NAME}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 """
 
-# Table creation statements (ordered to satisfy FKs)
-TABLES = [
-# usuarios
-"""
-CREATE TABLE IF NOT EXISTS usuarios (
-  id INT NOT NULL AUTO_INCREMENT,
-  nombre VARCHAR(100) NOT NULL,
-  email VARCHAR(100) NOT NULL,
-  password VARCHAR(255) NOT NULL,
-  rol ENUM('Administrador','Líder de Proyecto','Colaborador') NOT NULL,
-  estado ENUM('activo','inactivo') DEFAULT 'activo',
-  fecha_creacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  PRIMARY KEY (id),
-  UNIQUE KEY email (email)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# proyectos
-"""
-CREATE TABLE IF NOT EXISTS proyectos (
-  id INT NOT NULL AUTO_INCREMENT,
-  nombre VARCHAR(200) NOT NULL,
-  descripcion TEXT DEFAULT NULL,
-  fecha_inicio DATE DEFAULT NULL,
-  fecha_fin DATE DEFAULT NULL,
-  estado ENUM('activo','inactivo','completado') DEFAULT 'activo',
-  id_lider INT DEFAULT NULL,
-  fecha_creacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  PRIMARY KEY (id),
-  KEY id_lider (id_lider),
-  CONSTRAINT proyectos_ibfk_1 FOREIGN KEY (id_lider) REFERENCES usuarios (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# tareas
-"""
-CREATE TABLE IF NOT EXISTS tareas (
-  id INT NOT NULL AUTO_INCREMENT,
-  titulo VARCHAR(200) NOT NULL,
-  descripcion TEXT DEFAULT NULL,
-  id_proyecto INT DEFAULT NULL,
-  id_asignado INT DEFAULT NULL,
-  estado ENUM('pendiente','en_progreso','completada') DEFAULT 'pendiente',
-  prioridad ENUM('baja','media','alta') DEFAULT 'media',
-  fecha_creacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  fecha_vencimiento DATE DEFAULT NULL,
-  estado_registro ENUM('activo','inactivo') DEFAULT 'activo',
-  PRIMARY KEY (id),
-  KEY id_proyecto (id_proyecto),
-  KEY id_asignado (id_asignado),
-  CONSTRAINT tareas_ibfk_1 FOREIGN KEY (id_proyecto) REFERENCES proyectos (id),
-  CONSTRAINT tareas_ibfk_2 FOREIGN KEY (id_asignado) REFERENCES usuarios (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# comentarios_tareas
-"""
-CREATE TABLE IF NOT EXISTS comentarios_tareas (
-  id INT NOT NULL AUTO_INCREMENT,
-  id_tarea INT DEFAULT NULL,
-  id_usuario INT DEFAULT NULL,
-  comentario TEXT NOT NULL,
-  fecha_creacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  estado ENUM('activo','inactivo') DEFAULT 'activo',
-  PRIMARY KEY (id),
-  KEY id_tarea (id_tarea),
-  KEY id_usuario (id_usuario),
-  CONSTRAINT comentarios_tareas_ibfk_1 FOREIGN KEY (id_tarea) REFERENCES tareas (id),
-  CONSTRAINT comentarios_tareas_ibfk_2 FOREIGN KEY (id_usuario) REFERENCES usuarios (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# config_sistema
-"""
-CREATE TABLE IF NOT EXISTS config_sistema (
-  id INT NOT NULL DEFAULT 1,
-  nombre VARCHAR(100) DEFAULT 'StarTask',
-  logo_url VARCHAR(255) DEFAULT NULL,
-  version VARCHAR(20) DEFAULT '1.0.0',
-  PRIMARY KEY (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# config_usuario
-"""
-CREATE TABLE IF NOT EXISTS config_usuario (
-  id_usuario INT NOT NULL,
-  tema VARCHAR(20) DEFAULT 'auto',
-  notificaciones_email TINYINT(1) DEFAULT 1,
-  notificaciones_tareas TINYINT(1) DEFAULT 1,
-  PRIMARY KEY (id_usuario),
-  CONSTRAINT config_usuario_ibfk_1 FOREIGN KEY (id_usuario) REFERENCES usuarios (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# historial_actividades
-"""
-CREATE TABLE IF NOT EXISTS historial_actividades (
-  id INT NOT NULL AUTO_INCREMENT,
-  id_usuario INT DEFAULT NULL,
-  accion VARCHAR(200) NOT NULL,
-  tabla_afectada VARCHAR(50) DEFAULT NULL,
-  id_registro_afectado INT DEFAULT NULL,
-  fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  PRIMARY KEY (id),
-  KEY id_usuario (id_usuario),
-  CONSTRAINT historial_actividades_ibfk_1 FOREIGN KEY (id_usuario) REFERENCES usuarios (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# mensajes_chat
-"""
-CREATE TABLE IF NOT EXISTS mensajes_chat (
-  id INT NOT NULL AUTO_INCREMENT,
-  id_usuario INT DEFAULT NULL,
-  mensaje TEXT NOT NULL,
-  fecha_creacion TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  estado ENUM('activo','eliminado') DEFAULT 'activo',
-  PRIMARY KEY (id),
-  KEY id_usuario (id_usuario),
-  CONSTRAINT mensajes_chat_ibfk_1 FOREIGN KEY (id_usuario) REFERENCES usuarios (id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# notificaciones
-"""
-CREATE TABLE IF NOT EXISTS notificaciones (
-  id INT NOT NULL AUTO_INCREMENT,
-  id_usuario INT NOT NULL,
-  tipo ENUM('proyecto_asignado','fecha_limite','nuevo_mensaje','tarea_urgente') NOT NULL,
-  titulo VARCHAR(255) NOT NULL,
-  mensaje TEXT NOT NULL,
-  enlace VARCHAR(500) DEFAULT NULL,
-  leida TINYINT(1) DEFAULT 0,
-  fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-  fecha_limite DATE DEFAULT NULL,
-  prioridad ENUM('baja','media','alta') DEFAULT 'media',
-  PRIMARY KEY (id),
-  KEY idx_notificaciones_usuario (id_usuario, leida, fecha_creacion),
-  CONSTRAINT notificaciones_ibfk_1 FOREIGN KEY (id_usuario) REFERENCES usuarios (id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-""",
-# proyecto_miembros
-"""
-CREATE TABLE IF NOT EXISTS proyecto_miembros (
-  id INT NOT NULL AUTO_INCREMENT,
-  id_proyecto INT DEFAULT NULL,
-  id_usuario INT DEFAULT NULL,
-  rol ENUM('Líder','Miembro') DEFAULT 'Miembro',
-  fecha_union TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  PRIMARY KEY (id),
-  UNIQUE KEY unique_proyecto_usuario (id_proyecto,id_usuario),
-  KEY id_usuario (id_usuario),
-  CONSTRAINT proyecto_miembros_ibfk_1 FOREIGN KEY (id_proyecto) REFERENCES proyectos (id) ON DELETE CASCADE,
-  CONSTRAINT proyecto_miembros_ibfk_2 FOREIGN KEY (id_usuario) REFERENCES usuarios (id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-"""
-]
+# Las tablas e índices se crean con las migraciones versionadas
+# (app/utils/migraciones.py), igual que al arrancar la aplicación.
 
 # Data inserts (idempotente: INSERT IGNORE)
 INITS = [
@@ -277,10 +130,8 @@ def run():
         # Ensure using correct DB
         cur.execute(f"USE `{DB_NAME}`;")
 
-        for stmt in TABLES:
-            cur.execute(stmt)
-        con.commit()
-        print("✅ Tablas creadas o ya existentes.")
+        version = aplicar_migraciones(con)
+        print(f"✅ Esquema migrado a la versión {version}.")
 
         # 3) Inserts iniciales (idempotentes)
         for sql, params in INITS:
@@ -290,6 +141,12 @@ def run():
                 # show but continue (a missing FK or ordering issue will show here)
                 print("⚠️ Error insert (continuando):", e, " — Query:", sql, " Params:", params)
 
+        # Los datos iniciales no pasan por los modelos: el índice de miembros y los
+        # contadores (rellenos en las migraciones 9 y 11, con las tablas aún vacías)
+        # se recalculan aquí
+        reconstruir_miembros(cur)
+        recalcular_contadores(cur)
+
         con.commit()
         print("✅ Datos iniciales insertados (si no existían).")
 
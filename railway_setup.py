@@ -7,7 +7,8 @@ Ejecuta este script manualmente después del despliegue
 import mysql.connector
 from mysql.connector import Error
 import os
-import time
+from app.utils.migraciones import aplicar_migraciones
+from init_db import INITS
 
 def railway_database_setup():
     print("🚀 INICIALIZANDO STARTASK EN RAILWAY...")
@@ -33,20 +34,17 @@ def railway_database_setup():
         
         print("✅ Base de datos 'startask' creada/verificada")
         
-        # Ejecutar script SQL
-        with open('database_setup.sql', 'r', encoding='utf-8') as file:
-            sql_script = file.read()
+        # Tablas e índices: mismas migraciones versionadas que usa la aplicación
+        version = aplicar_migraciones(conn)
+        print(f"✅ Esquema migrado a la versión {version}")
         
-        # Ejecutar cada sentencia
-        statements = sql_script.split(';')
-        for statement in statements:
-            statement = statement.strip()
-            if statement and not statement.startswith('--'):
-                try:
-                    cursor.execute(statement)
-                except Exception as e:
-                    print(f"⚠️  En sentencia: {e}")
-                    continue
+        # Datos de ejemplo (idempotentes)
+        for sql, params in INITS:
+            try:
+                cursor.execute(sql, params)
+            except Error as e:
+                print(f"⚠️  En sentencia: {e}")
+                continue
         
         conn.commit()
         cursor.close()